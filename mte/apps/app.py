@@ -12,8 +12,12 @@ class App(ABC):
     """
     __logger = Logger()
 
-    def __init__(self):
+    def __init__(self, options=None):
+        """
+        @param options: run options from command line passed to TestExecutor.
+        """
         self.tests = []
+        self.options = options or {}
 
     @abstractmethod
     def load(self):
@@ -0,0 +1,104 @@
+import json
+import sys
+
+from mte.apps.app import App
+from mte.executor import TestExecutor
+from mte.logger import Logger
+from mte.test_filter import matches, parse_filter
+
+
+class BatchApp(App):
+    """
+    Non-interactive application for scheduled runs, e.g. from CI.
+    Selects tests by filter expressions, runs them immediately and exits with code reflecting results.
+
+    Exit codes:
+        - 0: all run tests passed or no test was left to run
+        - 1: some test did not pass
+        - 2: invalid filter, no test matched or run failed
+    """
+    EXIT_SUCCESS = 0
+    EXIT_FAILED = 1
+    EXIT_ERROR = 2
+
+    def __init__(self, options=None, filters=None, results_path=None):
+        """
+        @param options: run options from command line passed to TestExecutor.
+        @param filters: filter expressions, see mte.test_filter, all tests are selected if empty.
+        @param results_path: path where structured results are written, optional.
+        """
+        super().__init__(options)
+        self.filters = filters or []
+        self.results_path = results_path
+
+    def load(self):
+        """
+        Loads TestExecutor object and tests, selects tests and starts execution.
+        """
+        try:
+            filters = [parse_filter(f) for f in self.filters]
+        except ValueError as e:
+            self.out(str(e))
+            sys.exit(self.EXIT_ERROR)
+
+        try:
+            self.executor = TestExecutor(self.options)
+            self.tests = self.executor.get_tests()
+        except:
+            sys.exit(self.EXIT_ERROR)
+
+        # Filters narrow selection made by executor, e.g. by hooks
+        for t in self.tests:
+            t["selected"] = t["selected"] and (not filters or matches(t, filters))
+
+        selected = [t for t in self.tests if t["selected"]]
+        if not selected:
+            self.out("No tests matched.")
+            sys.exit(self.EXIT_ERROR)
+
+        self.out(f"Selected {len(selected)} tests.")
+        sys.exit(self.execute(selected))
+
+    def execute(self, selected):
+        """
+        Runs selected tests and writes structured results.
+
+        @param selected: tests to run.
+        @return: exit code.
+        """
+        try:
+            if not self.executor.establish_connection().result():
+                return self.EXIT_ERROR
+
+            results = self.executor.execute(selected).result()
+        except:
+            return self.EXIT_ERROR
+
+        # Summary follows queued messages of run
+        Logger().flush()
+
+        if results is None:
+            return self.EXIT_ERROR
+
+        if self.results_path:
+            with open(self.results_path, "w") as f:
+                json.dump(results, f, indent=2)
+
+        if not results["tests"]:
+            self.out("No tests left to run.")
+            return self.EXIT_SUCCESS
+
+        failed = [t for t in results["tests"] if t["status"] != "success"]
+        self.out(f"{len(results['tests']) - len(failed)} passed, {len(failed)} not passed.")
+        for t in failed:
+            self.out(f"{t['status'].upper()}: src: {t.get('src')} | {t['name']}")
+
+        return self.EXIT_FAILED if failed else self.EXIT_SUCCESS
+
+    def out(self, message):
+        """
+        Prints messages to stderr, so stdout stays clean for CI tooling.
+
+        @param message: string to print.
+        """
+        print(message, file=sys.stderr)
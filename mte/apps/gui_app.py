@@ -1,4 +1,6 @@
+import queue
 import tkinter as tk
+from tkinter import ttk
 
 from mte.apps.app import App
 from mte.executor import TestExecutor
@@ -8,9 +10,15 @@ class GuiApp(App):
     """
     GUI execution application.
     Uses tkinter window graphics for user interface.
+    Log messages from worker threads are queued and rendered by Tk main loop in batches.
     """
-    def __init__(self):
-        super().__init__()
+    # Interval of log rendering in ms, maximum of messages rendered at once and of lines kept in log widget
+    LOG_INTERVAL = 100
+    LOG_BATCH = 500
+    LOG_MAX_LINES = 5000
+
+    def __init__(self, options=None):
+        super().__init__(options)
 
         # Define root
         self.root = tk.Tk()
@@ -36,21 +44,40 @@ class GuiApp(App):
         self.reload_button = tk.Button(self.buttons_frame, text="Reload", state="disabled", command=self.reload)
         self.reload_button.pack(side="right", padx=5, pady=5)
 
+        # Filter box, filters tests by name, type and src while typing
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add("write", lambda *args: self.schedule_filter())
+        self.filter_entry = tk.Entry(self.buttons_frame, textvariable=self.filter_var)
+        self.filter_entry.pack(side="left", fill="x", expand=True, padx=5, pady=5)
+        self.filter_job = None
+
+        # Loaded tests, row id of test is its index
+        self.tests = []
+
         # create a frame for the list of element
         self.elements_frame = tk.Frame(self.root, relief="groove", bd=2, bg="white")
         self.elements_frame.pack(side="top", fill="both", expand=True)
 
-        # Create a canvas and scrollbar for tests
-        self.canvas = tk.Canvas(self.elements_frame, bg="white")
-        self.scrollbar = tk.Scrollbar(self.elements_frame, orient="vertical", command=self.canvas.yview)
+        # Create a tree view and scrollbar for tests, tree view draws only visible rows
+        self.tree = ttk.Treeview(self.elements_frame, columns=("type", "src", "name"), selectmode="extended")
+        self.tree.heading("#0", text="Run")
+        self.tree.heading("type", text="Type")
+        self.tree.heading("src", text="Source")
+        self.tree.heading("name", text="Name")
+        self.tree.column("#0", width=50, stretch=False, anchor="center")
+        self.tree.column("type", width=60, stretch=False)
+        self.tree.column("src", width=220)
+        self.tree.column("name", width=420)
+        self.scrollbar = tk.Scrollbar(self.elements_frame, orient="vertical", command=self.tree.yview)
         self.scrollbar.pack(side="right", fill="y")
-        self.canvas.pack(side="left", fill="both", expand=True)
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
-        self.canvas.bind_all("<MouseWheel>", self.scroll_wheel)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.tree.configure(yscrollcommand=self.scrollbar.set)
+        self.tree.bind("<Double-1>", lambda e: self.toggle_rows())
+        self.tree.bind("<space>", lambda e: self.toggle_rows())
 
-        # Create a frame to hold the checkboxes
-        self.checkboxes_frame = tk.Frame(self.canvas, bg="white")
-        self.canvas.create_window((0,0), window=self.checkboxes_frame, anchor="nw")
+        # Selection flags indexed by test position and lowercase search keys of tests
+        self.selection = bytearray()
+        self.search_keys = []
 
         # Create a frame for the log output
         self.log_frame = tk.Frame(self.root, relief="groove", bd=2)
@@ -60,13 +87,10 @@ class GuiApp(App):
         self.log_text = tk.Text(self.log_frame, bg="white", state="disabled")
         self.log_text.pack(side="left", fill="both", expand=True)
 
-    def scroll_wheel(self, event):
-        """
-        Handler for scroll event in test selection frame.
-
-        @param event: scroll event.
-        """
-        self.canvas.yview_scroll(-1 * (event.delta // 120), "units")
+        # Start log pump, it also runs calls queued from worker threads
+        self.log_queue = queue.SimpleQueue()
+        self.call_queue = queue.SimpleQueue()
+        self.root.after(self.LOG_INTERVAL, self.pump_log)
 
     def set_state(self, state):
         """
@@ -101,32 +125,77 @@ class GuiApp(App):
     def __update_test_list(self, tests):
         """
         used for updating and redering of tests selection.
+        Each test is one row of tree view with test index as row id, selection is kept in flags.
 
         @param tests: loaded tests.
         """
-        self.tests = list(map(lambda x: {**x, 'selected': tk.BooleanVar(value=x['selected'])}, tests))
-        # Clear the frame
-        for widget in self.checkboxes_frame.winfo_children():
-            widget.destroy()
+        # Clear the tree, rows detached by filter are not children of tree
+        self.tree.delete(*[str(i) for i in range(len(self.tests))])
 
-        # Create new checkboxes
-        for test in self.tests:
-            text = f"[{test['type']}] src: {test['src']} | {test['name']}"
-            checkbox = tk.Checkbutton(self.checkboxes_frame, text=text, bg="white",pady=2, variable=test["selected"])
-            checkbox.pack(anchor=tk.W)
+        self.tests = tests
+        self.selection = bytearray(bool(t["selected"]) for t in tests)
+        self.search_keys = [f"{t['name']} {t['type']} {t['src']}".lower() for t in tests]
 
-        # Update the scrollbar
-        self.checkboxes_frame.update_idletasks()
-        self.canvas.config(scrollregion=self.canvas.bbox("all"))
+        # Create rows
+        for i, test in enumerate(tests):
+            self.tree.insert("", "end", iid=str(i), text=self.__mark(i), values=(test["type"], test["src"], test["name"]))
+
+        self.apply_filter()
+
+    def __mark(self, index):
+        """
+        @param index: test index.
+        @return: selection mark of test row.
+        """
+        return "[x]" if self.selection[index] else "[ ]"
+
+    def schedule_filter(self):
+        """
+        Postpones filtering until typing pauses, so filter box stays responsive.
+        """
+        if self.filter_job:
+            self.root.after_cancel(self.filter_job)
+        self.filter_job = self.root.after(150, self.apply_filter)
+
+    def apply_filter(self):
+        """
+        Shows only tests whose name, type or src contain all words of filter, other rows are detached.
+        """
+        self.filter_job = None
+        words = self.filter_var.get().lower().split()
+
+        position = 0
+        for i, key in enumerate(self.search_keys):
+            if all(w in key for w in words):
+                self.tree.move(str(i), "", position)
+                position += 1
+            else:
+                self.tree.detach(str(i))
+
+    def __visible(self):
+        """
+        @return: indexes of tests shown by filter.
+        """
+        return [int(iid) for iid in self.tree.get_children()]
+
+    def toggle_rows(self):
+        """
+        Toggles selection value of highlighted rows.
+        """
+        for iid in self.tree.selection():
+            i = int(iid)
+            self.selection[i] = not self.selection[i]
+            self.tree.item(iid, text=self.__mark(i))
 
     def toggle_all(self, new_value):
         """
-        Sets selection value for all tests.
+        Sets selection value for all tests shown by filter.
 
         @param new_value: new selected value.
         """
-        for t in self.tests:
-            t["selected"].set(new_value)
+        for i in self.__visible():
+            self.selection[i] = new_value
+            self.tree.item(str(i), text=self.__mark(i))
 
     def show_results(self, results):
         """
@@ -155,15 +224,56 @@ class GuiApp(App):
 
     def out(self, message):
         """
-        Implements stdout for logger, by appending to log_text frame.
+        Implements stdout for logger, by queueing message for log pump.
+        Safe to call from any thread, never waits for rendering.
 
         @param message: message to append.
         """
-        self.log_text.configure(state="normal")
-        self.log_text.insert("end", message + "\n")
-        self.log_text.see("end")
-        self.log_text.configure(state="disabled")
-        self.root.update_idletasks()
+        self.log_queue.put(message)
+
+    def call_in_ui(self, function, *args):
+        """
+        Queues call to be run in Tk main loop by log pump. Safe to call from any thread.
+
+        @param function: function to call.
+        @param args: arguments of function.
+        """
+        self.call_queue.put((function, args))
+
+    def pump_log(self):
+        """
+        Runs calls queued by worker threads, appends batch of queued messages to log_text frame
+        and trims it to LOG_MAX_LINES lines.
+        Runs in Tk main loop every LOG_INTERVAL ms.
+        """
+        try:
+            while True:
+                function, args = self.call_queue.get_nowait()
+                function(*args)
+        except queue.Empty:
+            pass
+
+        messages = []
+        try:
+            while len(messages) < self.LOG_BATCH:
+                messages.append(self.log_queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        if messages:
+            self.log_text.configure(state="normal")
+            self.log_text.insert("end", "\n".join(messages) + "\n")
+
+            # Drop oldest lines, widget always ends with empty line
+            excess = int(self.log_text.index("end-1c").split(".")[0]) - 1 - self.LOG_MAX_LINES
+            if excess > 0:
+                self.log_text.delete("1.0", f"{excess + 1}.0")
+
+            self.log_text.see("end")
+            self.log_text.configure(state="disabled")
+
+        # Render remaining messages right away, otherwise wait
+        self.root.after(1 if len(messages) == self.LOG_BATCH else self.LOG_INTERVAL, self.pump_log)
 
     def start(self):
         """
@@ -171,43 +281,50 @@ class GuiApp(App):
         """
         self.set_state("RUNNING")
 
-        self.executor.establish_connection()
-        self.root.after(100, self.check_connection)
+        connection = self.executor.establish_connection()
+        connection.add_done_callback(lambda f: self.call_in_ui(self.connected, f))
 
     def execute(self):
         """
         Starts tests execution.
         """
         self.set_state("RUNNING")
-        started = self.executor.execute(
-            [t for t in self.tests if t["selected"].get() is True]
+        execution = self.executor.execute(
+            [t for i, t in enumerate(self.tests) if self.selection[i]],
+            on_progress=lambda e: self.call_in_ui(self.progress, e)
         )
-        if started:
-            self.root.after(1000, self.check_execution)
+        if execution:
+            execution.add_done_callback(lambda f: self.call_in_ui(self.finished, f))
         else:
             self.set_state("DONE")
 
-    def check_connection(self):
+    def connected(self, future):
         """
-        Checks if connection setup is still running.
-        Prevents window freeze.
+        Handles finished connection setup, starts execution if connection was established.
+
+        @param future: connection future.
         """
-        if not self.executor.check_connection_status():
-            self.root.after(100, self.check_connection)
-        else:
-            self.set_state("DONE")
-            self.execute()
+        self.set_state("DONE")
+        self.execute()
 
-    def check_execution(self):
+    def progress(self, event):
         """
-        Checks if tests execution is running.
-        Prevents window freeze.
+        Logs finished tests.
+
+        @param event: progress event of runner.
         """
-        if not self.executor.check_execution_status():
-            self.root.after(1000, self.check_execution)
-        else:
-            self.set_state("DONE")
-            self.show_results(self.executor.get_results())
+        if event["event"] == "end":
+            target = f"[{event['target']}] " if event.get("target") else ""
+            self.out(f"{target}Finished: src: {event['src']} | {event['name']}")
+
+    def finished(self, future):
+        """
+        Handles finished tests execution, shows results.
+
+        @param future: execution future.
+        """
+        self.set_state("DONE")
+        self.show_results(self.executor.get_results())
 
     def reload(self):
         """
@@ -223,7 +340,9 @@ class GuiApp(App):
         Loads TestExecutor object and tests.
         """
         try:
-            self.executor = TestExecutor()
+            if getattr(self, "executor", None):
+                self.executor.close()
+            self.executor = TestExecutor(self.options)
 
             self.__update_test_list(self.executor.get_tests())
         except:
@@ -2,6 +2,7 @@ import re
 
 from mte.apps.app import App
 from mte.executor import TestExecutor
+from mte.logger import Logger
 
 
 class ShellApp(App):
@@ -9,15 +10,15 @@ class ShellApp(App):
     Simple command line execution application.
     Uses command line as user interface.
     """
-    def __init__(self):
-        super().__init__()
+    def __init__(self, options=None):
+        super().__init__(options)
 
     def load(self):
         """
         Loads TestExecutor object, tests and starts execution.
         """
         try:
-            self.executor = TestExecutor()
+            self.executor = TestExecutor(self.options)
             self.tests = self.executor.get_tests()
 
             self.select()
@@ -26,25 +27,35 @@ class ShellApp(App):
 
     def execute(self):
         """
-        Starts testing, when done prints output.
+        Starts testing, blocks until it is done and prints output.
         """
         try:
-            self.executor.establish_connection()
+            if not self.executor.establish_connection().result():
+                quit(1)
 
-            while True:
-                if self.executor.check_connection_status():
-                    break
-
-            self.executor.execute([t for t in self.tests if t["selected"] is True])
+            execution = self.executor.execute(
+                [t for t in self.tests if t["selected"] is True],
+                on_progress=self.progress
+            )
 
-            while True:
-                if self.executor.check_execution_status():
-                    break
+            # Errors of run are already logged, results are printed anyway
+            execution.exception()
 
+            Logger().flush()
             print(self.executor.get_results())
         except:
             quit(1)
 
+    def progress(self, event):
+        """
+        Prints finished tests, called from execution thread.
+
+        @param event: progress event of runner.
+        """
+        if event["event"] == "end":
+            target = f"[{event['target']}] " if event.get("target") else ""
+            print(f"{target}Finished: src: {event['src']} | {event['name']}")
+
     def out(self, message):
         """
         Implements standard print as stdout for Logger.
@@ -58,6 +69,9 @@ class ShellApp(App):
         Test selection logic through input.
         After confirmation of test selection, starts test execution.
         """
+        # Print queued messages before prompt
+        Logger().flush()
+
         while True:
             print("Actual selection: '+' as selected, '-' as unselected")
             self.__print_selection()
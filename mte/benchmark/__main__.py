@@ -0,0 +1,47 @@
+"""
+Benchmark of SSHManager transport against local in-process SSH/SFTP server.
+
+Example:
+    py -m mte.benchmark --latency 5 --repeat 3
+"""
+
+import argparse
+import json
+
+from mte.benchmark.ssh_benchmark import SSHBenchmark, format_report
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark SSHManager against local SSH/SFTP server.')
+
+    arg_parser.add_argument('--latency', type=float, default=0.0, help='Injected latency per round trip in ms. Default = 0')
+    arg_parser.add_argument('--repeat', type=int, default=1, help='Number of runs of each workload. Default = 1')
+    arg_parser.add_argument('--workloads', type=str, help=f'Workloads separated by ",". Options: {SSHBenchmark.WORKLOADS}')
+    arg_parser.add_argument('--execs', type=int, default=100, help='Number of commands in exec workload. Default = 100')
+    arg_parser.add_argument('--polls', type=int, default=20, help='Number of cycles in polling workload. Default = 20')
+    arg_parser.add_argument('--json', type=str, help='Write measurements as JSON into file.')
+    arg_parser.add_argument('--verbose', action='store_const', const=True, help='Print SSHManager messages.')
+
+    args = arg_parser.parse_args()
+
+    workloads = [w.strip() for w in args.workloads.split(",")] if args.workloads else None
+    latency = args.latency / 1000
+
+    benchmark = SSHBenchmark(
+        latency=latency,
+        repeat=args.repeat,
+        execs=args.execs,
+        polls=args.polls,
+        verbose=args.verbose
+    )
+    measurements = benchmark.run(workloads)
+
+    print(format_report(measurements, latency))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"latency_s": latency, "measurements": measurements}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
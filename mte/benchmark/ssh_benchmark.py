@@ -0,0 +1,258 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from mte.benchmark.ssh_server import LocalSSHServer
+from mte.logger import Logger
+from mte.ssh_manager import SSHManager
+
+
+class _BenchmarkOutput:
+    """
+    Output handler for Logger used during benchmark, application messages are printed only in verbose mode.
+    """
+
+    def __init__(self, verbose):
+        self.verbose = verbose
+
+    def out(self, message):
+        if self.verbose:
+            print(message)
+
+
+class SSHBenchmark:
+    """
+    Runs standard SSHManager workloads against in-process LocalSSHServer and measures
+    time, throughput and number of round trips for each of them.
+
+    Workloads:
+        - upload_target: upload of 'mte/target' tree as done by prepare_environment.
+        - upload_tests: upload of synthetic tree with size of 'medusa-tests' repository.
+        - exec: many small commands executed through SSHManager.exec.
+        - polling: connect, pgrep and disconnect cycle used while waiting for remote execution.
+        - download_results: download of results folder with details and log.
+    """
+
+    WORKLOADS = ["upload_target", "upload_tests", "exec", "polling", "download_results"]
+
+    def __init__(self, latency=0.0, repeat=1, execs=100, polls=20,
+                 tree_dirs=30, tree_files=20, file_size=4096, details=200, verbose=False):
+        """
+        @param latency: injected latency per round trip in seconds.
+        @param repeat: number of runs of each workload.
+        @param execs: number of commands in exec workload.
+        @param polls: number of cycles in polling workload.
+        @param tree_dirs: number of directories in synthetic tests tree.
+        @param tree_files: number of files in each directory of synthetic tests tree.
+        @param file_size: size of each file in synthetic tests tree in bytes.
+        @param details: number of result detail files for download workload.
+        @param verbose: print SSHManager messages.
+        """
+        self.latency = latency
+        self.repeat = repeat
+        self.execs = execs
+        self.polls = polls
+        self.tree_dirs = tree_dirs
+        self.tree_files = tree_files
+        self.file_size = file_size
+        self.details = details
+
+        logger = Logger()
+        logger.set_stdout(_BenchmarkOutput(verbose))
+        if verbose:
+            logger.set_debug_mode()
+
+    def run(self, workloads=None):
+        """
+        Runs selected workloads and returns measurements.
+
+        @param workloads: names of workloads to run, all if not set.
+        @return: list of measurement dictionaries.
+        """
+        workloads = workloads or self.WORKLOADS
+        for w in workloads:
+            if w not in self.WORKLOADS:
+                raise ValueError(f"Unknown workload: {w}")
+
+        measurements = []
+        work_dir = tempfile.mkdtemp(prefix="mte-bench-")
+        try:
+            remote_root = os.path.join(work_dir, "remote")
+            local_root = os.path.join(work_dir, "local")
+            os.makedirs(remote_root)
+            os.makedirs(local_root)
+
+            tests_tree = os.path.join(local_root, "medusa-tests")
+            self.__create_tree(tests_tree)
+
+            with LocalSSHServer(remote_root, latency=self.latency) as server:
+                ssh = SSHManager(server.host, server.port, server.username, server.password)
+                ssh.connect()
+
+                for w in workloads:
+                    env_path = os.path.join(remote_root, "env")
+                    runs = []
+                    for _ in range(self.repeat):
+                        # Every run starts from empty environment
+                        shutil.rmtree(env_path, ignore_errors=True)
+                        os.makedirs(env_path)
+
+                        runs.append(self.__measure(server, ssh, w, env_path, local_root, tests_tree))
+                    measurements.append(self.__summarize(w, runs))
+
+                ssh.disconnect()
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        return measurements
+
+    def __measure(self, server, ssh, workload, env_path, local_root, tests_tree):
+        """
+        Runs single workload and measures it.
+
+        @return: tuple of elapsed seconds, transferred bytes, operations count and round trips.
+        """
+        target_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "target")
+        size = 0
+        ops = 1
+
+        if workload == "download_results":
+            size = self.__create_results(env_path)
+            ops = self.details + 2
+
+        server.counter.reset()
+        start = time.perf_counter()
+
+        if workload == "upload_target":
+            ssh.transfer(target_dir, env_path, True)
+            size, ops = self.__tree_size(target_dir)
+        elif workload == "upload_tests":
+            ssh.transfer(tests_tree, env_path, False)
+            size, ops = self.__tree_size(tests_tree)
+        elif workload == "exec":
+            for _ in range(self.execs):
+                ssh.exec("true")
+            ops = self.execs
+        elif workload == "polling":
+            ssh.disconnect()
+            for _ in range(self.polls):
+                ssh.connect()
+                try:
+                    ssh.exec("pgrep medusaTestsExec", timeout=True, log_error=False)
+                except IOError:
+                    pass
+                ssh.disconnect()
+            ssh.connect()
+            ops = self.polls
+        elif workload == "download_results":
+            ssh.download_results(env_path, local_path=os.path.join(local_root, "results"))
+
+        elapsed = time.perf_counter() - start
+        round_trips = sum(server.counter.snapshot().values())
+
+        return elapsed, size, ops, round_trips
+
+    @staticmethod
+    def __summarize(workload, runs):
+        """
+        Aggregates repeated runs of workload.
+
+        @param workload: workload name.
+        @param runs: list of measurements from __measure.
+        @return: measurement dictionary.
+        """
+        times = [r[0] for r in runs]
+        mean = sum(times) / len(times)
+        size = runs[-1][1]
+        ops = runs[-1][2]
+
+        return {
+            "workload": workload,
+            "runs": len(runs),
+            "mean_s": mean,
+            "min_s": min(times),
+            "bytes": size,
+            "throughput_mb_s": (size / mean / 1024 / 1024) if size and mean else 0.0,
+            "ops": ops,
+            "ops_s": ops / mean if mean else 0.0,
+            "round_trips": runs[-1][3],
+        }
+
+    def __create_tree(self, path):
+        """
+        Creates synthetic tests tree of configured size.
+
+        @param path: root of tree.
+        """
+        payload = os.urandom(self.file_size)
+        for d in range(self.tree_dirs):
+            dir_path = os.path.join(path, f"dir_{d}")
+            os.makedirs(dir_path)
+            for f in range(self.tree_files):
+                with open(os.path.join(dir_path, f"file_{f}"), "wb") as fp:
+                    fp.write(payload)
+
+    def __create_results(self, env_path):
+        """
+        Creates results folder and log in remote environment as left by runner.
+
+        @param env_path: remote environment path.
+        @return: size of created files.
+        """
+        details_dir = os.path.join(env_path, "results", "details")
+        os.makedirs(details_dir)
+
+        line = "output: PASSED \t constable: PASSED \t dmesg: PASSED\n"
+        with open(os.path.join(env_path, "results", "results"), "w") as f:
+            f.write(line * self.details)
+
+        with open(os.path.join(env_path, "results", "results.json"), "w") as f:
+            json.dump({"tests": [
+                {"name": f"test_{i}", "status": "success", "output": "PASSED", "constable": "PASSED", "dmesg": "PASSED"}
+                for i in range(self.details)
+            ]}, f)
+
+        with open(os.path.join(env_path, "log"), "w") as f:
+            f.write("INFO: executing.\n" * self.details * 4)
+
+        for i in range(self.details):
+            with open(os.path.join(details_dir, f"test_{i}"), "w") as f:
+                f.write("output:\n\nconstable:\n" + "x" * 1024 + "\ndmesg:\n" + "y" * 1024 + "\n")
+
+        return self.__tree_size(os.path.join(env_path, "results"))[0] + os.path.getsize(os.path.join(env_path, "log"))
+
+    @staticmethod
+    def __tree_size(path):
+        """
+        @param path: local directory.
+        @return: total size of files and number of files.
+        """
+        size = 0
+        count = 0
+        for subdir, dirs, files in os.walk(path):
+            for f in files:
+                size += os.path.getsize(os.path.join(subdir, f))
+                count += 1
+        return size, count
+
+
+def format_report(measurements, latency):
+    """
+    Formats measurements into readable table.
+
+    @param measurements: list of measurement dictionaries.
+    @param latency: injected latency in seconds.
+    @return: report string.
+    """
+    lines = [
+        f"SSHManager benchmark, injected latency: {latency * 1000:.1f} ms",
+        f"{'workload':<18}{'runs':>6}{'mean [s]':>11}{'min [s]':>10}{'MB/s':>9}{'ops':>7}{'ops/s':>10}{'round trips':>13}",
+    ]
+    for m in measurements:
+        lines.append(
+            f"{m['workload']:<18}{m['runs']:>6}{m['mean_s']:>11.3f}{m['min_s']:>10.3f}"
+            f"{m['throughput_mb_s']:>9.2f}{m['ops']:>7}{m['ops_s']:>10.1f}{m['round_trips']:>13}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,320 @@
+import os
+import socket
+import subprocess
+import threading
+import time
+
+import paramiko as p
+
+
+class RequestCounter:
+    """
+    Thread safe counter of requests served by LocalSSHServer.
+    Every counted request is one client-server round trip.
+    """
+
+    def __init__(self, latency=0.0):
+        """
+        @param latency: delay in seconds injected into every counted request.
+        """
+        self.latency = latency
+        self.__lock = threading.Lock()
+        self.__counts = {}
+
+    def hit(self, kind):
+        """
+        Registers request and sleeps for configured latency.
+
+        @param kind: request kind, e.g. 'sftp' or 'exec'.
+        """
+        with self.__lock:
+            self.__counts[kind] = self.__counts.get(kind, 0) + 1
+
+        if self.latency:
+            time.sleep(self.latency)
+
+    def snapshot(self):
+        """
+        @return: copy of current counts.
+        """
+        with self.__lock:
+            return dict(self.__counts)
+
+    def reset(self):
+        """
+        Clears all counts.
+        """
+        with self.__lock:
+            self.__counts = {}
+
+
+class _ServerInterface(p.ServerInterface):
+    """
+    Password authenticated server interface allowing sessions, exec requests and SFTP subsystem.
+    """
+
+    def __init__(self, server):
+        self.__server = server
+
+    def check_auth_password(self, username, password):
+        if username == self.__server.username and password == self.__server.password:
+            return p.AUTH_SUCCESSFUL
+        return p.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return p.OPEN_SUCCEEDED
+        return p.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel, command):
+        self.__server.counter.hit("exec")
+
+        th = threading.Thread(target=self.__server.run_command, args=(channel, command.decode()), daemon=True)
+        th.start()
+        return True
+
+    def check_channel_subsystem_request(self, channel, name):
+        self.__server.counter.hit("channel")
+        return super().check_channel_subsystem_request(channel, name)
+
+
+class _SFTPHandle(p.SFTPHandle):
+    """
+    File handle for local SFTP server, counts every chunk read or written.
+    """
+
+    def __init__(self, counter, flags=0):
+        super().__init__(flags)
+        self.__counter = counter
+
+    def read(self, offset, length):
+        self.__counter.hit("sftp")
+        return super().read(offset, length)
+
+    def write(self, offset, data):
+        self.__counter.hit("sftp")
+        return super().write(offset, data)
+
+    def stat(self):
+        self.__counter.hit("sftp")
+        try:
+            return p.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+        except OSError as e:
+            return p.SFTPServer.convert_errno(e.errno)
+
+    def chattr(self, attr):
+        return p.SFTP_OK
+
+
+class _SFTPServer(p.SFTPServerInterface):
+    """
+    SFTP server confined to root directory of LocalSSHServer.
+    Remote paths are real local paths, requests outside of root are refused.
+    """
+
+    def __init__(self, server, local_server, *args, **kwargs):
+        super().__init__(server, *args, **kwargs)
+        self.__root = local_server.root
+        self.__counter = local_server.counter
+
+    def __path(self, path):
+        """
+        Maps remote path to local path and validates it is inside root.
+
+        @param path: remote path.
+        @return: local path or None if path is outside of root.
+        """
+        path = os.path.realpath(path)
+        if path != self.__root and not path.startswith(self.__root + os.sep):
+            return None
+        return path
+
+    def __call(self, path, action):
+        """
+        Counts request, validates path and runs action converting OS errors to SFTP errors.
+
+        @param path: remote path.
+        @param action: callable receiving local path.
+        @return: action result or SFTP error code.
+        """
+        self.__counter.hit("sftp")
+
+        local = self.__path(path)
+        if local is None:
+            return p.SFTP_PERMISSION_DENIED
+        try:
+            return action(local)
+        except OSError as e:
+            return p.SFTPServer.convert_errno(e.errno)
+
+    def canonicalize(self, path):
+        return os.path.realpath(path if os.path.isabs(path) else os.path.join(self.__root, path))
+
+    def list_folder(self, path):
+        def action(local):
+            result = []
+            for f in os.listdir(local):
+                attr = p.SFTPAttributes.from_stat(os.stat(os.path.join(local, f)))
+                attr.filename = f
+                result.append(attr)
+            return result
+
+        return self.__call(path, action)
+
+    def stat(self, path):
+        return self.__call(path, lambda local: p.SFTPAttributes.from_stat(os.stat(local)))
+
+    def lstat(self, path):
+        return self.__call(path, lambda local: p.SFTPAttributes.from_stat(os.lstat(local)))
+
+    def open(self, path, flags, attr):
+        def action(local):
+            fd = os.open(local, flags, 0o666)
+            if flags & os.O_WRONLY:
+                mode = "ab" if flags & os.O_APPEND else "wb"
+            elif flags & os.O_RDWR:
+                mode = "a+b" if flags & os.O_APPEND else "r+b"
+            else:
+                mode = "rb"
+
+            f = os.fdopen(fd, mode)
+            handle = _SFTPHandle(self.__counter, flags)
+            handle.filename = local
+            handle.readfile = f
+            handle.writefile = f
+            return handle
+
+        return self.__call(path, action)
+
+    def remove(self, path):
+        return self.__call(path, lambda local: os.remove(local) or p.SFTP_OK)
+
+    def rename(self, oldpath, newpath):
+        local_new = self.__path(newpath)
+        if local_new is None:
+            return p.SFTP_PERMISSION_DENIED
+        return self.__call(oldpath, lambda local: os.rename(local, local_new) or p.SFTP_OK)
+
+    def mkdir(self, path, attr):
+        return self.__call(path, lambda local: os.mkdir(local) or p.SFTP_OK)
+
+    def rmdir(self, path):
+        return self.__call(path, lambda local: os.rmdir(local) or p.SFTP_OK)
+
+    def chattr(self, path, attr):
+        return self.__call(path, lambda local: p.SFTP_OK)
+
+
+class LocalSSHServer:
+    """
+    In-process SSH/SFTP server listening on localhost and backed by a local directory.
+    Used for reproducible benchmarks of SSHManager without a Medusa target.
+
+    Exec requests are run as local shell commands with root directory as working directory.
+    Every SFTP request, exec request and subsystem channel is counted as one round trip
+    and delayed by injected latency.
+    """
+
+    def __init__(self, root, username="mte", password="mte", latency=0.0):
+        """
+        @param root: local directory served as remote file system.
+        @param username: accepted username.
+        @param password: accepted password.
+        @param latency: injected latency per round trip in seconds.
+        """
+        self.root = os.path.realpath(root)
+        self.username = username
+        self.password = password
+        self.counter = RequestCounter(latency)
+
+        self.host = "127.0.0.1"
+        self.port = None
+
+        self.__host_key = p.RSAKey.generate(2048)
+        self.__socket = None
+        self.__thread = None
+        self.__transports = []
+        self.__running = False
+
+    def start(self):
+        """
+        Binds random free port on localhost and starts accepting connections in background thread.
+        """
+        self.__socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.__socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.__socket.bind((self.host, 0))
+        self.__socket.listen(16)
+        self.__socket.settimeout(0.5)
+        self.port = self.__socket.getsockname()[1]
+
+        self.__running = True
+        self.__thread = threading.Thread(target=self.__accept_loop, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """
+        Stops accepting connections and closes all open transports.
+        """
+        self.__running = False
+        if self.__thread:
+            self.__thread.join()
+
+        for t in self.__transports:
+            t.close()
+        self.__transports = []
+
+        if self.__socket:
+            self.__socket.close()
+
+    def run_command(self, channel, command):
+        """
+        Runs exec request as local shell command and sends output, exit status and EOF to channel.
+        Command runs while reply to exec request may still be pending, so channel is not closed here.
+        Close arriving before the reply fails exec_command of client with 'Channel closed',
+        channel is closed by client once it reads the output, or with transport on stop.
+
+        @param channel: SSH channel of exec request.
+        @param command: shell command.
+        """
+        try:
+            result = subprocess.run(command, shell=True, cwd=self.root, capture_output=True)
+            channel.sendall(result.stdout)
+            channel.sendall_stderr(result.stderr)
+            channel.send_exit_status(result.returncode)
+        except Exception:
+            channel.send_exit_status(255)
+        finally:
+            channel.shutdown_write()
+
+    def __accept_loop(self):
+        """
+        Accepts incoming connections and starts SSH transport for each of them.
+        """
+        while self.__running:
+            try:
+                client, _ = self.__socket.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            self.counter.hit("connect")
+
+            transport = p.Transport(client)
+            transport.add_server_key(self.__host_key)
+            transport.set_subsystem_handler("sftp", p.SFTPServer, _SFTPServer, self)
+            transport.start_server(server=_ServerInterface(self))
+
+            # Drop closed transports of previous connections
+            self.__transports = [t for t in self.__transports if t.is_active()]
+            self.__transports.append(transport)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
@@ -0,0 +1,157 @@
+import os
+import shutil
+import stat
+import tempfile
+import time
+
+from mte.ssh_manager import SSHManager
+
+
+class TransportTuner:
+    """
+    Tries transport profiles against configured target with synthetic upload and download workload
+    and chooses the fastest one.
+
+    Workload is uploaded as done by SSHManager.transfer and downloaded back file by file over SFTP.
+    Synthetic tree mixes compressible source-like files with incompressible binaries and one large file,
+    so both compression and window size are exercised.
+    """
+
+    def __init__(self, host, port, username, password, remote_dir, repeat=2,
+                 tree_dirs=10, tree_files=20, file_size=8192, large_file_size=8 * 1024 * 1024):
+        """
+        @param host: target IP address or hostname.
+        @param port: target SSH port.
+        @param username: target SSH username.
+        @param password: target SSH password.
+        @param remote_dir: temporary directory on target, removed after tuning.
+        @param repeat: number of runs of workload for each profile, the fastest run counts.
+        @param tree_dirs: number of directories in synthetic tree.
+        @param tree_files: number of files in each directory.
+        @param file_size: size of each small file in bytes.
+        @param large_file_size: size of large file in bytes.
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.remote_dir = remote_dir
+        self.repeat = repeat
+        self.tree_dirs = tree_dirs
+        self.tree_files = tree_files
+        self.file_size = file_size
+        self.large_file_size = large_file_size
+
+    def run(self, profiles):
+        """
+        Measures workload with each profile.
+
+        @param profiles: dictionary of profile name to transport settings.
+        @return: list of measurements sorted from the fastest, profile failing to connect is left out.
+        """
+        measurements = []
+        work_dir = tempfile.mkdtemp(prefix="mte-tune-")
+        try:
+            tree = os.path.join(work_dir, "tree")
+            size = self.__create_tree(tree)
+
+            for name, settings in profiles.items():
+                ssh = SSHManager(self.host, self.port, self.username, self.password, settings)
+                try:
+                    ssh.connect()
+                except Exception:
+                    continue
+
+                runs = []
+                try:
+                    for _ in range(self.repeat):
+                        ssh.exec(f"rm -rf {self.remote_dir} && mkdir -p {self.remote_dir}")
+                        runs.append(self.__measure(ssh, tree, os.path.join(work_dir, "download")))
+                finally:
+                    ssh.exec(f"rm -rf {self.remote_dir}", log_error=False)
+                    ssh.disconnect()
+
+                upload, download = min(runs, key=sum)
+                measurements.append({
+                    "profile": name,
+                    "upload_s": upload,
+                    "download_s": download,
+                    "total_s": upload + download,
+                    "throughput_mb_s": 2 * size / (upload + download) / 1024 ** 2
+                })
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        return sorted(measurements, key=lambda m: m["total_s"])
+
+    def __measure(self, ssh, tree, download_dir):
+        """
+        Uploads tree and downloads it back.
+
+        @return: upload and download time in seconds.
+        """
+        shutil.rmtree(download_dir, ignore_errors=True)
+
+        start = time.perf_counter()
+        ssh.transfer(tree, self.remote_dir, False)
+        upload = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sftp = ssh.ssh.open_sftp()
+        self.__download(sftp, f"{self.remote_dir}/tree", download_dir)
+        sftp.close()
+        download = time.perf_counter() - start
+
+        return upload, download
+
+    def __download(self, sftp, remote_path, local_path):
+        """
+        Downloads remote directory recursively.
+        """
+        os.makedirs(local_path, exist_ok=True)
+        for entry in sftp.listdir_attr(remote_path):
+            remote = f"{remote_path}/{entry.filename}"
+            local = os.path.join(local_path, entry.filename)
+            if stat.S_ISDIR(entry.st_mode):
+                self.__download(sftp, remote, local)
+            else:
+                sftp.get(remote, local)
+
+    def __create_tree(self, path):
+        """
+        Creates synthetic tree, every other directory holds source-like text files, others random binaries.
+
+        @param path: root of tree.
+        @return: total size of tree in bytes.
+        """
+        text = "".join(f"static int check_{i}(struct medusa_l1 *m) {{ return m->value_{i % 7}; }}\n" for i in range(1000))
+        text = (text * (self.file_size // len(text) + 1))[:self.file_size].encode()
+        binary = os.urandom(self.file_size)
+
+        for d in range(self.tree_dirs):
+            dir_path = os.path.join(path, f"dir_{d}")
+            os.makedirs(dir_path)
+            payload = text if d % 2 == 0 else binary
+            for f in range(self.tree_files):
+                with open(os.path.join(dir_path, f"file_{f}"), "wb") as fp:
+                    fp.write(payload)
+
+        with open(os.path.join(path, "large.bin"), "wb") as fp:
+            fp.write(os.urandom(self.large_file_size // 2) + text * (self.large_file_size // 2 // len(text)))
+
+        return sum(os.path.getsize(os.path.join(s, f)) for s, _, files in os.walk(path) for f in files)
+
+
+def format_tuning(measurements):
+    """
+    Formats tuning measurements into readable table.
+
+    @param measurements: measurements sorted from the fastest.
+    @return: report string.
+    """
+    lines = [f"{'profile':<16}{'upload [s]':>12}{'download [s]':>14}{'total [s]':>11}{'MB/s':>9}"]
+    for m in measurements:
+        lines.append(
+            f"{m['profile']:<16}{m['upload_s']:>12.3f}{m['download_s']:>14.3f}{m['total_s']:>11.3f}{m['throughput_mb_s']:>9.2f}"
+        )
+    return "\n".join(lines)
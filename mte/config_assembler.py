@@ -0,0 +1,50 @@
+from mte.constable_rules import KNOWN_HOOKS, lint_rules, parse_hooks, parse_spaces
+from mte.logger import Logger
+
+
+class ConfigAssembler:
+    """
+    Assembles final medusa.conf from rendered template and Constable rules of tests and lints the rules on host,
+    so broken tests fail before transfer to target.
+    Assembled configurations and lint results are cached for lifetime of assembler, i.e. one plan compilation.
+    """
+    __logger = Logger()
+
+    def __init__(self, template):
+        """
+        Initializes ConfigAssembler.
+
+        @param template: rendered medusa-template.conf.
+        """
+        self.__template = template
+        self.__spaces = parse_spaces(template)
+        self.__hooks = KNOWN_HOOKS | parse_hooks(template)
+        self.__lint_cache = {}
+        self.__config_cache = {}
+
+    def lint(self, rules):
+        """
+        Lints Constable rules of test against template.
+
+        @param rules: Constable rules snippet.
+        @return: list of issues, empty if rules are valid.
+        """
+        # Template is fixed for lifetime of assembler, so rules alone identify result
+        rules = rules or ""
+        if rules not in self.__lint_cache:
+            self.__lint_cache[rules] = lint_rules(rules, self.__spaces, self.__hooks)
+        return self.__lint_cache[rules]
+
+    def assemble(self, snippets):
+        """
+        Assembles configuration from template and rule snippets. Duplicate snippets are added only once.
+
+        @param snippets: rule snippets in order.
+        @return: assembled configuration.
+        """
+        unique = tuple(dict.fromkeys(s for s in snippets if s))
+        if unique not in self.__config_cache:
+            self.__config_cache[unique] = self.__template + "".join(s if s.endswith("\n") else s + "\n" for s in unique)
+            self.__logger.debug("Assembled Constable configuration of %s rule snippets.", len(unique))
+        return self.__config_cache[unique]
+
@@ -0,0 +1,207 @@
+"""
+Helpers for parsing Constable configuration rules and Medusa kernel changes.
+"""
+
+import re
+
+# Keywords starting blocks which are not rules
+NON_RULE_KEYWORDS = ["function", "space", "tree", "primary"]
+
+# Access and event types of Medusa usable as hooks in rules
+KNOWN_HOOKS = {
+    "afterexec", "capable", "chmod", "chown", "create", "exec", "fexec", "fork", "getfile", "getipc",
+    "getprocess", "init_process", "ipc_associate", "ipc_ctl", "ipc_msgrcv", "ipc_msgsnd", "ipc_permission",
+    "ipc_semop", "ipc_shmat", "kill", "link", "lookup", "mkdir", "mknod", "notify_change", "open",
+    "permission", "readlink", "rename", "rmdir", "sendsig", "setresuid", "sexec", "socket_accept",
+    "socket_bind", "socket_connect", "socket_create", "socket_listen", "socket_recvmsg", "socket_sendmsg",
+    "symlink", "truncate", "unlink"
+}
+
+# Space declarations, e.g. space allowed = recursive "/tmp/allowed";
+SPACE_DEFINITION = re.compile(r"^\s*space\s+(\w+)\s*=", re.MULTILINE)
+
+# Medusa sources naming access and event types, e.g. security/medusa/l2/acctype_mkdir.c
+MEDUSA_TYPE_FILE = re.compile(r"(?:acctype|evtype)_(\w+?)\.[ch]\b")
+# Medusa L1 hook functions, e.g. medusa_l1_inode_mkdir
+MEDUSA_L1_FUNCTION = re.compile(r"\bmedusa_l1_(\w+)")
+# Medusa L2 access functions, e.g. medusa_mkdir
+MEDUSA_FUNCTION = re.compile(r"\bmedusa_(\w+)\s*\(")
+
+
+def tokenize(config):
+    """
+    Splits configuration into characters outside of comments and strings.
+    String is yielded as single token with its quotes, comment as single space.
+
+    @param config: Constable configuration string.
+    @return: generator of (line, token) tuples.
+    @raise ValueError: on unterminated string or comment.
+    """
+    line = 1
+    i = 0
+    while i < len(config):
+        c = config[i]
+        if c == '"':
+            end = config.find('"', i + 1)
+            while end != -1 and config[end - 1] == "\\":
+                end = config.find('"', end + 1)
+            if end == -1:
+                raise ValueError(f"line {line}: unterminated string")
+            yield line, config[i:end + 1]
+            line += config.count("\n", i, end)
+            i = end + 1
+        elif config.startswith("//", i):
+            end = config.find("\n", i)
+            yield line, " "
+            i = len(config) if end == -1 else end
+        elif config.startswith("/*", i):
+            end = config.find("*/", i + 2)
+            if end == -1:
+                raise ValueError(f"line {line}: unterminated comment")
+            yield line, " "
+            line += config.count("\n", i, end)
+            i = end + 2
+        else:
+            yield line, c
+            if c == "\n":
+                line += 1
+            i += 1
+
+
+def parse_rule_headers(config):
+    """
+    Parses headers of Constable rules: 'subject hook object {'.
+    Only blocks at top level are rules, blocks nested in their bodies (if, else, ...) are skipped.
+
+    @param config: Constable configuration string.
+    @return: list of (subject, hook, object) tuples, object is None if omitted.
+    """
+    headers = []
+    depth = 0
+    header = []
+    try:
+        for _, token in tokenize(config):
+            if token == "{":
+                if depth == 0:
+                    tokens = "".join(header).split(":", 1)[0].split()
+                    if len(tokens) >= 2 and tokens[0] not in NON_RULE_KEYWORDS:
+                        headers.append((tokens[0], tokens[1], tokens[2] if len(tokens) > 2 else None))
+                depth += 1
+                header = []
+            elif token == "}":
+                depth = max(depth - 1, 0)
+                header = []
+            elif depth == 0:
+                # Statements at top level, e.g. space declarations, end with ';'
+                if token == ";":
+                    header = []
+                else:
+                    header.append(token)
+    except ValueError:
+        # Malformed configuration is reported by check_braces
+        pass
+    return headers
+
+
+def parse_hooks(config):
+    """
+    Returns hook names used by Constable rules.
+
+    @param config: Constable configuration string.
+    @return: set of hook names.
+    """
+    return {h[1] for h in parse_rule_headers(config or "")}
+
+
+def hooks_from_diff(diff):
+    """
+    Collects identifiers of Medusa hooks touched by kernel diff.
+    Uses names of changed acctype/evtype sources and names of Medusa functions in changed hunks.
+
+    @param diff: unified diff text.
+    @return: set of candidate hook identifiers.
+    """
+    candidates = set()
+    for line in diff.splitlines():
+        if line.startswith(("diff --git", "+++", "---")):
+            candidates.update(MEDUSA_TYPE_FILE.findall(line))
+        elif line.startswith(("@@", "+", "-")):
+            candidates.update(MEDUSA_L1_FUNCTION.findall(line))
+            candidates.update(MEDUSA_FUNCTION.findall(line))
+    return candidates
+
+
+def match_hooks(candidates, hooks):
+    """
+    Resolves candidate identifiers to known hooks.
+    Candidate matches hook if it is equal to it or ends with '_' + hook, e.g. 'inode_mkdir' matches 'mkdir'.
+
+    @param candidates: identifiers, e.g. from hooks_from_diff.
+    @param hooks: known hook names.
+    @return: set of matched hooks.
+    """
+    matched = set()
+    for c in candidates:
+        for h in hooks:
+            if c == h or c.endswith("_" + h):
+                matched.add(h)
+    return matched
+
+
+def parse_spaces(config):
+    """
+    Returns names of spaces declared in Constable configuration.
+
+    @param config: Constable configuration string.
+    @return: set of space names.
+    """
+    return set(SPACE_DEFINITION.findall(config or ""))
+
+
+def check_braces(config):
+    """
+    Checks that braces of configuration are balanced. Braces in strings and comments are ignored.
+
+    @param config: Constable configuration string.
+    @return: list of issues.
+    """
+    depth = 0
+    try:
+        for line, token in tokenize(config):
+            if token == "{":
+                depth += 1
+            elif token == "}":
+                depth -= 1
+                if depth < 0:
+                    return [f"line {line}: unexpected '}}'"]
+    except ValueError as e:
+        return [str(e)]
+
+    if depth > 0:
+        return [f"{depth} unclosed '{{'"]
+    return []
+
+
+def lint_rules(rules, spaces, hooks=None):
+    """
+    Runs structural lint of Constable rules: balanced braces, known spaces and known hook names in rule headers.
+
+    @param rules: Constable rules snippet.
+    @param spaces: names of spaces known from template, spaces declared by snippet are added.
+    @param hooks: known hook names, defaults to KNOWN_HOOKS.
+    @return: list of issues, empty if snippet is valid.
+    """
+    if not rules:
+        return []
+
+    hooks = KNOWN_HOOKS if hooks is None else hooks
+    known_spaces = set(spaces) | parse_spaces(rules) | {"*"}
+
+    issues = check_braces(rules)
+    for subject, hook, obj in parse_rule_headers(rules):
+        if hook not in hooks:
+            issues.append(f"unknown hook '{hook}'")
+        for space in [subject, obj]:
+            if space is not None and not space.startswith('"') and space not in known_spaces:
+                issues.append(f"unknown space '{space}' in rule '{subject} {hook}'")
+    return issues
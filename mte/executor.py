@@ -1,38 +1,64 @@
-import threading as th
+import asyncio
+import json
+import os
 import time
 
 from mte.config_manager import ConfigurationManager
+from mte.constable_rules import hooks_from_diff
+from mte.executor_core import ExecutorCore
+from mte.history_manager import HistoryManager
 from mte.logger import Logger
+from mte.plan_compiler import unit_key
 from mte.remote_manager import RemoteManager
+from mte.scheduler import TestScheduler
 from mte.ssh_manager import SSHManager
+from mte.transport import resolve_transport
+from mte.target_session import TargetSession
+from mte.test_key import test_key
 from mte.test_manager import TestManager
 
 
 class TestExecutor:
     """
     Main execution node. Represents interface for execution process for application.
+    Synchronous interface over coroutines run by ExecutorCore, operations return concurrent futures.
     """
     __logger = Logger()
 
-    __connection_thread = None
-    __execution_thread = None
+    __connection_future = None
+    __execution_future = None
 
     __connection_active = False
+    __on_progress = None
 
-    def __init__(self):
+    def __init__(self, options=None):
         """
         Initializes TestExecutor.
         Reads config using ConfigManger and create RemoteManager, SSHManager and VMManager.
+
+        @param options: run options, e.g. 'full_run' to run also unchanged previously passed tests,
+        'hooks' and 'hooks_diff' to select tests affected by changed hooks,
+        'time_budget' in seconds to run only most valuable tests fitting into it,
+        'clones' number of linked clones of VM to run tests on in parallel.
         """
+        self.__options = options or {}
+
         self.__logger.info("Loading configuration...")
 
         # Load configuration
         config = ConfigurationManager().get_config()
         self.__client_config = config['target']
         self.__environment_config = config['env']
+        self.__metrics_config = config['metrics'] if config.has_section('metrics') else {}
+        self.__scheduler_config = config['scheduler'] if config.has_section('scheduler') else {}
+        self.__watchdog_config = config['watchdog'] if config.has_section('watchdog') else {}
+        self.__transport = resolve_transport(config)
         self.__logger.info("Configuration loaded.")
 
         self.__logger.info("Running setup...")
+        # Create asyncio core, its pool runs blocking SSH and Virtual Box calls
+        self.__core = ExecutorCore(int(self.__client_config.get("io_workers", 8)))
+
         # Create remote manager
         self.__remote_manager = RemoteManager(
             vm_name=self.__client_config['name'],
@@ -40,7 +66,8 @@ class TestExecutor:
             port=self.__client_config['port'],
             username=self.__client_config['username'],
             password=self.__client_config['password'],
-            using_vb=self.__client_config.getboolean("using_vb")
+            using_vb=self.__client_config.getboolean("using_vb"),
+            snapshot=self.__client_config.get("snapshot") or None
         )
 
         # Create test manager
@@ -51,8 +78,20 @@ class TestExecutor:
             self.__client_config["ip"],
             self.__client_config["port"],
             self.__client_config["username"],
-            self.__client_config["password"]
+            self.__client_config["password"],
+            self.__transport
+        )
+
+        # Create history manager
+        self.__history_manager = HistoryManager(
+            float(self.__metrics_config.get("regression_threshold", 10))
         )
+        self.__target_info = {}
+        self.__fingerprints = {}
+
+        # Sessions of targets, single target or linked clones
+        self.__sessions = []
+        self.__clones = []
 
         self.__logger.info("Setup complete.")
 
@@ -66,15 +105,41 @@ class TestExecutor:
         tests = self.__test_manager.list_tests()
         self.__logger.info("Tests have been loaded.")
 
+        # Select tests affected by changed hooks
+        hooks = self.__get_hooks()
+        if hooks is not None:
+            self.__test_manager.select_by_hooks(tests, hooks)
+
         return tests
 
+    def __get_hooks(self):
+        """
+        Collects hooks from 'hooks' option and from kernel diff file in 'hooks_diff' option.
+
+        @return: set of hook identifiers or None if hook selection is not requested.
+        """
+        hooks_option = self.__options.get("hooks")
+        diff_path = self.__options.get("hooks_diff")
+        if hooks_option is None and diff_path is None:
+            return None
+
+        hooks = set(hooks_option or [])
+        if diff_path:
+            try:
+                with open(diff_path, "r") as f:
+                    hooks.update(hooks_from_diff(f.read()))
+            except Exception as e:
+                self.__logger.error(e, f"Failed to read kernel diff: {diff_path}")
+
+        return hooks
+
     def check_execution_status(self):
         """
         Returns information if execution thread is still running.
 
-        @return: if execution thread is done.
+        @return: if execution is done.
         """
-        return not self.__execution_thread.is_alive()
+        return self.__execution_future is None or self.__execution_future.done()
 
     def check_connection_status(self):
         """
@@ -82,7 +147,7 @@ class TestExecutor:
 
         @return: if connection is done.
         """
-        return not self.__connection_thread.is_alive()
+        return self.__connection_future is None or self.__connection_future.done()
 
     def get_results(self):
         """
@@ -97,132 +162,334 @@ class TestExecutor:
         return results
     def establish_connection(self):
         """
-        Starts connection thread.
+        Starts connection to targets.
+
+        @return: future resolved with True when connection is established, False if connection failed.
         """
-        self.__connection_thread = th.Thread(target=self.__connection_thread_target)
-        self.__connection_thread.start()
+        self.__connection_future = self.__core.submit(self.__connect())
+        return self.__connection_future
 
-    def execute(self, selected_tests):
+    def execute(self, selected_tests, on_progress=None):
         """
-        If connection is established, starts execution thread.
+        If connection is established and no execution is running, starts execution.
 
         @param selected_tests: tests to run.
-        @return: if execution thread started.
+        @param on_progress: callback called from event loop with each progress event of runner,
+        dictionary with event, name, src, time and target keys, must not block.
+        @return: future resolved with structured results when execution is done, None if execution was not started.
         """
-        if not self.__connection_active:
-            return False
+        if not self.__connection_active or not self.check_execution_status():
+            return None
 
-        self.__execution_thread = th.Thread(target=self.__execution_thread_target, args=(selected_tests,))
-        self.__execution_thread.start()
+        self.__on_progress = on_progress
+        self.__execution_future = self.__core.submit(self.__execute(selected_tests))
 
-        return True
+        return self.__execution_future
 
-    def __connection_thread_target(self):
+    def close(self):
+        """
+        Stops asyncio core, execution must not be running.
         """
-        Target function for connection thread.
-        1. Checks connection with target.
-        2. Creates ssh connection.
+        self.__core.close()
+
+    def __report_progress(self, event):
+        """
+        Passes progress event of session to callback of running execution.
+
+        @param event: progress event.
+        """
+        if self.__on_progress:
+            self.__on_progress(event)
+
+    async def __connect(self):
+        """
+        Connection coroutine.
+        1. Creates linked clones of VM, if configured.
+        2. Checks connection with targets, clones boot in parallel.
+        3. Creates ssh connections.
+
+        @return: if connection was established.
         """
         try:
-            self.__logger.info("Establishing connection to target...")
-            self.__remote_manager.connect()
+            clones = self.__clone_count()
+            if clones >= 1:
+                self.__logger.info("Creating %s linked clones of virtual machine...", clones)
+                self.__sessions = await self.__create_clones(clones)
+            else:
+                self.__sessions = [TargetSession(
+                    self.__core,
+                    self.__remote_manager,
+                    self.__ssh_manager,
+                    self.__test_manager,
+                    self.__environment_config,
+                    self.__watchdog_config,
+                    on_progress=self.__report_progress
+                )]
 
-            self.__ssh_manager.connect()
+            self.__logger.info("Establishing connection to target...")
+            await self.__connect_sessions()
             self.__logger.info("Connection to target was established.")
 
+            # Identify target build for history records, clones share build of base VM
+            self.__target_info = await self.__sessions[0].get_target_info(self.__environment_config.get("medusaDir"))
+            self.__logger.debug("Target kernel: %s, Medusa: %s", self.__target_info["kernel"], self.__target_info["medusa"])
+
             # Set flag to signalize that connection is ready.
             self.__connection_active = True
-        except:
-            quit(1)
+        except Exception:
+            await self.__core.call(self.__delete_clones)
+
+        return self.__connection_active
 
-    def __check_execution_status(self):
+    def __clone_count(self):
         """
-        Helper function for execution.
-        Runs pgrep for executor in while with 5s pauses.
-        Call has timeout set for 10s, if it fails, it means that host is iresponsive -> frozen.
-        If pgrep returns 1 -> executor has finished, then checks exit file on remote for execution result status.
+        @return: number of linked clones from 'clones' option or configuration, 0 if not using Virtual Box.
         """
-        env_dir = self.__environment_config["environmentDir"]
+        if not self.__client_config.getboolean("using_vb"):
+            return 0
+
+        clones = self.__options.get("clones")
+        if clones is None:
+            clones = int(self.__client_config.get("clones", 0) or 0)
+        return clones
 
-        self.__ssh_manager.disconnect()
-        time.sleep(5)
+    async def __create_clones(self, count):
+        """
+        Creates linked clones of base VM, each with its own forwarded SSH port and session.
 
-        while True:
-            self.__logger.info("Validating remote...")
+        @param count: number of clones.
+        @return: list of sessions of clones.
+        """
+        base_port = int(self.__client_config.get("clone_base_port", 3100))
+        prepare_lock = asyncio.Lock()
+
+        sessions = []
+        for i in range(count):
+            name = f"{self.__client_config['name']}-mte-{i + 1}"
+            port = base_port + i
+            remote_manager = await self.__core.call(self.__remote_manager.create_linked_clone, name, port)
+            self.__clones.append(remote_manager)
+
+            sessions.append(TargetSession(
+                self.__core,
+                remote_manager,
+                SSHManager(
+                    self.__client_config["ip"],
+                    port,
+                    self.__client_config["username"],
+                    self.__client_config["password"],
+                    self.__transport
+                ),
+                self.__test_manager,
+                self.__environment_config,
+                self.__watchdog_config,
+                prepare_lock,
+                name,
+                self.__report_progress
+            ))
+        return sessions
+
+    async def __connect_sessions(self):
+        """
+        Connects all sessions concurrently, so clones boot at the same time.
+        """
+        errors = [e for e in await asyncio.gather(*(s.connect() for s in self.__sessions), return_exceptions=True) if e]
+        if errors:
+            raise errors[0]
 
+    def __delete_clones(self):
+        """
+        Deletes linked clones created for testing.
+        """
+        for c in self.__clones:
             try:
-                # Test connection
-                self.__ssh_manager.connect()
+                c.delete_vm()
+            except Exception:
+                pass
 
-                # Check if still runnning
-                try:
-                    self.__ssh_manager.exec("pgrep medusaTestsExec", timeout=True, log_error=False)
-                except IOError:
-                    # pgrep returned 1 = proces stopped
-                    break
+        if self.__clones:
+            self.__logger.info("Deleted %s linked clones.", len(self.__clones))
+        self.__clones = []
 
-                self.__ssh_manager.disconnect()
-            except:
-                self.__ssh_manager.disconnect()
-                self.__logger.error(OSError, "Remote is not responding, remote is most likely frozen.")
+    def __select_changed(self, tests, env_dir):
+        """
+        Fingerprints tests and leaves out tests whose fingerprint matches previous pass.
+        In full run mode, all tests are kept.
+
+        @param tests: selected tests.
+        @param env_dir: remote testing location.
+        @return: tests to run.
+        """
+        self.__fingerprints = self.__test_manager.fingerprint_tests(tests, env_dir, self.__target_info)
+
+        if self.__options.get("full_run"):
+            return tests
+
+        passed = self.__history_manager.load_fingerprints()
+        changed = []
+        for t in tests:
+            key = test_key(t)
+            if passed.get(key) == self.__fingerprints[key]:
+                self.__logger.debug("Skipping unchanged test: %s", t["name"])
+            else:
+                changed.append(t)
 
-            time.sleep(5)
+        skipped = len(tests) - len(changed)
+        if skipped:
+            self.__logger.info("Skipping %s unchanged previously passed tests. Use --full to run them.", skipped)
 
-        result = self.__ssh_manager.exec(f"cat {env_dir}/exit")
-        if result != "SUCCESS":
-            self.__ssh_manager.download_results(env_dir, True)
-            self.__logger.error(IOError("Test failed."), "Execution on remote resulted in error")
+        return changed
 
-    def __execution_thread_target(self, selected_tests):
+    def __schedule(self, tests):
         """
-        Execution thread target. Starts testing process:
-        1. Prepares test and files for transfer.
-        2. Prepares environment on remote.
-        3. Runs test execution in background.
-        4. Waits for execution process to stop.
+        Orders tests by historical failure rate and duration and applies time budget, if set.
 
-        @param selected_tests: tests to prepare and run.
+        Budget of parallel run is multiplied by number of targets.
+
+        @param tests: tests to schedule.
+        @return: scheduled tests and scheduler.
         """
-        env_dir = self.__environment_config["environmentDir"]
+        statistics = self.__history_manager.test_statistics(int(self.__scheduler_config.get("history_runs", 20)))
+        scheduler = TestScheduler(statistics, float(self.__scheduler_config.get("default_duration", 60)))
+
+        budget = self.__options.get("time_budget")
+        if budget is not None:
+            budget *= len(self.__sessions)
 
-        # Prepare tests
-        self.__logger.info("Preparing selected tests for transfer...")
-        self.__test_manager.prepare_tests(selected_tests, env_dir)
-        self.__logger.info("Tests are ready for transfer.")
+        return scheduler.schedule(tests, test_key, budget), scheduler
 
-        # Prepare env
-        self.__logger.info("Preparing environment on target...")
-        include_git = any(t.get("type") == 'GIT' for t in selected_tests)
-        self.__ssh_manager.prepare_environment(env_dir, include_git)
-        self.__ssh_manager.exec(f"sudo chmod -R 777 {env_dir}")
+    def __merge_results(self, sessions):
+        """
+        Merges results of all sessions, including results of interrupted runs, into local results
+        and records hung tests and tests rejected by lint.
+        If no session finished without error, only logs are copied.
 
-        self.__logger.info("Remote setup is done.")
+        @param sessions: finished sessions.
+        """
+        self.__test_manager.clear_results()
+
+        records = []
+        for s in sessions:
+            prefix = f"log.{s.name}" if s.name else "log"
+            for i, p in enumerate(s.partials):
+                records.extend(self.__read_records(p))
+                self.__test_manager.add_partial_results(p, f"{prefix}.interrupted-{i + 1}")
+            if s.results_dir:
+                records.extend(self.__read_records(s.results_dir))
+                self.__test_manager.add_partial_results(s.results_dir, prefix)
+
+        if all(s.failed for s in sessions):
+            return
+
+        recorded = {test_key(r) for r in records}
+        for s in sessions:
+            for t in s.hung:
+                if test_key(t) in recorded:
+                    continue
+                records.append({"name": t["name"], "src": t.get("src"), "type": t.get("type"), "status": "hung"})
+
+            records.extend(r for key, r in s.rejected.items() if key not in recorded)
+
+        self.__test_manager.write_results({"tests": records})
+
+    @staticmethod
+    def __read_records(results_dir):
+        """
+        Reads structured test records from downloaded results.
 
+        @param results_dir: local directory with downloaded results.
+        @return: list of test records.
+        """
         try:
-            # Execute tests
-            self.__ssh_manager.exec_async(f"{env_dir}/medusaTestsExec.bash &")
-            self.__logger.info("Started testing...")
+            with open(os.path.join(results_dir, "results.json"), "r") as f:
+                return json.load(f)["tests"]
+        except Exception:
+            return []
 
-            # Wait for testing to exit
-            self.__check_execution_status()
+    async def __run_session(self, session, tests, started):
+        """
+        Runs shard of tests in session, marks session as failed on error.
 
-            self.__logger.info("Testing has finished.")
+        @param session: target session.
+        @param tests: tests of shard.
+        @param started: monotonic time of testing start.
+        """
+        try:
+            await session.run(tests, started)
+        except IOError:
+            # Reported by manager
+            session.failed = True
+        except Exception as e:
+            session.failed = True
+            self.__logger.error(e, "Test run failed. See log files for more information.")
 
-            # Download results
-            self.__logger.info("Fetching results...")
-            self.__ssh_manager.download_results(env_dir)
-            self.__logger.info("Results ready.")
+    async def __execute(self, selected_tests):
+        """
+        Execution coroutine. Starts testing process:
+        1. Leaves out unchanged tests and schedules remaining tests.
+        2. Splits tests into shards, one per target session, and runs sessions concurrently.
+        3. Merges results of sessions and records history.
+        4. Deletes linked clones.
 
-            # Clean target
-            self.__logger.info("Running cleanup...")
-            self.__ssh_manager.clean_target(env_dir)
-            self.__logger.info("Cleanup done.")
-        except IOError:
-            pass
+        @param selected_tests: tests to prepare and run.
+        @return: structured results, results without tests if no test was left to run, None if all sessions failed.
+        """
+        env_dir = self.__environment_config["environmentDir"]
+
+        # Skip unchanged tests and order tests by history
+        selected_tests = await self.__core.call(self.__select_changed, selected_tests, env_dir)
+        selected_tests, scheduler = await self.__core.call(self.__schedule, selected_tests)
+        if not selected_tests:
+            self.__logger.info("No selected tests left to run.")
+            for s in self.__sessions:
+                await s.disconnect()
+            await self.__core.call(self.__delete_clones)
+            self.__connection_active = False
+            return {"tests": []}
+
+        if len(self.__sessions) > 1:
+            shards = scheduler.shard(selected_tests, test_key, len(self.__sessions), unit_key)
+        else:
+            shards = [selected_tests]
+
+        started = time.monotonic()
+        results = None
+        try:
+            runs = []
+            for session, shard in zip(self.__sessions, shards):
+                if not shard:
+                    continue
+                if session.name:
+                    self.__logger.info("[%s] Running %s tests.", session.name, len(shard))
+                runs.append((self.__run_session(session, shard, started), session))
+
+            # Errors are logged by sessions, all sessions must end before results are merged
+            await asyncio.gather(*(r for r, _ in runs), return_exceptions=True)
+
+            sessions = [s for _, s in runs]
+            await self.__core.call(self.__merge_results, sessions)
+
+            if not all(s.failed for s in sessions):
+                results = await self.__core.call(self.__record_history)
         except Exception as e:
             self.__logger.error(e, "Test run failed. See log files for more information.")
         finally:
-            self.__ssh_manager.disconnect()
+            for s in self.__sessions:
+                s.discard()
+                await s.disconnect()
+
+            await self.__core.call(self.__delete_clones)
             self.__connection_active = False
 
+        return results
+
+    def __record_history(self):
+        """
+        Records run into history and fingerprints of passed tests.
 
+        @return: structured results of run.
+        """
+        results = self.__test_manager.load_structured_results()
+        self.__history_manager.record_run(self.__target_info, results)
+        self.__history_manager.record_fingerprints(self.__fingerprints, results)
+        return results
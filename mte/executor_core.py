@@ -0,0 +1,62 @@
+import asyncio
+import functools
+import threading as th
+from concurrent.futures import ThreadPoolExecutor
+
+from mte.logger import Logger
+
+
+class ExecutorCore:
+    """
+    Asyncio core of test execution.
+    Runs event loop in single background thread, connections, transfers, remote execution, progress streaming
+    and downloads of all targets are coroutines on this loop. Blocking Paramiko and Virtual Box calls
+    are pushed to bounded thread pool, so number of threads does not grow with number of operations.
+    """
+    __logger = Logger()
+
+    def __init__(self, workers=8):
+        """
+        Initializes ExecutorCore and starts its event loop.
+
+        @param workers: maximum number of blocking calls running at the same time.
+        """
+        self.__pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mte-io")
+        self.__loop = asyncio.new_event_loop()
+        self.__loop.set_default_executor(self.__pool)
+
+        self.__thread = th.Thread(target=self.__loop.run_forever, name="mte-loop", daemon=True)
+        self.__thread.start()
+
+    def submit(self, coroutine):
+        """
+        Schedules coroutine on event loop. Safe to call from any thread.
+
+        @param coroutine: coroutine to run.
+        @return: concurrent future resolved with result of coroutine.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.__loop)
+
+    async def call(self, function, *args, **kwargs):
+        """
+        Runs blocking function in thread pool.
+
+        @param function: blocking function.
+        @param args: positional arguments of function.
+        @param kwargs: keyword arguments of function.
+        @return: result of function.
+        """
+        return await self.__loop.run_in_executor(self.__pool, functools.partial(function, *args, **kwargs))
+
+    def close(self):
+        """
+        Stops event loop and waits for running blocking calls.
+        """
+        if self.__loop.is_closed():
+            return
+
+        self.__loop.call_soon_threadsafe(self.__loop.stop)
+        self.__thread.join()
+        self.__loop.close()
+        self.__pool.shutdown(wait=True)
+        self.__logger.debug("Executor core stopped.")
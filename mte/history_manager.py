@@ -0,0 +1,200 @@
+import json
+import os
+import time
+
+from mte.history_store import HistoryStore
+from mte.logger import Logger
+from mte.test_key import test_key
+
+
+class HistoryManager:
+    """
+    Manages local history of test runs.
+    Results, metrics and target build of every run are appended to SQLite history store (mte/history/history.db).
+    Metrics are compared with previous values to detect performance regressions,
+    result status and duration of tests are used for test scheduling.
+    Fingerprints of passed tests are stored to skip unchanged tests in following runs.
+    """
+    __logger = Logger()
+
+    def __init__(self, regression_threshold=10.0):
+        """
+        Initializes HistoryManager.
+
+        @param regression_threshold: allowed worsening of metric in percent.
+        """
+        file_dir = os.path.dirname(os.path.abspath(__file__))
+        self.__history_dir = os.path.join(file_dir, "history")
+        self.__fingerprints_path = os.path.join(self.__history_dir, "fingerprints.json")
+        db_path = os.path.join(self.__history_dir, "history.db")
+
+        self.regression_threshold = regression_threshold
+
+        os.makedirs(self.__history_dir, exist_ok=True)
+        self.__store = HistoryStore(db_path)
+
+    def record_run(self, target_info, results):
+        """
+        Checks metrics from results for regressions and appends results, metrics and target build to history store.
+
+        @param target_info: target build identification with kernel, build and medusa keys.
+        @param results: structured results.
+        @return: list of detected regressions.
+        """
+        if not results:
+            return []
+
+        entries = self.__to_entries(target_info, results)
+        history = self.__store.load_metrics({e["key"] for e in entries})
+        regressions = self.__find_regressions(entries, history)
+
+        self.__store.record_run(target_info, results)
+        self.__logger.debug("Recorded run with %s tests and %s metrics into history.", len(results.get("tests", [])), len(entries))
+
+        for r in regressions:
+            self.__logger.info(
+                "Regression: %s | %s = %.4g, baseline %.4g (%+.1f %%) on %s/%s", r["key"], r["metric"], r["value"],
+                r["baseline"], r["change"], r["baseline_kernel"], r["baseline_medusa"][:12]
+            )
+
+        return regressions
+
+    def load_metrics(self):
+        """
+        Loads all metric entries from history store.
+
+        @return: list of metric entries in recording order.
+        """
+        return self.__store.load_metrics()
+
+    def test_statistics(self, last_runs=20):
+        """
+        Computes failure counts and mean durations of tests from their last runs.
+
+        @param last_runs: number of most recent runs of each test to use.
+        @return: dictionary of test key to dictionary with runs, failures and duration (None if unknown).
+        """
+        stats = {}
+        for key, entries in self.__store.test_runs(last_runs).items():
+            durations = [e["duration"] for e in entries if e.get("duration") is not None]
+            stats[key] = {
+                "runs": len(entries),
+                "failures": sum(1 for e in entries if e["status"] != "success"),
+                "duration": sum(durations) / len(durations) if durations else None
+            }
+        return stats
+
+    def get_store(self):
+        """
+        @return: HistoryStore of run history for queries.
+        """
+        return self.__store
+
+    def load_fingerprints(self):
+        """
+        Loads fingerprints of previously passed tests.
+
+        @return: dictionary of test key to fingerprint.
+        """
+        if not os.path.exists(self.__fingerprints_path):
+            return {}
+
+        with open(self.__fingerprints_path, "r") as f:
+            return json.load(f)
+
+    def record_fingerprints(self, fingerprints, results):
+        """
+        Stores fingerprints of passed tests and drops fingerprints of tests which did not pass.
+
+        @param fingerprints: dictionary of test key to fingerprint of executed tests.
+        @param results: structured results.
+        """
+        if not results:
+            return
+
+        stored = self.load_fingerprints()
+        for t in results.get("tests", []):
+            key = test_key(t)
+            if key not in fingerprints:
+                continue
+
+            if t["status"] == "success":
+                stored[key] = fingerprints[key]
+            else:
+                stored.pop(key, None)
+
+        os.makedirs(self.__history_dir, exist_ok=True)
+        with open(self.__fingerprints_path, "w") as f:
+            json.dump(stored, f, indent=2)
+
+    @staticmethod
+    def __to_entries(target_info, results):
+        """
+        Converts metrics from structured results into history entries.
+
+        @param target_info: target build identification.
+        @param results: structured results.
+        @return: list of history entries.
+        """
+        if not results:
+            return []
+
+        now = time.time()
+        entries = []
+        for t in results.get("tests", []):
+            for name, metric in t.get("metrics", {}).items():
+                entries.append({
+                    "time": now,
+                    "kernel": target_info.get("kernel"),
+                    "medusa": target_info.get("medusa"),
+                    "key": test_key(t),
+                    "test": t["name"],
+                    "metric": name,
+                    "value": metric["value"],
+                    "better": metric.get("better", "lower")
+                })
+        return entries
+
+    def __find_regressions(self, entries, history):
+        """
+        Compares new entries with baseline from history.
+        Baseline is mean of values from the most recent different build, if there is none,
+        mean of previous values from the same build is used.
+
+        @param entries: new metric entries.
+        @param history: previous metric entries.
+        @return: list of regressions.
+        """
+        regressions = []
+        for e in entries:
+            previous = [h for h in history if h["key"] == e["key"] and h["metric"] == e["metric"]]
+            if not previous:
+                continue
+
+            build = (e["kernel"], e["medusa"])
+            other = [h for h in previous if (h["kernel"], h["medusa"]) != build]
+            if other:
+                last = (other[-1]["kernel"], other[-1]["medusa"])
+                baseline_entries = [h for h in other if (h["kernel"], h["medusa"]) == last]
+            else:
+                baseline_entries = previous
+
+            baseline = sum(h["value"] for h in baseline_entries) / len(baseline_entries)
+            if baseline == 0:
+                continue
+
+            change = (e["value"] - baseline) / abs(baseline) * 100
+            worse = change if e["better"] == "lower" else -change
+
+            if worse > self.regression_threshold:
+                regressions.append({
+                    "key": e["key"],
+                    "test": e["test"],
+                    "metric": e["metric"],
+                    "value": e["value"],
+                    "baseline": baseline,
+                    "change": change,
+                    "baseline_kernel": baseline_entries[-1]["kernel"],
+                    "baseline_medusa": baseline_entries[-1]["medusa"]
+                })
+        return regressions
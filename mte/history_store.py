@@ -0,0 +1,267 @@
+"""
+SQLite store of run history.
+
+Every run is one row of 'runs' with time and target build identification, 'results' holds structured record
+of each test of run and 'metrics' its metric values. Tests are identified by key '<src>::<name>'.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import closing
+
+from mte.test_key import test_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    time REAL NOT NULL,
+    kernel TEXT,
+    build TEXT,
+    medusa TEXT,
+    fingerprint TEXT,
+    environment TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    duration REAL,
+    record TEXT
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL NOT NULL,
+    better TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_time ON runs(time);
+CREATE INDEX IF NOT EXISTS runs_build ON runs(kernel, build);
+CREATE INDEX IF NOT EXISTS results_key ON results(key, run_id);
+CREATE INDEX IF NOT EXISTS results_name ON results(name);
+CREATE INDEX IF NOT EXISTS metrics_key ON metrics(key, metric);
+"""
+
+
+def environment_fingerprint(environment):
+    """
+    @param environment: target build identification.
+    @return: hash identifying environment.
+    """
+    return hashlib.sha256(json.dumps(environment, sort_keys=True).encode()).hexdigest()
+
+
+class HistoryStore:
+    """
+    Indexed store of results, metrics and environment of runs.
+    Each operation opens its own connection, so store can be used from any thread.
+    """
+
+    def __init__(self, path):
+        """
+        @param path: path of database file, created with schema if it does not exist.
+        """
+        self.__path = path
+        with closing(sqlite3.connect(self.__path)) as db:
+            db.executescript(SCHEMA)
+
+    def record_run(self, environment, results):
+        """
+        Appends run with its test records and metrics.
+
+        @param environment: target build identification with kernel, build and medusa keys.
+        @param results: structured results.
+        @return: id of run.
+        """
+        with closing(sqlite3.connect(self.__path)) as db, db:
+            run_id = db.execute(
+                "INSERT INTO runs (time, kernel, build, medusa, fingerprint, environment) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    time.time(),
+                    environment.get("kernel"),
+                    environment.get("build"),
+                    environment.get("medusa"),
+                    environment_fingerprint(environment),
+                    json.dumps(environment, sort_keys=True)
+                )
+            ).lastrowid
+
+            for t in results.get("tests", []):
+                key = test_key(t)
+                db.execute(
+                    "INSERT INTO results (run_id, key, name, status, duration, record) VALUES (?, ?, ?, ?, ?, ?)",
+                    (run_id, key, t["name"], t["status"], t.get("duration"), json.dumps(t))
+                )
+                db.executemany(
+                    "INSERT INTO metrics (run_id, key, name, metric, value, better) VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (run_id, key, t["name"], name, m["value"], m.get("better", "lower"))
+                        for name, m in (t.get("metrics") or {}).items()
+                    ]
+                )
+        return run_id
+
+    def test_runs(self, last_runs=20):
+        """
+        Loads last runs of each test.
+
+        @param last_runs: number of most recent runs of each test.
+        @return: dictionary of test key to list of runs from the oldest, run has time, status, duration,
+        kernel and build keys.
+        """
+        with closing(sqlite3.connect(self.__path)) as db:
+            rows = db.execute(
+                """
+                SELECT key, time, status, duration, kernel, build FROM (
+                    SELECT r.key, runs.time, r.status, r.duration, runs.kernel, runs.build,
+                           ROW_NUMBER() OVER (PARTITION BY r.key ORDER BY runs.time DESC, runs.id DESC) AS n
+                    FROM results r JOIN runs ON runs.id = r.run_id
+                )
+                WHERE n <= ?
+                ORDER BY key, time, n DESC
+                """,
+                (last_runs,)
+            ).fetchall()
+
+        runs = {}
+        for key, run_time, status, duration, kernel, build in rows:
+            runs.setdefault(key, []).append(
+                {"time": run_time, "status": status, "duration": duration, "kernel": kernel, "build": build}
+            )
+        return runs
+
+    def load_metrics(self, keys=None):
+        """
+        Loads metric values in recording order.
+
+        @param keys: keys of tests to load, all tests if not set.
+        @return: list of entries with time, kernel, medusa, key, test, metric, value and better keys.
+        """
+        query = """
+            SELECT runs.time, runs.kernel, runs.medusa, m.key, m.name, m.metric, m.value, m.better
+            FROM metrics m JOIN runs ON runs.id = m.run_id
+        """
+        params = []
+        if keys is not None:
+            keys = list(keys)
+            if not keys:
+                return []
+            query += f" WHERE m.key IN ({', '.join('?' * len(keys))})"
+            params = keys
+        query += " ORDER BY runs.time, runs.id"
+
+        with closing(sqlite3.connect(self.__path)) as db:
+            rows = db.execute(query, params).fetchall()
+
+        return [
+            {
+                "time": r[0], "kernel": r[1], "medusa": r[2], "key": r[3], "test": r[4],
+                "metric": r[5], "value": r[6], "better": r[7]
+            }
+            for r in rows
+        ]
+
+    def pass_rates(self, last_runs=20):
+        """
+        @param last_runs: number of most recent runs of each test.
+        @return: list of dictionaries with test, runs, passed and rate keys, from the lowest pass rate.
+        """
+        rates = []
+        for key, runs in self.test_runs(last_runs).items():
+            passed = sum(1 for r in runs if r["status"] == "success")
+            rates.append({"test": key, "runs": len(runs), "passed": passed, "rate": passed / len(runs)})
+        return sorted(rates, key=lambda r: (r["rate"], r["test"]))
+
+    def flakiest(self, last_runs=20, limit=10):
+        """
+        Finds tests changing between passing and not passing most often.
+        Flakiness is number of changes divided by number of consecutive run pairs.
+
+        @param last_runs: number of most recent runs of each test.
+        @param limit: maximum number of returned tests.
+        @return: list of dictionaries with test, runs, flips, failures and flakiness keys, from the flakiest.
+        """
+        flaky = []
+        for key, runs in self.test_runs(last_runs).items():
+            passed = [r["status"] == "success" for r in runs]
+            flips = sum(1 for a, b in zip(passed, passed[1:]) if a != b)
+            if not flips:
+                continue
+
+            flaky.append({
+                "test": key,
+                "runs": len(runs),
+                "flips": flips,
+                "failures": passed.count(False),
+                "flakiness": flips / (len(runs) - 1)
+            })
+        flaky.sort(key=lambda f: (-f["flakiness"], -f["failures"], f["test"]))
+        return flaky[:limit]
+
+    def duration_trends(self, last_runs=20):
+        """
+        Compares mean duration of older and newer half of last runs of each test.
+
+        @param last_runs: number of most recent runs of each test.
+        @return: list of dictionaries with test, runs, older, newer, change (percent or None) and last keys,
+        from the largest slowdown.
+        """
+        trends = []
+        for key, runs in self.test_runs(last_runs).items():
+            durations = [r["duration"] for r in runs if r["duration"] is not None]
+            if len(durations) < 2:
+                continue
+
+            half = len(durations) // 2
+            older = sum(durations[:half]) / half
+            newer = sum(durations[half:]) / (len(durations) - half)
+            trends.append({
+                "test": key,
+                "runs": len(durations),
+                "older": older,
+                "newer": newer,
+                "change": (newer - older) / older * 100 if older else None,
+                "last": durations[-1]
+            })
+        trends.sort(key=lambda t: (t["change"] is None, -(t["change"] or 0), t["test"]))
+        return trends
+
+
+def format_pass_rates(rates):
+    """
+    @param rates: pass rates from HistoryStore.pass_rates.
+    @return: report string.
+    """
+    lines = [f"{'test':<60}{'runs':>6}{'passed':>8}{'rate [%]':>10}"]
+    for r in rates:
+        lines.append(f"{r['test']:<60}{r['runs']:>6}{r['passed']:>8}{r['rate'] * 100:>10.1f}")
+    return "\n".join(lines)
+
+
+def format_flakiest(flaky):
+    """
+    @param flaky: tests from HistoryStore.flakiest.
+    @return: report string.
+    """
+    lines = [f"{'test':<60}{'runs':>6}{'flips':>7}{'failures':>10}{'flakiness':>11}"]
+    for f in flaky:
+        lines.append(f"{f['test']:<60}{f['runs']:>6}{f['flips']:>7}{f['failures']:>10}{f['flakiness']:>11.2f}")
+    return "\n".join(lines)
+
+
+def format_duration_trends(trends):
+    """
+    @param trends: trends from HistoryStore.duration_trends.
+    @return: report string.
+    """
+    lines = [f"{'test':<60}{'runs':>6}{'older [s]':>11}{'newer [s]':>11}{'change':>10}{'last [s]':>10}"]
+    for t in trends:
+        change = "n/a" if t["change"] is None else f"{t['change']:+.1f} %"
+        lines.append(
+            f"{t['test']:<60}{t['runs']:>6}{t['older']:>11.2f}{t['newer']:>11.2f}{change:>10}{t['last']:>10.2f}"
+        )
+    return "\n".join(lines)
@@ -1,18 +1,64 @@
+import atexit
 import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Size of log file before it is rotated and number of kept rotated files
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 3
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler passing records unformatted, message is formatted by listener thread.
+    """
+    def prepare(self, record):
+        return record
+
+
+class _OutputHandler(logging.Handler):
+    """
+    Handler printing messages of Logger through output handler of application.
+    Records of other loggers, e.g. paramiko, and records marked as file only go only to log file.
+    """
+    def __init__(self, logger):
+        super().__init__()
+        self.__logger = logger
+
+    def emit(self, record):
+        if record.name != Logger.NAME or getattr(record, "file_only", False):
+            return
+
+        stdout = self.__logger.get_stdout()
+        if stdout is None:
+            return
+
+        try:
+            stdout.out(record.getMessage())
+        except Exception:
+            self.handleError(record)
 
 
 class Logger:
     """
     Logger class using the singleton architecture.
     Manages logging of messages and exceptions.
+    Records are passed through queue to background listener, which writes them into rotated log file
+    and prints them through output handler, so callers never wait for log I/O.
+    Messages can have %-style arguments formatted by listener, e.g. logger.debug("Sent %s", path).
 
     Attributes:
         - __instance: represents instances of logger in the whole application
         - __logger: interface for logging into the log file
         - __stdout: represents an output handler for application messages
     """
+    NAME = "mte"
+
     __instance = None
-    __logger = logging.getLogger()
+    __logger = logging.getLogger(NAME)
+    __queue = None
+    __listener = None
 
     def __new__(cls):
         """
@@ -24,39 +70,58 @@ class Logger:
 
     def __init__(self):
         """
-        Assigns output handler.
+        Sets up logging pipeline on first construction.
         """
-        # Set up logging
-        logging.basicConfig(
-            filename="log",
-            filemode="w",
-            level=logging.DEBUG,
-            format="%(asctime)s [%(levelname)s]: %(message)s"
-        )
+        if Logger.__listener is not None:
+            return
 
         self.__stdout = None
         self.__debug = False
 
+        # Keep log of previous run as rotated file
+        file_handler = RotatingFileHandler("log", maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, delay=True)
+        if os.path.exists("log") and os.path.getsize("log") > 0:
+            file_handler.doRollover()
+        file_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s]: %(message)s"))
+        file_handler.addFilter(lambda r: not getattr(r, "stdout_only", False))
+
+        # Root handler, so log file also contains records of libraries
+        Logger.__queue = queue.Queue()
+        root = logging.getLogger()
+        root.addHandler(_DeferredQueueHandler(Logger.__queue))
+        root.setLevel(logging.DEBUG)
+
+        Logger.__listener = QueueListener(Logger.__queue, file_handler, _OutputHandler(self))
+        Logger.__listener.start()
+        atexit.register(Logger.__listener.stop)
+
     def set_stdout(self, output_handler):
         self.__stdout = output_handler
 
+    def get_stdout(self):
+        return self.__stdout
+
     def set_debug_mode(self):
         self.__debug = True
 
-    def info(self, message):
+    def flush(self):
+        """
+        Waits until all queued messages are written and printed.
+        """
+        Logger.__queue.join()
+
+    def info(self, message, *args):
         """
         Prints message through output handler and logs it into the log file.
         """
-        self.__stdout.out(message)
-        self.__logger.info(message)
+        self.__logger.info(message, *args)
 
-    def debug(self, message):
+    def debug(self, message, *args):
         """
         Prints message through output handler, if logger is in debug mode and logs it into the log file.
         """
-        if self.__debug:
-            self.__stdout.out(message)
-        self.__logger.debug(message)
+        # Debug mode is resolved now, listener may process record after mode changes
+        self.__logger.debug(message, *args, extra={"file_only": not self.__debug})
 
     def error(self, exception, message=None):
         """
@@ -64,10 +129,10 @@ class Logger:
         Logs the exception into the log file and raises a generic runtime exception.
         """
         if message:
-            self.__stdout.out(message)
-            self.__logger.error(f"{message}:\n{exception}")
+            self.__logger.log(logging.INFO, message, extra={"stdout_only": True})
+            self.__logger.error(f"{message}:\n{exception}", extra={"file_only": True})
         else:
-            self.__stdout.out("Runtime error occurred. See log file for more information.")
-            self.__logger.error(f"{exception.__class__.__name__}:\n{exception}")
+            self.__logger.log(logging.INFO, "Runtime error occurred. See log file for more information.", extra={"stdout_only": True})
+            self.__logger.error(f"{exception.__class__.__name__}:\n{exception}", extra={"file_only": True})
 
-        raise exception
\ No newline at end of file
+        raise exception
@@ -6,9 +6,69 @@ Parses arguments, chooses application and starts execution.
 
 import argparse
 
-from mte.apps.gui_app import GuiApp
+from mte.apps.batch_app import BatchApp
 from mte.apps.shell_app import ShellApp
+from mte.config_manager import ConfigurationManager
 from mte.logger import Logger
+from mte.transport import load_profiles, save_tuned
+
+
+def tune_transport():
+    """
+    Measures transport profiles from configuration against configured target and stores the fastest one.
+    """
+    # Imported only for tuning
+    from mte.benchmark.transport_tuner import TransportTuner, format_tuning
+
+    config = ConfigurationManager().get_config()
+    target = config["target"]
+    tuner = TransportTuner(
+        target["ip"],
+        int(target["port"]),
+        target["username"],
+        target["password"],
+        config["env"]["environmentDir"].rstrip("/") + "-tune"
+    )
+
+    profiles = load_profiles(config)
+    print(f"Tuning transport to {target['ip']}:{target['port']}, profiles: {', '.join(profiles)}")
+    measurements = tuner.run(profiles)
+    if not measurements:
+        print("Failed to connect to target with any profile.")
+        quit(1)
+
+    print(format_tuning(measurements))
+
+    best = measurements[0]["profile"]
+    save_tuned(best, profiles[best], f"{target['ip']}:{target['port']}", measurements)
+    print(f"Fastest profile: {best}, used with 'profile = auto' in [transport] section.")
+
+
+def query_history(query, last_runs):
+    """
+    Prints report of run history.
+
+    @param query: 'pass-rate', 'flaky' or 'durations'.
+    @param last_runs: number of most recent runs of each test used, default from 'history_runs' of scheduler.
+    """
+    # Imported only for queries
+    from mte.history_manager import HistoryManager
+    from mte.history_store import format_duration_trends, format_flakiest, format_pass_rates
+
+    if last_runs is None:
+        config = ConfigurationManager().get_config()
+        last_runs = int(config["scheduler"].get("history_runs", 20)) if config.has_section("scheduler") else 20
+
+    store = HistoryManager().get_store()
+    if query == "pass-rate":
+        print(f"Pass rate over last {last_runs} runs:")
+        print(format_pass_rates(store.pass_rates(last_runs)))
+    elif query == "flaky":
+        print(f"Flakiest tests over last {last_runs} runs:")
+        print(format_flakiest(store.flakiest(last_runs)))
+    else:
+        print(f"Duration trends over last {last_runs} runs:")
+        print(format_duration_trends(store.duration_trends(last_runs)))
 
 
 def main():
@@ -16,23 +76,48 @@ def main():
     arg_parser = argparse.ArgumentParser(description='Main script to run MTE (Multilingual Text Editor).')
 
     # Define argument options
-    arg_parser.add_argument('--mode', type=str, help='Run mode of application. Options: [shell, gui]. Default = shell')
+    arg_parser.add_argument('--mode', type=str, help='Run mode of application. Options: [shell, gui, batch]. Default = shell')
     arg_parser.add_argument('--debug', action='store_const', const=True, help='Run in debug logging mode.')
+    arg_parser.add_argument('--full', action='store_const', const=True, help='Run all selected tests, including unchanged previously passed tests.')
+    arg_parser.add_argument('--hooks', type=str, help='Select only tests exercising given hooks separated by ",". Example: mkdir,rmdir')
+    arg_parser.add_argument('--hooks-diff', type=str, help='Select only tests exercising hooks changed in given kernel diff file.')
+    arg_parser.add_argument('--time-budget', type=float, help='Run only most valuable tests fitting into time budget in minutes.')
+    arg_parser.add_argument('--clones', type=int, help='Run tests in parallel on given number of linked clones of VM. Overrides config.')
+    arg_parser.add_argument('--filter', type=str, action='append', help='Batch mode: select tests matching filter expression, can be repeated. Example: "type=LOCAL name=mkdir*"')
+    arg_parser.add_argument('--tune-transport', action='store_const', const=True, help='Measure transport profiles against running target and store the fastest for profile "auto".')
+    arg_parser.add_argument('--results', type=str, help='Batch mode: write structured results into given JSON file.')
+    arg_parser.add_argument('--history', type=str, choices=['pass-rate', 'flaky', 'durations'], help='Print pass rate, flakiest tests or duration trends from run history.')
+    arg_parser.add_argument('--last', type=int, help='Number of last runs of each test used by --history. Default = history_runs from config')
 
     # Parse arguments
     args = arg_parser.parse_args()
 
+    if args.history:
+        query_history(args.history, args.last)
+        return
+
     # Extract values from arguments
     run_mode = args.mode
     debug_mode = args.debug
+    options = {
+        "full_run": bool(args.full),
+        "hooks": [h.strip() for h in args.hooks.split(",") if h.strip()] if args.hooks else None,
+        "hooks_diff": args.hooks_diff,
+        "time_budget": args.time_budget * 60 if args.time_budget else None,
+        "clones": args.clones
+    }
 
     # Create logger instance
     logger = Logger()
 
     # Determine appropriate app instance
-    app = ShellApp()  # default to ShellApp
+    app = ShellApp(options)  # default to ShellApp
     if run_mode == 'gui':
-        app = GuiApp()
+        # Imported only in gui mode, so other modes run without tkinter
+        from mte.apps.gui_app import GuiApp
+        app = GuiApp(options)
+    elif run_mode == 'batch':
+        app = BatchApp(options, args.filter, args.results)
 
     # Enable debug logging if debug flag is set
     if debug_mode:
@@ -41,8 +126,15 @@ def main():
     # Assign output handler to logger
     logger.set_stdout(app)
 
+    if args.tune_transport:
+        tune_transport()
+        return
+
     # Load app
     try:
         app.load()
+    except SystemExit:
+        # Keep exit code of app
+        raise
     except:
         quit()
\ No newline at end of file
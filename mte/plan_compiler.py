@@ -0,0 +1,210 @@
+"""
+Compiler of selected tests into execution plan run by target runner.
+
+Plan is JSON lines file. First line is header with plan version, testing location and counts,
+each following line is one execution unit in run order:
+    suite  - LOCAL tests of one source file sharing single Constable run with rendered configuration
+    single - test with own Constable run (GIT tests and comparison tests)
+
+Tests in plan are normalized: phases are always present, paths are substituted, timeouts resolved,
+Constable configurations assembled by ConfigAssembler and defaults applied, so runner does no per-test string work.
+Each phase command is step with 'run' command and 'inputs' and 'outputs' paths relative to working directory,
+step declaring outputs can be skipped by runner, when target cache holds outputs of unchanged inputs.
+Step marked 'once' runs at most once per run in its working directory, following tests reuse its result.
+"""
+
+import json
+
+from mte.test_key import test_key
+
+PLAN_VERSION = 3
+
+# Phases of test, each is list of steps except execution, which is single command
+PHASES = ["setup", "pre-execution", "post-execution", "cleanup"]
+
+# Directories of testing environment referenced by relative paths in commands
+ENV_DIRS = ["allowed", "restricted", "helper"]
+
+DEFAULT_COMPARE_ITERATIONS = 5
+
+
+def is_suite_test(test):
+    """
+    @param test: test dictionary.
+    @return: True if test runs in suite sharing Constable configuration, i.e. LOCAL test without comparison.
+    """
+    return test.get("type") != "GIT" and not test.get("compare")
+
+
+def unit_key(test):
+    """
+    Identifies execution unit of test, suite tests of the same source share one unit.
+
+    @param test: test dictionary.
+    @return: unit identification.
+    """
+    if is_suite_test(test):
+        return "suite", test.get("src")
+    return "single", test_key(test)
+
+
+def substitute_paths(command, tests_env):
+    """
+    Replaces relative environment directory paths in command with full paths on target.
+
+    @param command: shell command.
+    @param tests_env: remote testing location.
+    @return: command with full paths.
+    """
+    for d in ENV_DIRS:
+        command = command.replace(d, f"{tests_env}/{d}")
+    return command
+
+
+def compile_step(step, tests_env):
+    """
+    Normalizes phase command. Command in YAML is either string or dictionary with 'run' command,
+    optional 'inputs' and 'outputs' lists of paths relative to working directory of test
+    and optional 'once' flag of idempotent command.
+
+    @param step: command string or dictionary.
+    @param tests_env: remote testing location.
+    @return: step with run, inputs, outputs and once keys.
+    """
+    if isinstance(step, str):
+        step = {"run": step}
+
+    return {
+        "run": substitute_paths(step["run"], tests_env),
+        "inputs": step.get("inputs") or [],
+        "outputs": step.get("outputs") or [],
+        "once": bool(step.get("once"))
+    }
+
+
+def resolve_timeouts(test):
+    """
+    Resolves time limit of each phase. Block limit from 'timeouts' takes precedence over test's 'timeout'.
+    Phases without limit are None and runner applies its default.
+
+    @param test: test dictionary.
+    @return: dictionary of phase to time limit in seconds or None.
+    """
+    block = test.get("timeouts") or {}
+    return {p: block.get(p, test.get("timeout")) for p in PHASES + ["execution"]}
+
+
+def compile_test(test, tests_env, source=None):
+    """
+    Compiles test into normalized plan form. Constable configuration is assembled by compile_plan.
+
+    @param test: test dictionary loaded from YAML.
+    @param tests_env: remote testing location.
+    @param source: hash of medusa-tests content for GIT test, identifies its cached build outputs.
+    @return: compiled test.
+    """
+    execution = test["execution"]
+    expect = execution.get("results") or {}
+    use_constable = test.get("use_constable", test.get("using_constable", True))
+    rules = test.get("constable") or ""
+    compare = test.get("compare")
+
+    if compare:
+        iterations = max(test.get("iterations") or DEFAULT_COMPARE_ITERATIONS, 2)
+    else:
+        iterations = max(test.get("iterations") or 1, 1)
+
+    return {
+        "key": test_key(test),
+        "name": test["name"],
+        "src": test.get("src"),
+        "type": test.get("type"),
+        "source": source,
+        **{p: [compile_step(c, tests_env) for c in test.get(p) or []] for p in PHASES},
+        "command": substitute_paths(execution["command"], tests_env),
+        "timeouts": resolve_timeouts(test),
+        "use_constable": use_constable,
+        "rules": rules,
+        "constable": None,
+        "baseline_constable": None,
+        "expect": {k: expect.get(k) for k in ["return_code", "constable", "dmesg"]},
+        "metrics": execution.get("metrics") or [],
+        "compare": compare,
+        "iterations": iterations,
+        "warmup": test.get("warmup") or 0
+    }
+
+
+def compile_plan(tests, tests_env, assembler, source=None):
+    """
+    Compiles tests into execution units in host order.
+    GIT tests run one by one, LOCAL tests are grouped into suites by source file
+    and each suite runs at position of its first test, followed by comparison tests of the same source.
+
+    @param tests: selected tests in run order.
+    @param tests_env: remote testing location.
+    @param assembler: ConfigAssembler of Constable configurations.
+    @param source: hash of medusa-tests content, if GIT tests are selected.
+    @return: list of units.
+    """
+    units = []
+    groups = {}
+    for t in tests:
+        compiled = compile_test(t, tests_env, source if t.get("type") == "GIT" else None)
+
+        if t.get("type") == "GIT" or compiled["compare"]:
+            # Single tests have own Constable configuration
+            if compiled["use_constable"]:
+                compiled["constable"] = assembler.assemble([compiled["rules"]])
+            if compiled["compare"] == "without_medusa_rules":
+                compiled["baseline_constable"] = assembler.assemble([])
+
+        if t.get("type") == "GIT":
+            units.append({"kind": "single", "src": t.get("src"), "cwd": "medusa-tests", "tests": [compiled]})
+            continue
+
+        if t["src"] not in groups:
+            groups[t["src"]] = (
+                {"kind": "suite", "src": t["src"], "cwd": None, "constable": None, "tests": []},
+                []
+            )
+            units.append(groups[t["src"]])
+
+        suite, singles = groups[t["src"]]
+        if compiled["compare"]:
+            singles.append({"kind": "single", "src": t["src"], "cwd": None, "tests": [compiled]})
+        else:
+            suite["tests"].append(compiled)
+
+    # Expand LOCAL groups into suite followed by its comparison tests
+    plan = []
+    for u in units:
+        if isinstance(u, tuple):
+            suite, singles = u
+            if suite["tests"]:
+                # Suite tests share configuration of suite
+                suite["constable"] = assembler.assemble([t["rules"] for t in suite["tests"]])
+                plan.append(suite)
+            plan.extend(singles)
+        else:
+            plan.append(u)
+    return plan
+
+
+def write_plan(units, tests_env, path):
+    """
+    Writes execution plan into JSON lines file.
+
+    @param units: compiled units.
+    @param tests_env: remote testing location.
+    @param path: plan file path.
+    """
+    with open(path, "w") as f:
+        f.write(json.dumps({
+            "version": PLAN_VERSION,
+            "env": tests_env,
+            "units": len(units),
+            "tests": sum(len(u["tests"]) for u in units)
+        }) + "\n")
+        for u in units:
+            f.write(json.dumps(u) + "\n")
@@ -0,0 +1,173 @@
+import base64
+import errno
+import json
+import socket
+import struct
+
+from mte.logger import Logger
+
+# Frame header of agent protocol, see mte/target/agent.py
+HEADER = struct.Struct(">I")
+
+
+class RemoteAgent:
+    """
+    Client of resident agent on target (mte/target/agent.py).
+    Agent runs under sudo on one SSH channel of connection and serves operations sent as frames,
+    requests can be pipelined by call_many.
+    """
+    __logger = Logger()
+
+    # Time limit of waiting for agent to start
+    START_TIMEOUT = 15
+
+    def __init__(self, ssh_client, agent_path):
+        """
+        Initializes RemoteAgent.
+
+        @param ssh_client: connected Paramiko SSHClient.
+        @param agent_path: path of agent.py on target.
+        """
+        self.__ssh_client = ssh_client
+        self.__agent_path = agent_path
+        self.__channel = None
+        self.__next_id = 0
+
+    def start(self):
+        """
+        Starts agent on new channel and checks it responds.
+        """
+        self.__channel = self.__ssh_client.get_transport().open_session()
+        self.__channel.exec_command(f"sudo python3 -u {self.__agent_path}")
+        self.call("ping", self.START_TIMEOUT)
+        self.__logger.debug("Remote agent started.")
+
+    def is_active(self):
+        """
+        @return: if agent channel is open.
+        """
+        return self.__channel is not None and not self.__channel.closed
+
+    def call(self, op, wait=None, **args):
+        """
+        Runs single operation on agent.
+
+        @param op: operation name.
+        @param wait: time limit of response in seconds or None.
+        @param args: arguments of operation.
+        @return: result of operation.
+        """
+        return self.call_many([(op, args)], wait)[0]
+
+    def call_many(self, requests, wait=None):
+        """
+        Sends all requests at once and reads their responses, so round trips overlap.
+
+        @param requests: list of (operation name, arguments) tuples.
+        @param wait: time limit of each response in seconds or None.
+        @return: list of results in order of requests.
+        @raise TimeoutError: if agent did not respond in time, agent is closed.
+        @raise IOError: if any operation failed, FileNotFoundError if file is missing.
+        """
+        if not self.is_active():
+            raise IOError("Remote agent is not running.")
+
+        ids = []
+        data = b""
+        for op, args in requests:
+            self.__next_id += 1
+            ids.append(self.__next_id)
+            payload = json.dumps({"id": self.__next_id, "op": op, **args}).encode()
+            data += HEADER.pack(len(payload)) + payload
+
+        try:
+            self.__channel.settimeout(wait)
+            self.__channel.sendall(data)
+            responses = [self.__read_frame() for _ in ids]
+        except socket.timeout:
+            # Responses would arrive out of sync
+            self.close()
+            raise TimeoutError("Remote agent did not respond.")
+        except OSError:
+            self.close()
+            raise
+
+        results = []
+        error = None
+        for request_id, response in zip(ids, responses):
+            if response.get("id") != request_id:
+                self.close()
+                raise IOError("Remote agent response out of order.")
+
+            if not response["ok"] and error is None:
+                if response.get("timeout"):
+                    error = TimeoutError(response["error"])
+                elif response.get("errno") == errno.ENOENT:
+                    error = FileNotFoundError(errno.ENOENT, response["error"])
+                else:
+                    error = IOError(response["error"])
+            results.append(response.get("result"))
+
+        if error:
+            raise error
+        return results
+
+    def exec(self, command, timeout=None):
+        """
+        @param command: shell command.
+        @param timeout: time limit in seconds or None.
+        @return: dictionary with code, stdout and stderr.
+        """
+        # Response waits for command
+        return self.call("exec", None if timeout is None else timeout + 5, command=command, timeout=timeout)
+
+    def read(self, path, offset=0, limit=None, timeout=None):
+        """
+        @param path: file path.
+        @param offset: offset to read from.
+        @param limit: maximum number of read bytes.
+        @param timeout: time limit in seconds or None.
+        @return: read bytes, offset they start at and size of file.
+        """
+        result = self.call("read", timeout, path=path, offset=offset, limit=limit)
+        return base64.b64decode(result["data"]), result["offset"], result["size"]
+
+    def write(self, path, content, timeout=None):
+        """
+        @param path: file path.
+        @param content: bytes or text to write.
+        @param timeout: time limit in seconds or None.
+        """
+        if isinstance(content, str):
+            content = content.encode()
+        self.call("write", timeout, path=path, data=base64.b64encode(content).decode())
+
+    def close(self):
+        """
+        Closes agent channel, agent exits on end of its input.
+        """
+        if self.__channel is not None:
+            try:
+                self.__channel.close()
+            except Exception:
+                pass
+        self.__channel = None
+
+    def __read_frame(self):
+        """
+        @return: decoded response frame.
+        """
+        (length,) = HEADER.unpack(self.__recv(HEADER.size))
+        return json.loads(self.__recv(length).decode())
+
+    def __recv(self, size):
+        """
+        Receives exactly size bytes from channel.
+        """
+        data = b""
+        while len(data) < size:
+            chunk = self.__channel.recv(size - len(data))
+            if not chunk:
+                raise IOError("Remote agent exited.")
+            data += chunk
+        return data
@@ -2,7 +2,7 @@ import time
 
 import paramiko
 import virtualbox as vb
-from virtualbox.library import MachineState, SessionState
+from virtualbox.library import LockType, MachineState, NATProtocol, SessionState
 
 from mte.logger import Logger
 
@@ -13,7 +13,8 @@ class RemoteManager:
     """
     __logger = Logger()
 
-    def __init__(self, vm_name: str | None, host: str, port: int, username: str, password: str, using_vb: bool):
+    def __init__(self, vm_name: str | None, host: str, port: int, username: str, password: str, using_vb: bool,
+                 snapshot: str | None = None, headless: bool = False):
         """
         Initialization of RemoteManager.
         In case of usign virtual box, validates VM.
@@ -24,6 +25,8 @@ class RemoteManager:
         @param username: remote username for SSH.
         @param password: remote password for SSH.
         @param using_vb: determines if using Virtual Box API.
+        @param snapshot: name of VM snapshot restored on recovery, optional.
+        @param headless: start VM without window.
         """
         self.__host = host
         self.__port = port
@@ -31,6 +34,8 @@ class RemoteManager:
         self.__password = password
         self.__using_vb = using_vb
         self.__vm_name = vm_name
+        self.__snapshot = snapshot
+        self.__headless = headless
 
         if self.__using_vb:
             if not vm_name:
@@ -50,6 +55,127 @@ class RemoteManager:
         except Exception as e:
             self.__logger.error(e, "Failed to connect to guest.")
 
+    def recover(self):
+        """
+        Recovers frozen target.
+        Virtual machine is powered off, restored to snapshot if configured and started again.
+        Remote without Virtual Box can not be power-cycled, so only waits until it is reachable again.
+        """
+        try:
+            if self.__using_vb:
+                self.__logger.info("Power-cycling virtual machine...")
+                self.__power_off_vm()
+                if self.__snapshot:
+                    self.__restore_snapshot()
+                self.__start_vm()
+            else:
+                self.__validate_connection(True)
+            self.__logger.info("Guest recovered.")
+        except Exception as e:
+            self.__logger.error(e, "Failed to recover guest.")
+
+    def create_linked_clone(self, name, port):
+        """
+        Creates linked clone of virtual machine from configured snapshot, or current snapshot if not configured.
+        SSH of clone is forwarded to given host port.
+
+        @param name: name of clone.
+        @param port: host port forwarded to SSH port of clone.
+        @return: RemoteManager of clone.
+        """
+        try:
+            self.__validate_vm(self.__vm_name)
+
+            snapshot = self.machine.find_snapshot(self.__snapshot) if self.__snapshot else self.machine.current_snapshot
+            if snapshot is None:
+                raise ValueError("Linked clones require snapshot of virtual machine.")
+
+            self.__logger.debug("Creating linked clone %s...", name)
+            clone = self.machine.clone(snapshot_name_or_id=snapshot.id_p, name=name)
+            self.__forward_ssh(clone, port)
+            self.__logger.debug("Linked clone %s created, SSH port %s.", name, port)
+        except Exception as e:
+            self.__logger.error(e, f"Failed to create linked clone {name}.")
+
+        return RemoteManager(
+            vm_name=name,
+            host=self.__host,
+            port=port,
+            username=self.__username,
+            password=self.__password,
+            using_vb=True,
+            headless=True
+        )
+
+    def delete_vm(self):
+        """
+        Powers off virtual machine and deletes it with its disks. Intended for linked clones.
+        """
+        try:
+            self.__power_off_vm()
+            self.machine.remove(delete=True)
+            self.__logger.debug("Virtual machine %s deleted.", self.__vm_name)
+        except Exception as e:
+            self.__logger.error(e, f"Failed to delete virtual machine {self.__vm_name}.")
+
+    def __forward_ssh(self, machine, port):
+        """
+        Replaces NAT rules forwarding to guest SSH port of first network adapter with rule using given host port.
+
+        @param machine: virtual machine.
+        @param port: host port.
+        """
+        session = vb.Session()
+        try:
+            machine.lock_machine(session, LockType.write)
+            nat = session.machine.get_network_adapter(0).nat_engine
+
+            # Rules are formatted as name,protocol,host ip,host port,guest ip,guest port
+            for rule in nat.redirects:
+                fields = rule.split(",")
+                if fields[5] == "22":
+                    nat.remove_redirect(fields[0])
+
+            nat.add_redirect("ssh", NATProtocol.tcp, "", int(port), "", 22)
+            session.machine.save_settings()
+        finally:
+            if session.state == SessionState.locked:
+                session.unlock_machine()
+
+    def __power_off_vm(self):
+        """
+        Powers off running virtual machine.
+        """
+        self.__validate_vm(self.__vm_name)
+
+        if self.machine.state not in [MachineState.running, MachineState.paused, MachineState.stuck]:
+            return
+
+        session = vb.Session()
+        try:
+            self.machine.lock_machine(session, LockType.shared)
+            progress = session.console.power_down()
+            progress.wait_for_completion(-1)
+            self.__logger.debug("Virtual machine powered off.")
+        finally:
+            if session.state == SessionState.locked:
+                session.unlock_machine()
+
+    def __restore_snapshot(self):
+        """
+        Restores powered off virtual machine to configured snapshot.
+        """
+        session = vb.Session()
+        try:
+            snapshot = self.machine.find_snapshot(self.__snapshot)
+            self.machine.lock_machine(session, LockType.write)
+            progress = session.machine.restore_snapshot(snapshot)
+            progress.wait_for_completion(-1)
+            self.__logger.debug("Virtual machine restored to snapshot %s.", self.__snapshot)
+        finally:
+            if session.state == SessionState.locked:
+                session.unlock_machine()
+
     def __validate_connection(self, time_out: bool):
         """
         Validates if connection to the remote can be established. In case of time_out doesnt limit validation time
@@ -91,7 +217,7 @@ class RemoteManager:
         except Exception as e:
             self.__logger.error(e, "Failed to establish connection with Virtual Box. See logs for more info.")
 
-        self.__logger.debug(f"Running virtual box version: {self.vbox.version}")
+        self.__logger.debug("Running virtual box version: %s", self.vbox.version)
 
         # Find desired virtual machine
         try:
@@ -100,7 +226,7 @@ class RemoteManager:
             # Machine doesnt exist
             self.__logger.error(e, f"VM: {vm_name} does not exist on host system.")
 
-        self.__logger.debug(f"Virtual machine {vm_name} found.")
+        self.__logger.debug("Virtual machine %s found.", vm_name)
 
     def __start_vm(self):
         """
@@ -121,7 +247,7 @@ class RemoteManager:
             # Start virtual machine
             self.__logger.debug("Starting virtual machine...")
 
-            progress = self.machine.launch_vm_process(session, "gui", [])
+            progress = self.machine.launch_vm_process(session, "headless" if self.__headless else "gui", [])
             progress.wait_for_completion(-1)
             self.__logger.debug("Virtual machine has started.")
 
@@ -0,0 +1,120 @@
+from mte.logger import Logger
+
+
+class TestScheduler:
+    """
+    Orders tests so that failures show up early and selects subset of tests fitting time budget.
+
+    Tests are ordered by historical failure rate first and expected duration second.
+    Failure rate is smoothed ((failures + 1) / (runs + 2)), so tests without history
+    are ranked above tests that reliably passed.
+    """
+    __logger = Logger()
+
+    def __init__(self, statistics, default_duration=60.0):
+        """
+        @param statistics: test statistics from HistoryManager.test_statistics.
+        @param default_duration: expected duration in seconds for tests without duration history.
+        """
+        self.__statistics = statistics
+        self.__default_duration = default_duration
+
+    def failure_rate(self, key):
+        """
+        @param key: test key.
+        @return: smoothed failure rate of test.
+        """
+        s = self.__statistics.get(key)
+        if not s:
+            return 0.5
+        return (s["failures"] + 1) / (s["runs"] + 2)
+
+    def duration(self, key):
+        """
+        @param key: test key.
+        @return: expected duration of test in seconds.
+        """
+        s = self.__statistics.get(key)
+        if not s or s["duration"] is None:
+            return self.__default_duration
+        return s["duration"]
+
+    def order(self, tests, key):
+        """
+        Orders tests by failure rate descending and expected duration ascending.
+
+        @param tests: tests to order.
+        @param key: function returning test key of test.
+        @return: ordered list of tests.
+        """
+        return sorted(tests, key=lambda t: (-self.failure_rate(key(t)), self.duration(key(t))))
+
+    def fit_budget(self, tests, key, budget):
+        """
+        Picks most valuable subset of tests fitting into time budget.
+        Tests are picked greedily by failure rate per second of expected duration.
+
+        @param tests: tests to pick from.
+        @param key: function returning test key of test.
+        @param budget: time budget in seconds.
+        @return: picked tests ordered by order method.
+        """
+        ranked = sorted(
+            tests,
+            key=lambda t: -self.failure_rate(key(t)) / max(self.duration(key(t)), 1e-3)
+        )
+
+        picked = []
+        remaining = budget
+        for t in ranked:
+            d = self.duration(key(t))
+            if d <= remaining:
+                picked.append(t)
+                remaining -= d
+
+        self.__logger.info(
+            "Time budget %.0f s: picked %s of %s tests, expected duration %.0f s.",
+            budget, len(picked), len(tests), budget - remaining
+        )
+        return self.order(picked, key)
+
+    def shard(self, tests, key, count, unit=None):
+        """
+        Splits tests into shards of balanced expected duration.
+        Tests of the same unit, e.g. suite sharing Constable configuration, stay in one shard.
+        Longest units are assigned first, each to the shard with least expected duration.
+        Order of tests inside shard is kept.
+
+        @param tests: scheduled tests.
+        @param key: function returning test key of test.
+        @param count: number of shards.
+        @param unit: function returning unit of test, each test is own unit if not set.
+        @return: list of shards, each list of tests.
+        """
+        units = {}
+        for t in tests:
+            units.setdefault(unit(t) if unit else id(t), []).append(t)
+
+        loads = [0.0] * count
+        assignment = {}
+        for members in sorted(units.values(), key=lambda u: -sum(self.duration(key(t)) for t in u)):
+            i = loads.index(min(loads))
+            for t in members:
+                loads[i] += self.duration(key(t))
+                assignment[id(t)] = i
+
+        self.__logger.debug("Sharded tests, expected durations: %s.", ", ".join(f"{l:.0f} s" for l in loads))
+        return [[t for t in tests if assignment[id(t)] == i] for i in range(count)]
+
+    def schedule(self, tests, key, budget=None):
+        """
+        Orders tests and if budget is set, picks subset fitting into it.
+
+        @param tests: tests to schedule.
+        @param key: function returning test key of test.
+        @param budget: time budget in seconds, optional.
+        @return: scheduled tests.
+        """
+        if budget is None:
+            return self.order(tests, key)
+        return self.fit_budget(tests, key, budget)
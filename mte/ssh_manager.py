@@ -5,17 +5,27 @@ import socket
 import paramiko as p
 
 from mte.logger import Logger
+from mte.remote_agent import RemoteAgent
+from mte.transport import DEFAULT_PROFILE, apply_channel_settings, connect_kwargs
 
 
 class SSHManager:
     """
     Manages and handles SSH operations as commands execution and file transfers.
+    When remote agent is started, commands and file operations are sent through it instead of new channels,
+    commands still run as SSH user and files written by agent are owned by it.
     """
     __logger = Logger()
 
     __skip_nodes = [".idea", ".git", ".gitignore"]
 
-    def __init__(self, host: str, port: int, username: str, password: str):
+    # Number of rotated runner logs, must match LOG_BACKUPS of mte/target/runner.py
+    __runner_log_backups = 2
+
+    # Number of medusa-tests versions kept in target cache
+    __cached_repos = 3
+
+    def __init__(self, host: str, port: int, username: str, password: str, transport=None):
         """
         Initializes SSHManager.
 
@@ -23,11 +33,17 @@ class SSHManager:
         @param port: remote SSH port.
         @param username: remote SSH username.
         @param password: remote SSH password
+        @param transport: transport settings from mte.transport, Paramiko defaults if not set.
         """
         self.host = host
         self.port = port
         self.username = username
         self.password = password
+        self.transport = transport or DEFAULT_PROFILE
+
+        # Remote agent, started again after reconnect while agent path is set
+        self.__agent = None
+        self.__agent_path = None
 
         self.ssh = p.SSHClient()
         self.ssh.set_missing_host_key_policy(p.AutoAddPolicy)
@@ -38,10 +54,42 @@ class SSHManager:
         """
         try:
             # Try to connect to ssh
-            self.ssh.connect(hostname=self.host, port=self.port, username=self.username, password=self.password)
+            self.ssh.connect(
+                hostname=self.host,
+                port=self.port,
+                username=self.username,
+                password=self.password,
+                **connect_kwargs(self.transport)
+            )
+            apply_channel_settings(self.ssh.get_transport(), self.transport)
         except Exception as e:
             self.__logger.error(e, "Failed to connect to SSH server")
 
+    def is_connected(self):
+        """
+        @return: if SSH session is open.
+        """
+        transport = self.ssh.get_transport()
+        return transport is not None and transport.is_active()
+
+    def start_agent(self, env_path):
+        """
+        Starts remote agent transferred with target files. If agent fails to start, shell commands are used.
+
+        @param env_path: remote testing location containing agent.py.
+        """
+        self.__agent_path = f"{env_path}/agent.py"
+        self.__get_agent()
+
+    def stop_agent(self):
+        """
+        Stops remote agent, following operations use shell commands.
+        """
+        self.__agent_path = None
+        if self.__agent:
+            self.__agent.close()
+            self.__agent = None
+
     def exec(self, command, timeout=False, log_error=True):
         """
         Execute command through ssh and wait for response.
@@ -53,17 +101,30 @@ class SSHManager:
         @return: shell command response.
         """
         timeout_val = 10 if timeout else None
-        try:
-            stdin, stdout, stderr = self.ssh.exec_command(command, timeout=timeout_val)
-        except socket.timeout:
-            raise TimeoutError("Command took to long.")
 
-        # Wait for command until finishes
-        exit_status = stdout.channel.recv_exit_status()
+        agent = self.__get_agent()
+        if agent:
+            try:
+                result = agent.exec(command, timeout_val)
+            except TimeoutError:
+                raise TimeoutError("Command took to long.")
+            exit_status = result["code"]
+            output = result["stdout"].strip('\n')
+            error = result["stderr"].strip('\n')
+        else:
+            try:
+                stdin, stdout, stderr = self.ssh.exec_command(command, timeout=timeout_val)
+            except socket.timeout:
+                raise TimeoutError("Command took to long.")
+
+            # Wait for command until finishes
+            if not stdout.channel.status_event.wait(timeout_val):
+                raise TimeoutError("Command took to long.")
+            exit_status = stdout.channel.recv_exit_status()
 
-        # Read response
-        output = stdout.read().decode().strip('\n')
-        error = stderr.read().decode().strip('\n')
+            # Read response
+            output = stdout.read().decode().strip('\n')
+            error = stderr.read().decode().strip('\n')
 
         # Check if resulted in error
         if exit_status != 0:
@@ -80,13 +141,153 @@ class SSHManager:
         Executes command without waiting for result.
         @param command: shell command to execute.
         """
+        agent = self.__get_agent()
+        if agent:
+            agent.call("spawn", command=command)
+            return
         self.ssh.exec_command(command)
 
-    def prepare_environment(self, env_path, include_git):
+    def file_exists(self, path, timeout=False):
+        """
+        Checks if file exists on target.
+
+        @param path: target file path.
+        @param timeout: limits wait time to 10 seconds.
+        @return: True if file exists.
+        """
+        agent = self.__get_agent()
+        if agent:
+            try:
+                agent.call("stat", 10 if timeout else None, path=path)
+                return True
+            except FileNotFoundError:
+                return False
+
+        try:
+            self.exec(f"test -f {path}", timeout=timeout, log_error=False)
+            return True
+        except TimeoutError:
+            raise
+        except IOError:
+            return False
+
+    def read_file(self, path, timeout=False):
+        """
+        Reads text file on target.
+
+        @param path: target file path.
+        @param timeout: limits wait time to 10 seconds.
+        @return: file content without trailing new lines.
+        @raise IOError: if file cannot be read.
+        """
+        agent = self.__get_agent()
+        if agent:
+            data, _, _ = agent.read(path, timeout=10 if timeout else None)
+            return data.decode(errors="replace").strip('\n')
+        return self.exec(f"cat {path}", timeout=timeout, log_error=False)
+
+    def is_running(self, name, timeout=False):
+        """
+        Checks if process with given name runs on target.
+
+        @param name: process name.
+        @param timeout: limits wait time to 10 seconds.
+        @return: True if process runs.
+        """
+        agent = self.__get_agent()
+        if agent:
+            return agent.call("run_status", 10 if timeout else None, name=name)
+
+        try:
+            self.exec(f"pgrep {name}", timeout=timeout, log_error=False)
+            return True
+        except TimeoutError:
+            raise
+        except IOError:
+            # pgrep returned 1 = no process
+            return False
+
+    def write_file(self, path, content):
+        """
+        Writes text content into file on target.
+
+        @param path: target file path.
+        @param content: text content.
+        """
+        agent = self.__get_agent()
+        if agent:
+            agent.write(path, content)
+            return
+
+        sftp = self.ssh.open_sftp()
+        with sftp.open(path, "w") as f:
+            f.write(content)
+        sftp.close()
+
+    def read_from(self, path, offset, limit, timeout=False):
+        """
+        Reads part of file on target from offset. If file is shorter than offset, e.g. it was recreated,
+        it is read from start.
+
+        @param path: target file path.
+        @param offset: offset to read from.
+        @param limit: maximum number of read bytes.
+        @param timeout: limits wait time to 10 seconds.
+        @return: read bytes, offset they start at and size of file.
+        """
+        agent = self.__get_agent()
+        if agent:
+            return agent.read(path, offset, limit, 10 if timeout else None)
+
+        sftp = self.ssh.open_sftp()
+        try:
+            if timeout:
+                sftp.get_channel().settimeout(10)
+            size = sftp.stat(path).st_size
+            if size < offset:
+                offset = 0
+            if size == offset:
+                return b"", offset, size
+
+            with sftp.open(path, "rb") as f:
+                f.seek(offset)
+                return f.read(min(limit, size - offset)), offset, size
+        finally:
+            sftp.close()
+
+    def get_target_info(self, medusa_dir=None):
+        """
+        Collects identification of target build: kernel version, kernel build and Medusa commit.
+
+        @param medusa_dir: Medusa installation dir on target, optional.
+        @return: dictionary with kernel, build and medusa keys.
+        """
+        info = {"kernel": "unknown", "build": "unknown", "medusa": "unknown"}
+
+        try:
+            info["kernel"] = self.exec("uname -r", log_error=False)
+            info["build"] = self.exec("uname -v", log_error=False)
+        except IOError:
+            self.__logger.debug("Failed to read target kernel version.")
+
+        if medusa_dir:
+            try:
+                info["medusa"] = self.exec(f"git -c safe.directory='*' -C {medusa_dir} rev-parse HEAD", log_error=False)
+            except IOError:
+                self.__logger.debug("Failed to read Medusa commit on target.")
+
+        return info
+
+    def prepare_environment(self, env_path, include_git, cache_dir=None, source=None):
         """
         Creates and transfers required directories on remote target
+        If cache dir is set, git tests repository is kept in it by source hash and linked into environment,
+        so unchanged repository is not transferred again.
+
         @param env_path:
         @param include_git:
+        @param cache_dir: persistent cache dir on target outside env_path, optional.
+        @param source: hash of git tests repository content, required with cache_dir.
         """
         self.__logger.debug("Preparing environment directory on target...")
 
@@ -103,11 +304,48 @@ class SSHManager:
                 e = "Git tests repo missing in tests folder."
                 self.__logger.error(FileNotFoundError(e), e)
 
-            self.transfer(git_dir, env_path, False)
+            if cache_dir and source:
+                self.__link_cached_repo(git_dir, env_path, cache_dir, source)
+            else:
+                self.transfer(git_dir, env_path, False)
 
         self.__logger.debug("Remote environment is ready.")
 
 
+    def __link_cached_repo(self, git_dir, env_path, cache_dir, source):
+        """
+        Links git tests repository from target cache into environment, repository is transferred into cache
+        only if its version is not cached yet. Only the last few versions are kept.
+
+        @param git_dir: local git tests repository.
+        @param env_path: remote testing location.
+        @param cache_dir: persistent cache dir on target.
+        @param source: hash of repository content.
+        """
+        repos_dir = f"{cache_dir}/repo"
+        repo_dir = f"{repos_dir}/{source}"
+
+        try:
+            self.exec(f"test -d {repo_dir}", log_error=False)
+            self.__logger.debug("Git tests repository is cached on target.")
+            # Mark as recently used
+            self.exec(f"touch {repo_dir}")
+        except IOError:
+            # Transfer into temporary dir first, interrupted transfer is never used
+            self.exec(f"mkdir -p {repos_dir} && sudo rm -rf {repo_dir}.part")
+            self.transfer(git_dir, f"{repo_dir}.part", True)
+            self.exec(f"mv {repo_dir}.part {repo_dir}")
+            self.__logger.debug("Git tests repository transferred into target cache.")
+
+        # Runner enters repository through link, link is removed by clean_target
+        self.exec(f"sudo rm -rf {env_path}/medusa-tests && ln -s {repo_dir} {env_path}/medusa-tests")
+
+        # Remove least recently used versions with their build outputs
+        self.exec(
+            f"ls -1t {repos_dir} | grep -v '\\.part$' | tail -n +{self.__cached_repos + 1} "
+            f"| xargs -r -I{{}} sudo rm -rf {repos_dir}/{{}}"
+        )
+
     def transfer(self, src_path, dest_path, just_content=True):
         """
         Transfers files or whole directories.
@@ -147,19 +385,21 @@ class SSHManager:
         # Close sftp
         sftp.close()
 
-    def download_results(self, env_path, just_log=False):
+    def download_results(self, env_path, just_log=False, local_path=None):
         """
         Downloads results folder and log file from target.
         if just_log is True, downlaods only log file.
 
         @param env_path: target path containing results and log.
         @param just_log: flag, if just log is needed.
+        @param local_path: local results dir, defaults to 'results' folder in package.
         """
         # Create results dir, if doesn't exist
         self.__logger.debug("Transfering results...")
 
         # Build paths
-        local_path = os.path.join(os.path.dirname(__file__), "results")
+        if local_path is None:
+            local_path = os.path.join(os.path.dirname(__file__), "results")
         remote_path = f"{env_path}/results"
 
         # Clear local results
@@ -181,6 +421,11 @@ class SSHManager:
 
             # Transfer overal results
             sftp.get(f"{remote_path}/results", os.path.join(local_path, "results.txt"))
+            try:
+                sftp.get(f"{remote_path}/results.json", os.path.join(local_path, "results.json"))
+            except IOError:
+                # Runner which failed early did not write structured results
+                self.__logger.debug("Structured results are missing on target.")
 
             # Transfer details
             sftp.chdir(f"{remote_path}/details")
@@ -204,10 +449,26 @@ class SSHManager:
         files = os.listdir(os.path.join(os.path.dirname(__file__), "target"))
         files.append("medusa.conf")
         files.append("exit")
+        files.append("progress")
+
+        # Register run state, stale checkpoint would be resumed by following run
+        files.append("checkpoint.json")
+        files.append("checkpoint.json.tmp")
+        files.append("skip.json")
+
+        # Register rotated runner logs
+        files.extend(f"log.{i}" for i in range(1, self.__runner_log_backups + 1))
 
         # Register all dirs created by environment
         dirs = ["medusa-tests", "allowed", "restricted", "results", "log", "helper", "__pycache__"]
 
+        agent = self.__get_agent()
+        if agent:
+            # Single request removes everything, agent is removed with target files
+            agent.call("remove", paths=[f"{env_path}/{n}" for n in files + dirs], rmdir=env_path)
+            self.stop_agent()
+            return
+
         # Clear files
         for f in files:
             try:
@@ -270,9 +531,37 @@ class SSHManager:
         Closes SSH session.
         """
         self.__logger.debug("Disconnecting SSH client...")
+        if self.__agent:
+            self.__agent.close()
+            self.__agent = None
         self.ssh.close()
         self.__logger.debug("SSH client disconnected.")
 
+    def __get_agent(self):
+        """
+        Returns running remote agent, agent is started again if connection was reopened.
+
+        @return: RemoteAgent or None if agent is not used.
+        """
+        if self.__agent_path is None:
+            return None
+        if self.__agent and self.__agent.is_active():
+            return self.__agent
+        if not self.is_connected():
+            return None
+
+        agent = RemoteAgent(self.ssh, self.__agent_path)
+        try:
+            agent.start()
+        except Exception as e:
+            agent.close()
+            self.__agent_path = None
+            self.__logger.debug("Remote agent is not available, using shell commands: %s", e)
+            return None
+
+        self.__agent = agent
+        return agent
+
     def __del__(self):
         """
         Calls @disconnect method on destruction, if still open.
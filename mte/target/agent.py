@@ -0,0 +1,276 @@
+"""
+Resident agent of host on target.
+
+Started by host once per connection under sudo, speaks framed protocol over its stdin/stdout,
+so remote operations do not need new SSH channel, shell and sudo each.
+Commands run as SSH user who started agent, like commands of SSH channels, and escalate with sudo themselves.
+Files written by agent are owned by that user, other file operations run as root.
+Frame is 4 byte big-endian length followed by UTF-8 JSON object.
+
+Request:  {"id": 1, "op": "read", "path": "...", ...}
+Response: {"id": 1, "ok": true, "result": ...} or {"id": 1, "ok": false, "error": "...", "errno": 2}
+
+Operations:
+    ping                                   - liveness check
+    exec(command, timeout)                 - runs shell command, returns code, stdout and stderr
+    spawn(command)                         - starts shell command in background
+    stat(path)                             - returns size, mtime and is_dir
+    read(path, offset=0, limit=None)       - reads file part, data is base64, returns also offset and size
+    write(path, data)                      - writes base64 data into file
+    remove(paths, rmdir=None)              - removes files and trees, then removes 'rmdir' if empty
+    run_status(name)                       - checks if process with name containing 'name' is running
+Requests are processed in order, host can pipeline them. Agent exits when stdin is closed.
+"""
+
+import base64
+import json
+import os
+import pwd
+import shutil
+import signal
+import struct
+import subprocess
+import sys
+
+HEADER = struct.Struct(">I")
+
+
+def resolve_login():
+    """
+    Resolves SSH user who started agent with sudo from variables set by sudo.
+
+    @return: password database entry of user or None, if agent does not run as root under sudo.
+    """
+    uid = os.environ.get("SUDO_UID")
+    if os.geteuid() != 0 or uid is None or int(uid) == 0:
+        return None
+    try:
+        return pwd.getpwuid(int(uid))
+    except KeyError:
+        return None
+
+
+# User running commands, None runs them as agent itself
+LOGIN = resolve_login()
+
+
+def login_options():
+    """
+    @return: keyword arguments of Popen running command as login user with its environment.
+    """
+    if LOGIN is None:
+        return {}
+
+    def drop_privileges():
+        os.setgroups(os.getgrouplist(LOGIN.pw_name, LOGIN.pw_gid))
+        os.setgid(LOGIN.pw_gid)
+        os.setuid(LOGIN.pw_uid)
+
+    env = dict(os.environ, HOME=LOGIN.pw_dir, USER=LOGIN.pw_name, LOGNAME=LOGIN.pw_name)
+    return {"preexec_fn": drop_privileges, "env": env}
+
+
+def read_frame(stream):
+    """
+    Reads single frame.
+
+    @param stream: binary input stream.
+    @return: decoded object or None on end of stream.
+    """
+    header = stream.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+
+    (length,) = HEADER.unpack(header)
+    payload = stream.read(length)
+    if len(payload) < length:
+        return None
+    return json.loads(payload.decode())
+
+
+def write_frame(stream, message):
+    """
+    Writes single frame.
+
+    @param stream: binary output stream.
+    @param message: object to send.
+    """
+    payload = json.dumps(message).encode()
+    stream.write(HEADER.pack(len(payload)) + payload)
+    stream.flush()
+
+
+def op_exec(command, timeout=None):
+    """
+    Runs shell command as login user in own process group, whole group is killed on timeout.
+
+    @param command: shell command.
+    @param timeout: time limit in seconds or None.
+    @return: dictionary with code, stdout and stderr.
+    """
+    process = subprocess.Popen(
+        ["bash", "-c", command],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        start_new_session=True,
+        **login_options()
+    )
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        # Kill whole process group of command
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        process.communicate()
+        raise TimeoutError(f"Command timed out after {timeout} s: {command}")
+
+    return {"code": process.returncode, "stdout": stdout.decode(errors="replace"), "stderr": stderr.decode(errors="replace")}
+
+
+def op_spawn(command):
+    """
+    Starts shell command as login user in background in own session.
+
+    @param command: shell command.
+    """
+    subprocess.Popen(
+        ["bash", "-c", command],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+        **login_options()
+    )
+    return None
+
+
+def op_stat(path):
+    """
+    @param path: file path.
+    @return: dictionary with size, mtime and is_dir.
+    """
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime": st.st_mtime, "is_dir": os.path.isdir(path)}
+
+
+def op_read(path, offset=0, limit=None):
+    """
+    Reads part of file. If file is shorter than offset, e.g. it was recreated, it is read from start.
+
+    @param path: file path.
+    @param offset: offset to read from.
+    @param limit: maximum number of read bytes, whole rest of file if None.
+    @return: dictionary with base64 data, offset it starts at and size of file.
+    """
+    size = os.path.getsize(path)
+    if size < offset:
+        offset = 0
+
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(size - offset if limit is None else min(limit, size - offset))
+    return {"data": base64.b64encode(data).decode(), "offset": offset, "size": size}
+
+
+def op_write(path, data):
+    """
+    Writes file, new file is owned by login user.
+
+    @param path: file path.
+    @param data: base64 content.
+    """
+    created = not os.path.lexists(path)
+    with open(path, "wb") as f:
+        f.write(base64.b64decode(data))
+
+    if created and LOGIN is not None:
+        os.chown(path, LOGIN.pw_uid, LOGIN.pw_gid)
+    return None
+
+
+def op_remove(paths, rmdir=None):
+    """
+    Removes files and directory trees, missing paths are ignored.
+
+    @param paths: paths to remove.
+    @param rmdir: directory removed afterwards, if it is empty.
+    """
+    for p in paths:
+        if os.path.isdir(p) and not os.path.islink(p):
+            shutil.rmtree(p, ignore_errors=True)
+        elif os.path.lexists(p):
+            os.remove(p)
+
+    if rmdir:
+        try:
+            os.rmdir(rmdir)
+        except OSError:
+            # Not empty
+            pass
+    return None
+
+
+def op_run_status(name):
+    """
+    Checks running processes like pgrep, agent itself and its parent are ignored.
+
+    @param name: part of process name.
+    @return: True if matching process runs.
+    """
+    own = {os.getpid(), os.getppid()}
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit() or int(pid) in own:
+            continue
+        try:
+            with open(f"/proc/{pid}/comm", "r") as f:
+                if name in f.read().strip():
+                    return True
+        except OSError:
+            # Process ended
+            pass
+    return False
+
+
+OPERATIONS = {
+    "ping": lambda: True,
+    "exec": op_exec,
+    "spawn": op_spawn,
+    "stat": op_stat,
+    "read": op_read,
+    "write": op_write,
+    "remove": op_remove,
+    "run_status": op_run_status
+}
+
+
+def serve(stdin, stdout):
+    """
+    Processes requests until end of input.
+
+    @param stdin: binary input stream.
+    @param stdout: binary output stream.
+    """
+    while True:
+        request = read_frame(stdin)
+        if request is None:
+            return
+
+        request_id = request.pop("id", None)
+        op = request.pop("op", None)
+        try:
+            if op not in OPERATIONS:
+                raise ValueError(f"Unknown operation: {op}")
+            response = {"id": request_id, "ok": True, "result": OPERATIONS[op](**request)}
+        except TimeoutError as e:
+            response = {"id": request_id, "ok": False, "error": str(e), "errno": None, "timeout": True}
+        except Exception as e:
+            response = {"id": request_id, "ok": False, "error": f"{e.__class__.__name__}: {e}", "errno": getattr(e, "errno", None)}
+
+        write_frame(stdout, response)
+
+
+if __name__ == "__main__":
+    serve(sys.stdin.buffer, sys.stdout.buffer)
@@ -0,0 +1,180 @@
+"""
+Persistent cache of build outputs on target, kept between runs in cache dir outside environment.
+
+Step declaring 'outputs' is identified by its command and by content of its 'inputs',
+or by hash of medusa-tests content for GIT test without inputs. Step without both is not cached.
+Outputs are relative to working directory and are left out of hashed inputs, so built files in inputs
+do not change identification of step. Entries are evicted from the least recently used over size limit.
+"""
+
+import hashlib
+import os
+import shutil
+
+
+def normalize_path(path):
+    """
+    @param path: path relative to working directory.
+    @return: normalized path.
+    @raise ValueError: if path is absolute or leads out of working directory.
+    """
+    normalized = os.path.normpath(path)
+    if os.path.isabs(normalized) or normalized == ".." or normalized.startswith(".." + os.sep):
+        raise ValueError(f"Cached path must be relative to working directory: {path}")
+    return normalized
+
+
+def hash_inputs(inputs, outputs):
+    """
+    Hashes names and content of input files, input dirs are hashed recursively.
+
+    @param inputs: input paths relative to working directory.
+    @param outputs: output paths left out of inputs.
+    @return: hex digest.
+    """
+    excluded = [normalize_path(o) for o in outputs]
+
+    def is_output(path):
+        return any(path == o or path.startswith(o + os.sep) for o in excluded)
+
+    files = set()
+    for i in inputs:
+        i = normalize_path(i)
+        if os.path.isdir(i):
+            for subdir, dirs, names in os.walk(i):
+                files.update(os.path.normpath(os.path.join(subdir, n)) for n in names)
+        else:
+            files.add(i)
+
+    h = hashlib.sha256()
+    for f in sorted(files):
+        if is_output(f):
+            continue
+
+        h.update(f.encode() + b"\0")
+        if os.path.isfile(f):
+            with open(f, "rb") as fp:
+                for chunk in iter(lambda: fp.read(1024 * 1024), b""):
+                    h.update(chunk)
+        else:
+            h.update(b"missing")
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def step_key(step, source=None):
+    """
+    @param step: step with run, inputs and outputs.
+    @param source: hash of medusa-tests content for GIT test.
+    @return: identification of step in cache or None, if step has neither inputs nor source.
+    """
+    h = hashlib.sha256(step["run"].encode() + b"\0")
+    if step["inputs"]:
+        h.update(hash_inputs(step["inputs"], step["outputs"]).encode())
+    elif source:
+        h.update(source.encode())
+    else:
+        # Change of outputs' sources would not be noticed
+        return None
+    return h.hexdigest()
+
+
+def restore_outputs(cache_dir, key, outputs):
+    """
+    Copies cached outputs of step into working directory.
+
+    @param cache_dir: persistent cache dir.
+    @param key: identification of step.
+    @param outputs: output paths relative to working directory.
+    @return: True if outputs were cached.
+    """
+    entry = os.path.join(cache_dir, "steps", key)
+    if not os.path.isdir(entry):
+        return False
+
+    for o in outputs:
+        o = normalize_path(o)
+        copy_node(os.path.join(entry, o), o)
+
+    # Mark as recently used
+    os.utime(entry)
+    return True
+
+
+def store_outputs(cache_dir, key, outputs):
+    """
+    Copies outputs of step into cache. Entry is completed by rename, so interrupted store is never restored.
+
+    @param cache_dir: persistent cache dir.
+    @param key: identification of step.
+    @param outputs: output paths relative to working directory.
+    @raise FileNotFoundError: if step did not create declared output.
+    """
+    steps_dir = os.path.join(cache_dir, "steps")
+    entry = os.path.join(steps_dir, key)
+    tmp_entry = f"{entry}.part"
+    shutil.rmtree(tmp_entry, ignore_errors=True)
+
+    try:
+        for o in outputs:
+            o = normalize_path(o)
+            if not os.path.lexists(o):
+                raise FileNotFoundError(f"Declared output was not created: {o}")
+            copy_node(o, os.path.join(tmp_entry, o))
+
+        os.makedirs(steps_dir, exist_ok=True)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.rename(tmp_entry, entry)
+    finally:
+        shutil.rmtree(tmp_entry, ignore_errors=True)
+
+
+def prune_steps(cache_dir, max_bytes):
+    """
+    Removes least recently used entries of steps until their total size fits into limit.
+
+    @param cache_dir: persistent cache dir.
+    @param max_bytes: size limit of all entries in bytes.
+    @return: number of removed entries.
+    """
+    steps_dir = os.path.join(cache_dir, "steps")
+    if not os.path.isdir(steps_dir):
+        return 0
+
+    entries = []
+    for name in os.listdir(steps_dir):
+        entry = os.path.join(steps_dir, name)
+        size = sum(
+            os.path.getsize(os.path.join(subdir, f)) for subdir, _, files in os.walk(entry) for f in files
+            if not os.path.islink(os.path.join(subdir, f))
+        )
+        entries.append((os.path.getmtime(entry), size, entry))
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, entry in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+def copy_node(src, dest):
+    """
+    Copies file or directory tree, existing files are overwritten.
+
+    @param src: source path.
+    @param dest: destination path.
+    """
+    parent = os.path.dirname(dest)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+
+    if os.path.isdir(src) and not os.path.islink(src):
+        shutil.copytree(src, dest, symlinks=True, dirs_exist_ok=True)
+    else:
+        if os.path.lexists(dest) and not os.path.isdir(dest):
+            os.remove(dest)
+        shutil.copy2(src, dest, follow_symlinks=False)
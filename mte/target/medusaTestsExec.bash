@@ -1,4 +1,4 @@
 #!/bin/bash
 
 cd "$(dirname "$0")"
-sudo python3 runner.py
+sudo python3 runner.py "$@"
@@ -0,0 +1,72 @@
+import json
+import re
+
+
+def extract_metrics(test, output):
+    """
+    Extracts metrics declared by test from command output.
+
+    Metric declaration in execution block, compiled into test's metrics by host:
+        metrics:
+          - name: metric name
+            regex: expression with one group capturing numeric value
+            better: lower/higher (default lower)
+          - name: metric name
+            json: key of value in JSON line printed by command
+
+    Metrics which are not found in output are skipped.
+
+    @param test: compiled test.
+    @param output: std output of execution command.
+    @return: dictionary of metric name to value and direction.
+    """
+    if not test["metrics"]:
+        return {}
+
+    json_lines = parse_json_lines(output)
+
+    metrics = {}
+    for m in test["metrics"]:
+        name = m.get("name") or m.get("json")
+        value = None
+
+        if m.get("regex"):
+            match = re.search(m["regex"], output, re.MULTILINE)
+            if match:
+                value = match.group(1) if match.groups() else match.group(0)
+        elif m.get("json"):
+            # Last printed value wins
+            for line in reversed(json_lines):
+                if m["json"] in line:
+                    value = line[m["json"]]
+                    break
+
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            continue
+
+        metrics[name] = {"value": value, "better": m.get("better", "lower")}
+
+    return metrics
+
+
+def parse_json_lines(output):
+    """
+    Parses all lines of output containing JSON object.
+
+    @param output: command output.
+    @return: list of parsed objects.
+    """
+    result = []
+    for line in output.splitlines():
+        line = line.strip()
+        if not line.startswith("{"):
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(obj, dict):
+            result.append(obj)
+    return result
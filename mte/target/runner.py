@@ -1,40 +1,165 @@
+import argparse
+import atexit
+import json
 import logging
 import os
+import queue
+import signal
 import subprocess
 import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 from asynchronous_reader import Reader
-from setup import env_root, has_key, load_tests, validate_env, setup_env
+from cache import prune_steps, restore_outputs, step_key, store_outputs
+from metrics import extract_metrics
+from setup import env_root, helper_dir, load_checkpoint, load_plan, load_plan_header, load_skip, progress_file, \
+    save_checkpoint, setup_env, validate_env
+from stats import aggregate, compare
 from validator import Validator
 
+# Comparison modes and description of their baseline variant
+COMPARE_MODES = {
+    "constable": "Constable OFF",
+    "without_medusa_rules": "Constable without test rules"
+}
 
-def run_cmd(command):
+# Default time limit of single command in seconds, overridden by host with --command-timeout
+DEFAULT_COMMAND_TIMEOUT = 600
+
+# Size of log file before it is rotated and number of kept rotated files, only 'log' is downloaded by host,
+# host removes rotated files in SSHManager.clean_target
+LOG_MAX_BYTES = 50 * 1024 * 1024
+LOG_BACKUPS = 2
+command_timeout = DEFAULT_COMMAND_TIMEOUT
+
+# Persistent cache dir of build outputs, set by host with --cache-dir
+cache_dir = None
+
+# Size limit of cached build outputs in MB, overridden by host with --cache-max-size
+DEFAULT_CACHE_MAX_SIZE = 2048
+
+# Keys of tests completed in this run, including tests completed before resume
+completed_tests = set()
+
+# Steps marked 'once' run in this run by working directory and command, value is exception of failed step or None
+once_steps = {}
+
+
+class CommandTimeout(RuntimeError):
+    """
+    Raised when command does not finish in its time limit.
+    """
+    def __init__(self, command, timeout):
+        super().__init__(f"Command '{command}' timed out after {timeout} s.")
+
+
+def run_cmd(command, timeout=None):
     """
-    Runs shell command.
-    Replaces relative folder paths with full paths.
+    Runs shell command in its own process group.
+    Paths in commands are already substituted by host's plan compiler.
+    If command does not finish in time limit, whole process group is killed.
 
     @param command: shell command to execute.
+    @param timeout: time limit in seconds, defaults to global command timeout.
     @return: std out.
     """
-    command = command.replace("allowed", env_root + "/allowed")
-    command = command.replace("restricted", env_root + "/restricted")
-    command = command.replace("helper", env_root + "/helper")
+    timeout = timeout or command_timeout
+    process = subprocess.Popen(
+        command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True
+    )
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        kill_group(process)
+        raise CommandTimeout(command, timeout)
+
+    return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
 
-    return subprocess.run(command, shell=True, capture_output=True)
+def kill_group(process):
+    """
+    Kills process group of command and reaps the command.
+
+    @param process: command process, leader of the group.
+    """
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+    try:
+        process.communicate(timeout=5)
+    except subprocess.TimeoutExpired:
+        # Descendant left the group and holds output open
+        process.kill()
 
 def execute_handlers(test, key):
     """
     Runs list of commands from selected execution block.
+    Time limit of block is resolved by plan compiler, if not set, global default applies.
+    With cache dir set, step declaring outputs is skipped and its outputs restored, if its inputs did not change.
+    Step marked 'once' runs only for the first test using it, following tests reuse its result.
+    Cleanup block may remove what such steps created, so after it they run again in its working directory.
 
     @param test: test.
     @param key: block identifier.
     """
-    # Run list of commands
-    for cmd in test["setup"]:
-        result = run_cmd(cmd)
+    try:
+        # Run list of commands
+        for step in test[key]:
+            once_key = f"{os.getcwd()}:{step['run']}" if step["once"] else None
+            if once_key in once_steps:
+                if once_steps[once_key] is not None:
+                    raise once_steps[once_key]
+                logger.info("%s: '%s' already ran in this run, skipping.", test["name"], step["run"])
+                continue
+
+            try:
+                run_step(test, key, step)
+            except Exception as e:
+                if once_key:
+                    once_steps[once_key] = e
+                raise
+
+            if once_key:
+                once_steps[once_key] = None
+    finally:
+        if key == "cleanup":
+            forget_once_steps(os.getcwd())
+
+def forget_once_steps(cwd):
+    """
+    Forgets results of steps marked 'once' run in working directory, so next test using them runs them again.
 
-        if result.returncode != 0:
-            raise RuntimeError(f"Execution of '{key}' failed: {result.stderr.decode('utf-8')}")
+    @param cwd: working directory.
+    """
+    for once_key in [k for k in once_steps if k.startswith(f"{cwd}:")]:
+        del once_steps[once_key]
+
+def run_step(test, key, step):
+    """
+    Runs single step of execution block, step declaring outputs goes through cache if cache dir is set.
+
+    @param test: test.
+    @param key: block identifier.
+    @param step: step with run, inputs and outputs.
+    """
+    cache_key = step_key(step, test["source"]) if cache_dir is not None and step["outputs"] else None
+    cached = cache_key is not None
+    if cached:
+        if restore_outputs(cache_dir, cache_key, step["outputs"]):
+            logger.info("%s: '%s' is up to date, outputs restored from cache.", test["name"], step["run"])
+            return
+
+    result = run_cmd(step["run"], test["timeouts"][key])
+
+    if result.returncode != 0:
+        raise RuntimeError(f"Execution of '{key}' failed: {result.stderr.decode('utf-8')}")
+
+    if cached:
+        try:
+            store_outputs(cache_dir, cache_key, step["outputs"])
+        except Exception as e:
+            logger.error("%s: failed to cache outputs of '%s': %s", test["name"], step["run"], e)
 
 def read_dmesg():
     """
@@ -51,34 +176,20 @@ def helper():
     """
     logger.debug("Running helper")
     try:
-        run_cmd("mkdir helper/test")
-        run_cmd("rmdir helper/test")
+        run_cmd(f"mkdir {helper_dir}/test")
+        run_cmd(f"rmdir {helper_dir}/test")
     except:
         raise RuntimeError("Helper failed.")
 
-def create_constable():
-    """
-    Creates medusa.conf from template.
+def write_constable(config):
     """
-    src_path = os.path.join(env_root, "medusa-template.conf")
-    dest_path = os.path.join(env_root, "medusa.conf")
+    Writes medusa.conf rendered by plan compiler.
 
-    content = ""
-    with open(src_path, "r") as f:
-        content = f.read()
-
-    with open(dest_path, "w") as f:
-        f.write(content)
-
-def add_to_constable(config):
+    @param config: complete Medusa configuration.
     """
-    Adds configuration to medusa.conf.
-
-    @param config: configuration string to add.
-    """
-    with open(os.path.join(env_root, "medusa.conf"), "a") as f:
+    with open(os.path.join(env_root, "medusa.conf"), "w") as f:
         f.write(config)
-        f.close()
+
 def execute(test, constable):
     """
     Execution helper for main test execution.
@@ -89,7 +200,7 @@ def execute(test, constable):
 
     @param test: test to execute.
     @param constable: async reader hooked to Constable
-    @return: std, constable, sys log outputs.
+    @return: std, constable, sys log outputs and wall time of command.
     """
     # Clear constable and dmesg output
     read_dmesg()
@@ -99,8 +210,9 @@ def execute(test, constable):
     helper()
 
     # Run execution
-    execution = test["execution"]
-    out_std = run_cmd(execution["command"])
+    start = time.perf_counter()
+    out_std = run_cmd(test["command"], test["timeouts"]["execution"])
+    wall_time = time.perf_counter() - start
 
     helper()
     # Wait for outputs
@@ -108,7 +220,169 @@ def execute(test, constable):
     out_constable = constable.read() if constable else ""
     out_dmesg = read_dmesg()
 
-    return out_std, out_constable, out_dmesg
+    return out_std, out_constable, out_dmesg, wall_time
+
+def execute_iterations(test, constable):
+    """
+    Runs execution block of test repeatedly according to test's 'warmup' and 'iterations' settings.
+    Warmup runs are discarded. Pre-execution runs before every run and post-execution after every run
+    except the last one, which is left for caller after validation.
+
+    @param test: test to execute.
+    @param constable: async reader hooked to Constable
+    @return: std, constable, sys log outputs of last run, aggregated metrics and aggregated wall time.
+    """
+    warmup = test["warmup"]
+    runs = warmup + test["iterations"]
+
+    wall_times = []
+    samples = {}
+    directions = {}
+    for i in range(runs):
+        # Run pre-execution
+        if test["pre-execution"]:
+            logger.info("%s: running pre-execution.", test["name"])
+            execute_handlers(test, "pre-execution")
+
+        # Run execution
+        if runs > 1:
+            logger.info("%s: executing %srun %d/%d.", test["name"], "warmup " if i < warmup else "", i + 1, runs)
+        else:
+            logger.info("%s: executing.", test["name"])
+        out_std, out_constable, out_dmesg, wall_time = execute(test, constable)
+
+        # Collect samples
+        if i >= warmup:
+            wall_times.append(wall_time)
+            for k, v in extract_metrics(test, out_std.stdout.decode('utf-8')).items():
+                samples.setdefault(k, []).append(v["value"])
+                directions[k] = v["better"]
+
+        # Run post execution between runs
+        if i < runs - 1 and test["post-execution"]:
+            logger.info("%s: running post-execution.", test["name"])
+            execute_handlers(test, "post-execution")
+
+    metrics = {k: aggregate(v, better=directions[k]) for k, v in samples.items()}
+
+    return out_std, out_constable, out_dmesg, metrics, aggregate(wall_times)
+
+def start_constable(config):
+    """
+    Writes medusa.conf and starts Constable.
+
+    @param config: complete Medusa configuration.
+    @return: async reader hooked to Constable.
+    """
+    write_constable(config)
+
+    constable = Reader(f"sudo constable {env_root}/constable.conf")
+    time.sleep(.5)
+    return constable
+
+def run_variant(test, variant):
+    """
+    Runs execution block of test once in comparison variant.
+    Variant 'test' runs with Constable and test's configuration, variant 'baseline' runs
+    without Constable for 'constable' mode or with Constable without test's rules for 'without_medusa_rules' mode.
+
+    @param test: test to execute.
+    @param variant: 'test' or 'baseline'.
+    @return: std, constable, sys log outputs and wall time of command.
+    """
+    config = test["constable"] if variant == "test" else test["baseline_constable"]
+    constable = start_constable(config) if config is not None else None
+
+    try:
+        if test["pre-execution"]:
+            execute_handlers(test, "pre-execution")
+
+        outputs = execute(test, constable)
+
+        if test["post-execution"]:
+            execute_handlers(test, "post-execution")
+    finally:
+        if constable:
+            constable.terminate()
+
+    return outputs
+
+def run_comparison(test, validator):
+    """
+    Runs test in comparison mode set by test's 'compare' key.
+    Tested and baseline variants are interleaved (ABAB) to cancel drift of target performance,
+    'iterations' sets number of measured pairs and 'warmup' number of discarded pairs.
+    Expectations are validated on the last run of tested variant, baseline has to match expected return code.
+
+    @param test: test to execute.
+    @param validator: validator object.
+    """
+    mode = test["compare"]
+    if mode not in COMPARE_MODES:
+        raise ValueError(f"Unknown compare mode: {mode}")
+
+    # Run setup
+    if test["setup"]:
+        logger.info("%s: running setup.", test["name"])
+        execute_handlers(test, "setup")
+
+    warmup = test["warmup"]
+    runs = warmup + test["iterations"]
+
+    samples = {"test": {}, "baseline": {}}
+    directions = {}
+    outputs = None
+    baseline_code = None
+    for i in range(runs):
+        for variant in ("test", "baseline"):
+            logger.info("%s: executing %s variant, %srun %d/%d.", test["name"], variant, "warmup " if i < warmup else "", i + 1, runs)
+            out_std, out_constable, out_dmesg, wall_time = run_variant(test, variant)
+
+            if variant == "test":
+                outputs = (out_std, out_constable, out_dmesg)
+            else:
+                baseline_code = out_std.returncode
+
+            if i < warmup:
+                continue
+
+            samples[variant].setdefault("wall_time", []).append(wall_time)
+            for k, v in extract_metrics(test, out_std.stdout.decode('utf-8')).items():
+                samples[variant].setdefault(k, []).append(v["value"])
+                directions[k] = v["better"]
+
+    expect = test["expect"]
+    if expect["return_code"] is not None and baseline_code != expect["return_code"]:
+        raise RuntimeError(f"Baseline variant returned {baseline_code}, expected {expect['return_code']}.")
+
+    # Compare variants
+    comparison = {"mode": mode, "baseline": COMPARE_MODES[mode], "metrics": {}}
+    for k, test_samples in samples["test"].items():
+        baseline_samples = samples["baseline"].get(k)
+        if not baseline_samples:
+            continue
+
+        result = compare(test_samples, baseline_samples)
+        if k == "wall_time":
+            comparison["wall_time"] = result
+        else:
+            comparison["metrics"][k] = result
+
+        overhead = "n/a" if result["overhead"] is None else f"{result['overhead']:+.2f} %"
+        logger.info(
+            "%s: %s overhead %s, p-value %s, %s.", test["name"], k, overhead, result["p_value"],
+            "significant" if result["significant"] else "not significant"
+        )
+
+    metrics = {k: aggregate(v, better=directions[k]) for k, v in samples["test"].items() if k != "wall_time"}
+
+    # Validate results
+    validator.validate(test, *outputs, metrics, aggregate(samples["test"]["wall_time"]), comparison)
+
+    # Run cleanup
+    if test["cleanup"]:
+        logger.info("%s: running cleanup.", test["name"])
+        execute_handlers(test, "cleanup")
 
 def run_single_test(test, validator):
     """
@@ -117,165 +391,237 @@ def run_single_test(test, validator):
     @param test: test to execute.
     @param validator: validator object.
     """
+    start = time.perf_counter()
+    record_progress("start", test)
+
+    if test["compare"]:
+        try:
+            run_comparison(test, validator)
+        except CommandTimeout as e:
+            logger.error("%s timed out. \n%s", test["name"], e)
+            validator.timed_out(test, e)
+        except Exception as e:
+            logger.error("%s failed. \n%s", test["name"], e)
+            validator.failed(test, e)
+
+        validator.record_duration(test, time.perf_counter() - start)
+        complete_test(test, validator)
+        return
+
     constable = None
     try:
         # Run setup
-        if has_key(test, "setup"):
-            logger.info(f"{test['name']}: running setup.")
+        if test["setup"]:
+            logger.info("%s: running setup.", test["name"])
             execute_handlers(test, "setup")
 
         # Create constable
-        using_constable = not has_key(test, "use_constable") or test["use_constable"]
-        if using_constable:
-            logger.info(f"{test['name']}: creating constable.")
-            create_constable()
-
-            if has_key(test, "constable"):
-                add_to_constable(test["constable"])
-
-            # constable.start()
-            constable = Reader(f"sudo constable {env_root}/constable.conf")
-            time.sleep(.5)
-
-        # Run pre-execution
-        if has_key(test, "pre-execution"):
-            logger.info(f"{test['name']}: running pre-execution.")
-            execute_handlers(test, "pre-execution")
+        if test["use_constable"]:
+            logger.info("%s: creating constable.", test["name"])
+            constable = start_constable(test["constable"])
 
         # Run execution
-        logger.info(f"{test['name']}: executing.")
-        out_std, out_constable, out_dmesg = execute(test, constable if using_constable else None)
+        out_std, out_constable, out_dmesg, metrics, wall_time = execute_iterations(test, constable)
 
         # Validate results
-        validator.validate(test, out_std, out_constable, out_dmesg)
+        validator.validate(test, out_std, out_constable, out_dmesg, metrics, wall_time)
 
         # Run post execution
-        if has_key(test, "post-execution"):
-            logger.info(f"{test['name']}: running post-execution.")
+        if test["post-execution"]:
+            logger.info("%s: running post-execution.", test["name"])
             execute_handlers(test, "post-execution")
 
         # Stop Constable
         if constable:
             constable.terminate()
-            logger.info(f"{test['name']}: terminated Constable.")
+            logger.info("%s: terminated Constable.", test["name"])
 
         # Run cleanup
-        if has_key(test, "cleanup"):
-            logger.info(f"{test['name']}: running cleanup.")
+        if test["cleanup"]:
+            logger.info("%s: running cleanup.", test["name"])
             execute_handlers(test, "cleanup")
     except Exception as e:
-        logger.error(f"{test['name']} failed. \n{str(e)}")
+        if isinstance(e, CommandTimeout):
+            logger.error("%s timed out. \n%s", test["name"], e)
+            validator.timed_out(test, e)
+        else:
+            logger.error("%s failed. \n%s", test["name"], e)
 
-        # Assign error result
-        validator.failed(test, e)
+            # Assign error result
+            validator.failed(test, e)
 
         # Stop Constable if running
         if constable:
             constable.terminate()
 
-def run_multiple(tests, validator):
-    logger.info(f"Creating constable.")
-    create_constable()
+    validator.record_duration(test, time.perf_counter() - start)
+    complete_test(test, validator)
+
+def run_suite(unit, validator, tests):
+    """
+    Runs tests of one suite with shared Constable.
+    Duration of each test is sum of its setup, execution and cleanup.
+
+    @param unit: suite unit with rendered Constable configuration.
+    @param validator: validator object.
+    @param tests: tests of suite to run.
+    """
+    durations = {}
 
     # Setup block
     for test in tests:
+        start = time.perf_counter()
+        record_progress("setup", test)
         try:
             # Run setup for each test
-            if has_key(test, "setup"):
-                logger.info(f"{test['name']}: running setup.")
+            if test["setup"]:
+                logger.info("%s: running setup.", test["name"])
                 execute_handlers(test, "setup")
-
-            # Add configuration to constable for each test
-            if has_key(test, "constable"):
-                add_to_constable(test["constable"])
         except Exception as e:
             logger.error(e)
+        durations[id(test)] = time.perf_counter() - start
 
     # Start Constable
-    constable = Reader(f"sudo constable {env_root}/constable.conf")
-    time.sleep(.5)
+    logger.info("Creating constable.")
+    constable = start_constable(unit["constable"])
 
     # Execution block
     for test in tests:
+        start = time.perf_counter()
+        record_progress("start", test)
         try:
-            # Run pre-execution
-            if has_key(test, "pre-execution"):
-                logger.info(f"{test['name']}: running pre-execution.")
-                execute_handlers(test, "pre-execution")
-
             # Run execution
-            logger.info(f"{test['name']}: executing.")
-            out_std, out_constable, out_dmesg = execute(test, constable)
+            out_std, out_constable, out_dmesg, metrics, wall_time = execute_iterations(test, constable)
 
             # Validate results
-            validator.validate(test, out_std, out_constable, out_dmesg)
+            validator.validate(test, out_std, out_constable, out_dmesg, metrics, wall_time)
 
             # Run post execution
-            if has_key(test, "post-execution"):
-                logger.info(f"{test['name']}: running post-execution.")
+            if test["post-execution"]:
+                logger.info("%s: running post-execution.", test["name"])
                 execute_handlers(test, "post-execution")
+        except CommandTimeout as e:
+            logger.error("%s timed out. \n%s", test["name"], e)
+            validator.timed_out(test, e)
         except Exception as e:
             validator.failed(test, e)
+        durations[id(test)] += time.perf_counter() - start
+        complete_test(test, validator)
 
     # Stop Constable
     if constable:
         constable.terminate()
-        logger.info(f"Terminated Constable.")
+        logger.info("Terminated Constable.")
 
     # Cleanup block
     for test in tests:
+        start = time.perf_counter()
+        record_progress("cleanup", test)
         try:
-            if has_key(test, "cleanup"):
-                logger.info(f"{test['name']}: running cleanup.")
+            if test["cleanup"]:
+                logger.info("%s: running cleanup.", test["name"])
                 execute_handlers(test, "cleanup")
         except Exception as e:
             logger.error(e)
+        validator.record_duration(test, durations[id(test)] + time.perf_counter() - start)
 
-
-def run_local_tests(tests, validator):
+def run_unit(unit, validator, tests):
     """
-    Runs and handles LOCAL tests.
+    Runs execution unit of plan in its working directory.
 
-    @param tests: LOCAL tests
+    @param unit: suite or single test unit.
     @param validator: test validator instance.
+    @param tests: tests of unit to run.
     """
-    # Group by source file
-    grouped_tests = {}
-
-    logger.debug("Grouping suites.")
-    for t in tests:
-        src = t['src']
-        if src not in grouped_tests:
-            grouped_tests[src] = []
-        grouped_tests[src].append(t)
+    if unit["cwd"]:
+        # Navigate to unit dir, e.g. git repository
+        os.chdir(os.path.join(env_root, unit["cwd"]))
 
-    for k in grouped_tests.keys():
-        logger.info(f"Running tests for suite: {src}")
+    try:
+        if unit["kind"] == "suite":
+            logger.info("Running tests for suite: %s", unit["src"])
+            run_suite(unit, validator, tests)
+        else:
+            logger.info("Running test: %s", tests[0]["name"])
+            run_single_test(tests[0], validator)
+    finally:
+        # Navigate back to env
+        os.chdir(env_root)
+
+def run_tests(validator, skip=None):
+    """
+    Streams units of plan compiled by host and runs them in order.
+    Tests completed before resume are left out, tests marked by host as hung are recorded as hung.
 
-        run_multiple(grouped_tests[k], validator)
+    @param validator: test validator instance.
+    @param skip: keys of tests marked as hung.
+    """
+    for unit in load_plan():
+        tests = []
+        for t in unit["tests"]:
+            if t["key"] in completed_tests:
+                continue
+            if skip and t["key"] in skip:
+                logger.info("%s: marked as hung, skipping.", t["name"])
+                validator.hung(t)
+                complete_test(t, validator)
+                continue
+            tests.append(t)
+
+        if not tests:
+            continue
+
+        run_unit(unit, validator, tests)
         time.sleep(3)
 
-def run_git_tests(tests, validator):
+def record_progress(event, test=None):
     """
-    Changes dir to git repository and runs GIT tests.
+    Appends progress event to progress file, read by host watchdog.
 
-    @param tests: GIT tests
-    @param validator: test validator instance.
+    @param event: event name: 'run', 'resume' (run resumed from checkpoint), 'start', 'setup', 'cleanup', 'end' or 'done'.
+    @param test: test the event belongs to.
     """
-    if not tests or len(tests) == 0:
-        return
+    with open(progress_file, "a") as f:
+        f.write(json.dumps({
+            "event": event,
+            "name": test["name"] if test else None,
+            "src": test.get("src") if test else None,
+            "time": time.time()
+        }) + "\n")
+
+def complete_test(test, validator):
+    """
+    Records end of test to progress and checkpoints run, so resumed run skips the test
+    and successful steps marked 'once'.
 
-    # Navigate to git dir
-    os.chdir(os.path.join(env_root, "medusa-tests"))
+    @param test: completed test.
+    @param validator: test validator instance.
+    """
+    record_progress("end", test)
+    completed_tests.add(test["key"])
+    save_checkpoint({
+        "completed": sorted(completed_tests),
+        "once_steps": sorted(k for k, e in once_steps.items() if e is None),
+        **validator.state()
+    })
+
+def resume_run(validator):
+    """
+    Restores state of interrupted run from checkpoint.
+    Completed tests are skipped, tests marked by host as hung are recorded as hung and skipped,
+    test which was in flight is run again.
 
-    # Execute tests
-    for test in tests:
-        logger.info(f"Running git test: {test['name']}")
-        run_single_test(test, validator)
-        time.sleep(3)
+    @param validator: test validator instance.
+    @return: keys of tests marked as hung.
+    """
+    checkpoint = load_checkpoint()
+    if checkpoint:
+        validator.restore(checkpoint)
+        completed_tests.update(checkpoint["completed"])
+        once_steps.update({k: None for k in checkpoint.get("once_steps", [])})
 
-    # Navigate back to env
-    os.chdir(env_root)
+    logger.info("Resuming run, %s tests completed.", len(completed_tests))
+    return load_skip()
 
 def record_execution_result(result):
     """
@@ -287,42 +633,89 @@ def record_execution_result(result):
         f.write(result)
         f.close()
 
+def setup_logging(resume):
+    """
+    Sets up logging through queue to background writer of rotated log file, so tests never wait for log I/O.
+    Messages with %-style arguments are formatted by writer.
+
+    @param resume: append to log of interrupted run.
+    @return: logger.
+    """
+    log_file = f"{env_root}/log"
+    if not resume and os.path.exists(log_file):
+        os.remove(log_file)
+
+    handler = RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS)
+    handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s]: %(message)s"))
+
+    log_queue = queue.Queue()
+    queue_handler = QueueHandler(log_queue)
+    # Pass record unformatted, message is formatted by writer
+    queue_handler.prepare = lambda record: record
+
+    root = logging.getLogger()
+    root.addHandler(queue_handler)
+    root.setLevel(logging.DEBUG)
+
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    return root
+
+
 if __name__ == "__main__":
-    # Setup logger
-    logging.basicConfig(
-        filename=f"{env_root}/log",
-        filemode="w",
-        level=logging.DEBUG,
-        format="%(asctime)s [%(levelname)s]: %(message)s"
+    arg_parser = argparse.ArgumentParser(description="Runs prepared Medusa tests.")
+    arg_parser.add_argument("--resume", action="store_const", const=True, help="Resume interrupted run from checkpoint.")
+    arg_parser.add_argument(
+        "--command-timeout", type=float, default=DEFAULT_COMMAND_TIMEOUT,
+        help=f"Default time limit of command in seconds. Default = {DEFAULT_COMMAND_TIMEOUT}"
     )
-    logger = logging.getLogger()
+    arg_parser.add_argument("--cache-dir", help="Persistent cache dir of build outputs, cache is not used if not set.")
+    arg_parser.add_argument(
+        "--cache-max-size", type=float, default=DEFAULT_CACHE_MAX_SIZE,
+        help=f"Size limit of cached build outputs in MB. Default = {DEFAULT_CACHE_MAX_SIZE}"
+    )
+    args = arg_parser.parse_args()
+    command_timeout = args.command_timeout
+    cache_dir = args.cache_dir
+
+    # Setup logger
+    logger = setup_logging(bool(args.resume))
 
     try:
         # Setup environment
         logger.info("Running setup... ")
-        setup_env()
+        setup_env(bool(args.resume))
         validate_env()
         logger.info("Setup finished. ")
 
-        # load tests
-        loaded_tests = load_tests()
-        logger.info("Tests loaded.")
+        # Read plan
+        header = load_plan_header()
+        logger.info("Plan loaded: %s tests in %s units.", header["tests"], header["units"])
 
         validator = Validator()
         logger.info("Validator ready.")
 
+        skip = resume_run(validator) if args.resume else None
+        record_progress("resume" if args.resume else "run")
+
         # Clear dmesg
         run_cmd("dmesg -ce")
         logger.info("Cleared system log.")
 
-        # Execute git tests
-        run_git_tests([t for t in loaded_tests if t["type"] == "GIT"], validator)
-
         # Execute tests
-        run_local_tests([t for t in loaded_tests if t["type"] == "LOCAL"], validator)
+        run_tests(validator, skip)
+
+        # Keep cached build outputs in size limit
+        if cache_dir:
+            removed = prune_steps(cache_dir, args.cache_max_size * 1024 * 1024)
+            if removed:
+                logger.info("Evicted %s least recently used cache entries.", removed)
 
         # Dump test summary
         validator.dump_results()
+        record_progress("done")
 
         # Mark as successful test run
         record_execution_result("SUCCESS")
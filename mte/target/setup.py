@@ -1,5 +1,5 @@
+import json
 import os
-import pickle
 import shutil
 
 env_root = os.path.dirname(__file__)
@@ -8,6 +8,14 @@ allowed_dir = os.path.join(env_root, "allowed")
 helper_dir = os.path.join(env_root, "helper")
 results_dir = os.path.join(env_root, "results")
 result_details_dir = os.path.join(results_dir, "details")
+progress_file = os.path.join(env_root, "progress")
+checkpoint_file = os.path.join(env_root, "checkpoint.json")
+skip_file = os.path.join(env_root, "skip.json")
+exit_file = os.path.join(env_root, "exit")
+plan_file = os.path.join(env_root, "plan.jsonl")
+
+# Supported version of execution plan, must match PLAN_VERSION of host's plan compiler
+PLAN_VERSION = 3
 
 def clear_dir(path):
     """
@@ -17,20 +25,35 @@ def clear_dir(path):
     """
     shutil.rmtree(path, ignore_errors=True)
 
-def setup_env():
+def setup_env(resume=False):
     """
     Creates and clears required directory structure.
+    When resuming, results, progress and checkpoint of interrupted run are kept.
+
+    @param resume: if run is resumed.
     """
-    # Remove old results if present
-    try:
-        os.remove(os.path.join(env_root, "results"))
-        os.remove(os.path.join(env_root, "results_details"))
-    except:
-        pass
+    # Remove exit state of previous run
+    if os.path.exists(exit_file):
+        os.remove(exit_file)
+
+    if not resume:
+        # Remove old results if present
+        try:
+            os.remove(os.path.join(env_root, "results"))
+            os.remove(os.path.join(env_root, "results_details"))
+        except:
+            pass
+
+        # Clear progress and checkpoint of previous run
+        for f in [progress_file, checkpoint_file, skip_file]:
+            if os.path.exists(f):
+                os.remove(f)
+
+        # Clear results
+        clear_dir(results_dir)
+        clear_dir(result_details_dir)
 
     # Clear directories
-    clear_dir(results_dir)
-    clear_dir(result_details_dir)
     clear_dir(restricted_dir)
     clear_dir(allowed_dir)
     clear_dir(helper_dir)
@@ -68,44 +91,73 @@ def validate_env():
     if not os.path.exists(allowed_dir):
         raise FileNotFoundError("Missing allowed dir.")
 
-    required_path = os.path.join(env_root, "medusa-template.conf")
-    if not os.path.exists(required_path):
-        raise FileNotFoundError("Missing configuration: medusa-template.conf")
-
     required_path = os.path.join(env_root, "constable.conf")
     if not os.path.exists(required_path):
         raise FileNotFoundError("Missing configuration: constable.conf")
 
-def load_tests():
+    if not os.path.exists(plan_file):
+        raise FileNotFoundError("Missing execution plan: plan.jsonl")
+
+    header = load_plan_header()
+    if header.get("version") != PLAN_VERSION:
+        raise ValueError(f"Unsupported execution plan version: {header.get('version')}, expected {PLAN_VERSION}.")
+
+def load_plan_header():
     """
-    Loads tests from pickle file.
+    Loads header of execution plan.
 
-    @return: loaded tests.
+    @return: plan header with version, testing location and counts.
     """
-    file_path = os.path.join(env_root, "local.pickle")
-    tests = None
+    with open(plan_file, "r") as f:
+        return json.loads(f.readline())
 
-    with open(file_path, "rb") as f:
-        tests = pickle.load(f)
+def load_plan():
+    """
+    Streams execution units from plan compiled by host.
 
-    return tests
+    @return: generator of units in run order.
+    """
+    with open(plan_file, "r") as f:
+        # Skip header
+        f.readline()
 
-def has_key(dictionary, key):
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def save_checkpoint(state):
+    """
+    Atomically writes checkpoint of run, so it survives crash of target.
+
+    @param state: checkpoint state.
+    """
+    tmp_path = checkpoint_file + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, checkpoint_file)
+
+def load_checkpoint():
     """
-    helper function to check if dictionary has valid key.
+    Loads checkpoint of interrupted run.
 
-    @param dictionary: dict to check.
-    @param key: key to validate.
-    @return: if key exists and has valid value.
+    @return: checkpoint state or None if there is no checkpoint.
     """
-    if not key in dictionary:
-        return False
+    if not os.path.exists(checkpoint_file):
+        return None
 
-    item = dictionary[key]
-    if item is None:
-        return False
+    with open(checkpoint_file, "r") as f:
+        return json.load(f)
 
-    if isinstance(item, list) and len(item) == 0:
-        return False
+def load_skip():
+    """
+    Loads keys of tests, which host marked as hung and are to be skipped on resume.
+
+    @return: set of test keys.
+    """
+    if not os.path.exists(skip_file):
+        return set()
 
-    return True
\ No newline at end of file
+    with open(skip_file, "r") as f:
+        return set(json.load(f))
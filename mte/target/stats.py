@@ -0,0 +1,184 @@
+import math
+import statistics
+
+# Two-sided 95 % critical values of Student's t distribution for 1 - 30 degrees of freedom
+T_CRITICAL_95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042
+]
+
+
+def t_critical(df):
+    """
+    Returns two-sided 95 % critical value of t distribution.
+
+    @param df: degrees of freedom.
+    @return: critical value, normal approximation for more than 30 degrees of freedom.
+    """
+    if df < 1:
+        return float("nan")
+    if df <= len(T_CRITICAL_95):
+        return T_CRITICAL_95[df - 1]
+    return 1.960
+
+
+def percentile(samples, p):
+    """
+    Computes percentile with linear interpolation between closest ranks.
+
+    @param samples: list of values.
+    @param p: percentile in range 0 - 100.
+    @return: percentile value.
+    """
+    ordered = sorted(samples)
+    if len(ordered) == 1:
+        return ordered[0]
+
+    rank = (len(ordered) - 1) * p / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(samples):
+    """
+    Computes descriptive statistics of samples.
+
+    @param samples: list of values.
+    @return: dictionary with n, mean, median, p95, stdev and 95 % confidence interval of mean.
+    """
+    n = len(samples)
+    mean = statistics.fmean(samples)
+    stdev = statistics.stdev(samples) if n > 1 else 0.0
+    margin = t_critical(n - 1) * stdev / math.sqrt(n) if n > 1 else 0.0
+
+    return {
+        "n": n,
+        "mean": mean,
+        "median": statistics.median(samples),
+        "p95": percentile(samples, 95),
+        "stdev": stdev,
+        "ci95": [mean - margin, mean + margin]
+    }
+
+
+def aggregate(samples, **extra):
+    """
+    Aggregates samples of repeated measurement into result value.
+    Statistics are included only for more than one sample.
+
+    @param samples: list of values.
+    @param extra: additional keys of result.
+    @return: dictionary with mean value, samples and statistics.
+    """
+    result = {"value": statistics.fmean(samples), **extra}
+    if len(samples) > 1:
+        result["samples"] = samples
+        result["stats"] = summarize(samples)
+    return result
+
+
+def beta_continued_fraction(a, b, x):
+    """
+    Evaluates continued fraction of incomplete beta function by modified Lentz's method.
+    """
+    tiny = 1e-300
+    qab = a + b
+    qap = a + 1.0
+    qam = a - 1.0
+    c = 1.0
+    d = 1.0 - qab * x / qap
+    d = tiny if abs(d) < tiny else d
+    d = 1.0 / d
+    h = d
+
+    for m in range(1, 300):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1.0 + aa * d
+        d = tiny if abs(d) < tiny else d
+        c = 1.0 + aa / c
+        c = tiny if abs(c) < tiny else c
+        d = 1.0 / d
+        h *= d * c
+
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1.0 + aa * d
+        d = tiny if abs(d) < tiny else d
+        c = 1.0 + aa / c
+        c = tiny if abs(c) < tiny else c
+        d = 1.0 / d
+        delta = d * c
+        h *= delta
+
+        if abs(delta - 1.0) < 1e-12:
+            break
+    return h
+
+
+def incomplete_beta(a, b, x):
+    """
+    Regularized incomplete beta function I_x(a, b).
+    """
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+
+    ln_front = math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log(1.0 - x)
+    front = math.exp(ln_front)
+
+    if x < (a + 1.0) / (a + b + 2.0):
+        return front * beta_continued_fraction(a, b, x) / a
+    return 1.0 - front * beta_continued_fraction(b, a, 1.0 - x) / b
+
+
+def welch_t_test(a, b):
+    """
+    Welch's two-sided t-test of equal means for samples with unequal variances.
+
+    @param a: first samples.
+    @param b: second samples.
+    @return: t statistic, degrees of freedom and p-value, None values if test cannot be computed.
+    """
+    if len(a) < 2 or len(b) < 2:
+        return None, None, None
+
+    va = statistics.variance(a) / len(a)
+    vb = statistics.variance(b) / len(b)
+    diff = statistics.fmean(a) - statistics.fmean(b)
+
+    if va + vb == 0:
+        # No variance, means are either identical or certainly different
+        return 0.0 if diff == 0 else math.copysign(math.inf, diff), None, 1.0 if diff == 0 else 0.0
+
+    t = diff / math.sqrt(va + vb)
+    df = (va + vb) ** 2 / (va ** 2 / (len(a) - 1) + vb ** 2 / (len(b) - 1))
+    p = incomplete_beta(df / 2, 0.5, df / (df + t * t))
+
+    return t, df, p
+
+
+def compare(test_samples, baseline_samples, alpha=0.05):
+    """
+    Compares samples of tested variant with baseline variant.
+
+    @param test_samples: samples of tested variant.
+    @param baseline_samples: samples of baseline variant.
+    @param alpha: significance level.
+    @return: dictionary with means, relative overhead in percent and significance test result.
+    """
+    test_mean = statistics.fmean(test_samples)
+    baseline_mean = statistics.fmean(baseline_samples)
+    t, df, p = welch_t_test(test_samples, baseline_samples)
+
+    return {
+        "test": test_mean,
+        "baseline": baseline_mean,
+        "overhead": (test_mean - baseline_mean) / abs(baseline_mean) * 100 if baseline_mean else None,
+        "t": t,
+        "df": df,
+        "p_value": p,
+        "significant": p is not None and p < alpha
+    }
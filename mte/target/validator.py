@@ -1,7 +1,8 @@
+import json
 import os
 from enum import Enum
 
-from setup import results_dir, result_details_dir, has_key
+from setup import results_dir, result_details_dir
 
 
 class Result(Enum):
@@ -19,11 +20,12 @@ class Validator:
 
     def __init__(self):
         """
-        Initializes dictionary with overal results.
+        Initializes dictionary with overal results and list of structured per test records.
         """
-        self.test_results = {"success": 0, "failed": 0, "partial": 0}
+        self.test_results = {"success": 0, "failed": 0, "partial": 0, "hung": 0, "timeout": 0}
+        self.records = []
 
-    def validate(self, test, out_std, out_constable, out_dmesg):
+    def validate(self, test, out_std, out_constable, out_dmesg, metrics=None, wall_time=None, comparison=None):
         """
         Main validation function.
         Verifies outputs with test's expected values.
@@ -36,9 +38,12 @@ class Validator:
         @param out_std: std output from command.
         @param out_constable: Constable output
         @param out_dmesg: system log output.
+        @param metrics: metrics extracted from output.
+        @param wall_time: execution wall time.
+        @param comparison: comparison of tested and baseline variant.
         """
         # Extract expected results
-        expect = test["execution"]["results"]
+        expect = test["expect"]
 
         result = {
             "name": test["name"],
@@ -49,7 +54,7 @@ class Validator:
 
         vc = 0
         # Validate stdout
-        if has_key(expect, "return_code"):
+        if expect["return_code"] is not None:
             r = expect["return_code"] == out_std.returncode
 
             result["output"] = Result(int(r))
@@ -59,11 +64,7 @@ class Validator:
             vc += 1
 
         # Validate constable
-        using_constable = True
-        if has_key(test, "using_constable"):
-            using_constable = test["using_constable"]
-
-        if has_key(expect, "constable") and using_constable:
+        if expect["constable"] and test["use_constable"]:
             r = expect["constable"] in str(out_constable)
 
             result["constable"] = Result(int(r))
@@ -73,7 +74,7 @@ class Validator:
             vc += 1
 
         # Validate dmesg
-        if has_key(expect, "dmesg"):
+        if expect["dmesg"]:
             r = expect["dmesg"] in str(out_dmesg)
 
             result["dmesg"] = Result(int(r))
@@ -84,17 +85,28 @@ class Validator:
 
         # Assign result group
         if vc == 0:
-            self.test_results["failed"] += 1
+            status = "failed"
         elif vc == 3:
-            self.test_results["success"] += 1
+            status = "success"
         else:
-            self.test_results["partial"] += 1
+            status = "partial"
+        self.test_results[status] += 1
 
         # Append to global results
         self.__append_to_results(result)
 
         # Create details result file
-        self.__append_to_details(test["name"], out_std, out_constable, out_dmesg)
+        self.__append_to_details(test["name"], out_std, out_constable, out_dmesg, metrics, wall_time, comparison)
+
+        # Append structured record
+        self.__append_record(test, status, {
+            "output": result["output"].name,
+            "constable": result["constable"].name,
+            "dmesg": result["dmesg"].name,
+            "metrics": metrics or {},
+            "wall_time": wall_time,
+            "comparison": comparison
+        })
 
     def failed(self, test, exception):
         """
@@ -115,7 +127,29 @@ class Validator:
             f.write(f"{name} {'-' * (32 - len(name))}\n")
             f.write(f"\nerror:\n{str(exception)}\n")
 
-    def __append_to_details(self, name, out_std, out_constable, out_dmesg):
+        # Append structured record
+        self.__append_record(test, "failed", {"error": str(exception)})
+
+    def timed_out(self, test, exception):
+        """
+        Records test, whose command exceeded its time limit and was killed.
+
+        @param test: timed out test.
+        @param exception: timeout exception.
+        """
+        name = test["name"]
+        self.test_results["timeout"] += 1
+
+        with open(os.path.join(results_dir, "results"), "a") as f:
+            f.write(f"{name}:{' ' * (32 - len(name))}Timed out, see details.\n")
+
+        with open(os.path.join(results_dir, "details", test["name"]), "w") as f:
+            f.write(f"{name} {'-' * (32 - len(name))}\n")
+            f.write(f"\nerror:\n{str(exception)}\n")
+
+        self.__append_record(test, "timeout", {"error": str(exception)})
+
+    def __append_to_details(self, name, out_std, out_constable, out_dmesg, metrics, wall_time, comparison):
         """
         Records outputs to test's result details report.
 
@@ -123,12 +157,131 @@ class Validator:
         @param out_std: std output.
         @param out_constable: Constable output
         @param out_dmesg: sys log output.
+        @param metrics: extracted metrics.
+        @param wall_time: execution wall time.
+        @param comparison: comparison of tested and baseline variant.
         """
         with open(os.path.join(result_details_dir, name), "w") as f:
             f.write(f"{name} {'-' * (32 - len(name))}")
             f.write(f"\noutput:\n{out_std.stdout.decode('utf-8')+out_std.stderr.decode('utf-8')}")
             f.write(f"\nconstable:\n{str(out_constable)}")
             f.write(f"\ndmesg:\n{str(out_dmesg)}\n")
+
+            if metrics or wall_time:
+                f.write("\nmetrics:\n")
+                if wall_time:
+                    f.write(self.__format_metric("wall_time", wall_time))
+                for k, v in (metrics or {}).items():
+                    f.write(self.__format_metric(k, v))
+
+            if comparison:
+                f.write(f"\ncomparison with {comparison['baseline']}:\n")
+                if "wall_time" in comparison:
+                    f.write(self.__format_comparison("wall_time", comparison["wall_time"]))
+                for k, v in comparison["metrics"].items():
+                    f.write(self.__format_comparison(k, v))
+
+    @staticmethod
+    def __format_metric(name, metric):
+        """
+        Formats metric line for details report.
+
+        @param name: metric name.
+        @param metric: aggregated metric.
+        @return: formatted line.
+        """
+        if "stats" not in metric:
+            return f"{name}: {metric['value']}\n"
+
+        s = metric["stats"]
+        return (
+            f"{name}: mean {s['mean']:.6g}, median {s['median']:.6g}, p95 {s['p95']:.6g}, "
+            f"stdev {s['stdev']:.6g}, ci95 [{s['ci95'][0]:.6g}, {s['ci95'][1]:.6g}], n {s['n']}\n"
+        )
+
+    @staticmethod
+    def __format_comparison(name, result):
+        """
+        Formats comparison line for details report.
+
+        @param name: metric name.
+        @param result: comparison result.
+        @return: formatted line.
+        """
+        overhead = "n/a" if result["overhead"] is None else f"{result['overhead']:+.2f} %"
+        significance = "significant" if result["significant"] else "not significant"
+        return (
+            f"{name}: test {result['test']:.6g}, baseline {result['baseline']:.6g}, "
+            f"overhead {overhead}, p-value {result['p_value']} ({significance})\n"
+        )
+
+    def hung(self, test):
+        """
+        Records test, which was marked as hung by host watchdog.
+
+        @param test: hung test.
+        """
+        name = test["name"]
+        self.test_results["hung"] += 1
+
+        with open(os.path.join(results_dir, "results"), "a") as f:
+            f.write(f"{name}:{' ' * (32 - len(name))}Hung, stopped by watchdog.\n")
+
+        self.__append_record(test, "hung", {})
+
+    def state(self):
+        """
+        @return: state of validator for checkpoint.
+        """
+        return {"test_results": self.test_results, "records": self.records}
+
+    def restore(self, state):
+        """
+        Restores validator state from checkpoint of interrupted run.
+
+        @param state: state created by state method.
+        """
+        self.test_results.update(state["test_results"])
+        self.records = state["records"]
+
+    def record_duration(self, test, duration):
+        """
+        Records total duration of test into its structured record.
+
+        @param test: finished test.
+        @param duration: duration in seconds.
+        """
+        for r in reversed(self.records):
+            if r["name"] == test["name"] and r["src"] == test.get("src"):
+                r["duration"] = duration
+                self.__write_structured()
+                return
+
+    def __append_record(self, test, status, data):
+        """
+        Appends structured record of test result, dumped into results.json.
+
+        @param test: test.
+        @param status: result group.
+        @param data: additional result data.
+        """
+        self.records.append({
+            "name": test["name"],
+            "src": test.get("src"),
+            "type": test.get("type"),
+            "status": status,
+            **data
+        })
+        self.__write_structured()
+
+    def __write_structured(self):
+        """
+        Writes structured results into results.json.
+        Written after every test, so partial results are available, if run is interrupted.
+        """
+        with open(os.path.join(results_dir, "results.json"), "w") as f:
+            json.dump({"summary": self.test_results, "tests": self.records}, f, indent=2)
+
     def __append_to_results(self, results):
         """
         Appends results to overal results report.
@@ -150,13 +303,19 @@ class Validator:
         success_count = self.test_results["success"]
         failed_count = self.test_results["failed"]
         partial_count = self.test_results["partial"]
+        hung_count = self.test_results["hung"]
+        timeout_count = self.test_results["timeout"]
 
         # Write overall test results to file
         with open(os.path.join(results_dir, "results"), 'r+') as f:
             content = f.read()
             f.seek(0,0)
             f.write(
-                f"Testing complete: {success_count} passed, {failed_count} failed, {partial_count} partial\n{content}"
+                f"Testing complete: {success_count} passed, {failed_count} failed, {partial_count} partial, "
+                f"{hung_count} hung, {timeout_count} timed out\n{content}"
             )
 
+        # Write structured results
+        self.__write_structured()
+
 
@@ -0,0 +1,517 @@
+import asyncio
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from mte.logger import Logger
+from mte.test_key import test_key
+
+# Level of runner log line, format of runner's log handler is '<time> [<level>]: <message>'
+LOG_LEVEL = re.compile(rb"^\S+ \S+ \[([A-Z]+)\]: ")
+
+
+class TargetSession:
+    """
+    Runs tests on single target and collects its results.
+    Owns RemoteManager and SSHManager pair of the target, watches remote execution, recovers target
+    and resumes or restarts interrupted runs.
+    Operations are coroutines on event loop of ExecutorCore, blocking calls of managers run in its thread pool.
+
+    Attributes set by run:
+        - results_dir: local directory with results of the last run or None
+        - partials: local directories with partial results of interrupted runs
+        - hung: tests marked as hung
+        - rejected: dictionary of test key to failed record of test rejected by Constable lint
+        - failed: if run ended with error
+    """
+    __logger = Logger()
+
+    def __init__(self, core, remote_manager, ssh_manager, test_manager, environment_config, watchdog_config,
+                 prepare_lock=None, name=None, on_progress=None):
+        """
+        Initializes TargetSession.
+
+        @param core: ExecutorCore running the session.
+        @param remote_manager: RemoteManager of target.
+        @param ssh_manager: SSHManager of target.
+        @param test_manager: TestManager preparing tests for transfer.
+        @param environment_config: 'env' configuration section.
+        @param watchdog_config: 'watchdog' configuration section.
+        @param prepare_lock: lock serializing preparation and transfer of tests shared by sessions.
+        @param name: target name used in messages, if more targets run in parallel.
+        @param on_progress: callback called on event loop with each new progress event of runner,
+        event has 'target' key set to name.
+        """
+        self.__core = core
+        self.__remote_manager = remote_manager
+        self.__ssh_manager = ssh_manager
+        self.__test_manager = test_manager
+        self.__environment_config = environment_config
+        self.__watchdog_config = watchdog_config
+        self.__prepare_lock = prepare_lock or asyncio.Lock()
+        self.name = name
+        self.__on_progress = on_progress
+        self.__reported = set()
+
+        # Forwarded part of runner log, its incomplete last line and if the last line was debug message
+        self.__log_offset = 0
+        self.__log_pending = b""
+        self.__log_debug = False
+
+        self.results_dir = None
+        self.partials = []
+        self.hung = []
+        self.rejected = {}
+        self.failed = False
+
+    async def connect(self):
+        """
+        Starts target if needed and connects to it.
+        """
+        await self.__core.call(self.__remote_manager.connect)
+        await self.__core.call(self.__ssh_manager.connect)
+
+    async def get_target_info(self, medusa_dir=None):
+        """
+        Collects identification of target build.
+
+        @param medusa_dir: Medusa installation dir on target, optional.
+        @return: dictionary with kernel, build and medusa keys.
+        """
+        return await self.__core.call(self.__ssh_manager.get_target_info, medusa_dir)
+
+    async def disconnect(self):
+        """
+        Closes SSH connection to target.
+        """
+        await self.__core.call(self.__ssh_manager.disconnect)
+
+    async def run(self, tests, started):
+        """
+        Runs tests on target:
+        1. Prepares test and files for transfer.
+        2. Prepares environment on remote.
+        3. Runs test execution in background.
+        4. Waits for execution process to stop under watchdog.
+        5. If watchdog deadline expires, marks test in flight as hung and according to 'on_expiry'
+           either aborts or continues with remaining tests.
+        6. If run was interrupted and target kept checkpoint, resumes run instead of starting it again,
+           at most 'max_resumes' times.
+        7. Downloads results and cleans target.
+
+        @param tests: tests to run.
+        @param started: monotonic time of testing start, shared by global deadline of all sessions.
+        """
+        env_dir = self.__environment_config["environmentDir"]
+        on_expiry = self.__watchdog_config.get("on_expiry", "continue")
+        max_resumes = int(self.__watchdog_config.get("max_resumes", 3))
+
+        remaining = tests
+        finished = False
+        resume = False
+        resumes = 0
+
+        while remaining:
+            if resume:
+                await self.__core.call(self.__resume_run, env_dir, self.hung)
+            else:
+                for r in await self.__start_run(remaining, env_dir):
+                    self.rejected[test_key(r)] = r
+
+            # Wait for testing to exit
+            expiry = await self.__watch_execution(started)
+            if expiry is None:
+                finished = True
+
+                # Runner stopped without exit file, target crashed or rebooted
+                if await self.__core.call(self.__ssh_manager.file_exists, f"{env_dir}/exit", True):
+                    break
+                if resumes < max_resumes and await self.__core.call(self.__can_resume, env_dir):
+                    self.__info("Testing was interrupted, resuming from checkpoint.")
+                    resumes += 1
+                    resume = True
+                    continue
+                break
+
+            in_flight, done, partial = await self.__core.call(self.__handle_expiry, expiry, remaining)
+            if in_flight:
+                self.hung.append(in_flight)
+
+            if on_expiry == "abort" or expiry["deadline"] == "global" or (not done and not in_flight):
+                if partial:
+                    self.partials.append(partial)
+                self.__info("Aborting testing.")
+                break
+
+            if resumes < max_resumes and await self.__core.call(self.__can_resume, env_dir):
+                # Resumed run keeps results of interrupted run
+                if partial:
+                    shutil.rmtree(partial, ignore_errors=True)
+                resumes += 1
+                resume = True
+                self.__info("Continuing testing from checkpoint.")
+                continue
+
+            if partial:
+                self.partials.append(partial)
+            resume = False
+            remaining = [t for t in remaining if test_key(t) not in done and t is not in_flight]
+            self.__info("Continuing testing with %s remaining tests.", len(remaining))
+
+        if finished:
+            self.__info("Testing has finished.")
+            self.results_dir = tempfile.mkdtemp(prefix="mte-results-")
+
+            result = await self.__core.call(self.__ssh_manager.read_file, f"{env_dir}/exit")
+            if result != "SUCCESS":
+                await self.__core.call(self.__ssh_manager.download_results, env_dir, True, self.results_dir)
+                self.__logger.error(IOError("Test failed."), f"{self.__prefix()}Execution on remote resulted in error")
+
+            # Download results
+            self.__info("Fetching results...")
+            await self.__core.call(self.__ssh_manager.download_results, env_dir, local_path=self.results_dir)
+            self.__info("Results ready.")
+
+        # Clean target
+        self.__info("Running cleanup...")
+        await self.__core.call(self.__ssh_manager.clean_target, env_dir)
+        self.__info("Cleanup done.")
+
+    def discard(self):
+        """
+        Removes local directories with downloaded results.
+        """
+        for p in self.partials + [self.results_dir]:
+            if p:
+                shutil.rmtree(p, ignore_errors=True)
+
+    async def __watch_execution(self, started):
+        """
+        Watchdog of remote execution.
+        Every 'poll_interval' seconds checks if executor is still running and reads progress events written by runner
+        over open connection, connection is opened again after failure.
+        Operations have 10s timeout, unresponsive remote is most likely frozen.
+        Per-test deadline expires, when no progress event arrives for 'test_deadline' seconds,
+        global deadline expires 'global_deadline' seconds after start of testing.
+
+        @param started: monotonic time of testing start.
+        @return: None if executor finished, otherwise dictionary with expired deadline and progress events.
+        """
+        env_dir = self.__environment_config["environmentDir"]
+        test_deadline = float(self.__watchdog_config.get("test_deadline", 1800))
+        global_deadline = float(self.__watchdog_config.get("global_deadline", 43200))
+        poll_interval = float(self.__watchdog_config.get("poll_interval", 5))
+
+        events = []
+        last_progress = time.monotonic()
+
+        while True:
+            await asyncio.sleep(poll_interval)
+            self.__debug("Validating remote...")
+
+            try:
+                # Test connection
+                if not await self.__core.call(self.__ssh_manager.is_connected):
+                    await self.__core.call(self.__ssh_manager.connect)
+
+                # Check if still runnning
+                if not await self.__core.call(self.__ssh_manager.is_running, "medusaTestsExec", True):
+                    # Proces stopped, report the last events
+                    self.__report_progress(await self.__core.call(self.__read_progress, env_dir))
+                    await self.__core.call(self.__tail_log, env_dir)
+                    return None
+
+                # Read progress
+                new_events = await self.__core.call(self.__read_progress, env_dir)
+                if len(new_events) > len(events):
+                    events = new_events
+                    last_progress = time.monotonic()
+
+                await self.__core.call(self.__tail_log, env_dir)
+            except asyncio.CancelledError:
+                raise
+            except:
+                await self.__core.call(self.__ssh_manager.disconnect)
+                self.__info("Remote is not responding, remote is most likely frozen.")
+            else:
+                self.__report_progress(events)
+
+            now = time.monotonic()
+            if now - started > global_deadline:
+                return {"deadline": "global", "events": events}
+            if now - last_progress > test_deadline:
+                return {"deadline": "test", "events": events}
+
+    def __tail_log(self, env_dir):
+        """
+        Forwards new lines of runner log to Logger, debug lines of runner as debug messages.
+        Lines without level, e.g. following lines of multi-line message, keep level of previous line.
+        At most 'tail_max_bytes' are read per poll, so burst of log is forwarded over following polls.
+        If forwarding falls behind by more than 'tail_max_lag' bytes, it skips to the end of log.
+
+        @param env_dir: remote testing location.
+        """
+        if str(self.__watchdog_config.get("tail_log", "true")).lower() in ["false", "0", "no", "off"]:
+            return
+
+        limit = int(self.__watchdog_config.get("tail_max_bytes", 65536))
+        max_lag = int(self.__watchdog_config.get("tail_max_lag", 1048576))
+
+        try:
+            data, start, size = self.__ssh_manager.read_from(f"{env_dir}/log", self.__log_offset, limit, True)
+        except IOError:
+            # Log does not exist yet
+            return
+
+        if start != self.__log_offset:
+            # Log was recreated by new run
+            self.__log_pending = b""
+
+        self.__log_offset = start + len(data)
+        if size - self.__log_offset > max_lag:
+            self.__info("remote: ... skipped %s bytes of log.", size - self.__log_offset)
+            self.__log_offset = size
+            self.__log_pending = b""
+            return
+
+        lines = (self.__log_pending + data).split(b"\n")
+        self.__log_pending = lines.pop()
+        if len(self.__log_pending) > limit:
+            # Forward overlong line in parts
+            lines.append(self.__log_pending)
+            self.__log_pending = b""
+
+        for line in lines:
+            if not line:
+                continue
+
+            level = LOG_LEVEL.match(line)
+            if level:
+                self.__log_debug = level.group(1) == b"DEBUG"
+
+            if self.__log_debug:
+                self.__debug("remote: %s", line.decode(errors="replace"))
+            else:
+                self.__info("remote: %s", line.decode(errors="replace"))
+
+    def __report_progress(self, events):
+        """
+        Passes progress events not reported yet to progress callback.
+        Progress file survives resumed runs, so events are identified by content.
+
+        @param events: progress events read from target.
+        """
+        if not self.__on_progress:
+            return
+
+        for e in events:
+            key = (e["event"], e["src"], e["name"], e["time"])
+            if key in self.__reported:
+                continue
+            self.__reported.add(key)
+
+            try:
+                self.__on_progress({**e, "target": self.name})
+            except Exception as ex:
+                self.__debug("Progress callback failed: %s", ex)
+
+    def __read_progress(self, env_dir):
+        """
+        Reads progress events written by runner.
+
+        @param env_dir: remote testing location.
+        @return: list of progress events.
+        """
+        try:
+            content = self.__ssh_manager.read_file(f"{env_dir}/progress", True)
+        except TimeoutError:
+            raise
+        except IOError:
+            return []
+
+        events = []
+        for line in content.splitlines():
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                # Line is being written
+                pass
+        return events
+
+    def __handle_expiry(self, expiry, tests):
+        """
+        Handles expired watchdog deadline:
+        1. Determines finished tests and test in flight from progress events.
+        2. Captures log and partial results from target.
+        3. Stops hung run on target or power-cycles frozen target through RemoteManager.
+
+        @param expiry: expired deadline and progress events.
+        @param tests: tests of interrupted run.
+        @return: test in flight or None, keys of finished tests, local directory with partial results or None.
+        """
+        env_dir = self.__environment_config["environmentDir"]
+        events = expiry["events"]
+
+        finished = {test_key(e) for e in events if e["event"] == "end"}
+        in_flight = None
+        if events and events[-1]["event"] in ["start", "setup", "cleanup"]:
+            key = test_key(events[-1])
+            if key not in finished:
+                in_flight = next((t for t in tests if test_key(t) == key), None)
+
+        self.__info(
+            "Watchdog: %s deadline expired%s.", expiry["deadline"],
+            ", test in flight: " + in_flight["name"] if in_flight else ""
+        )
+
+        # Capture logs while target may still respond, otherwise after recovery
+        partial = self.__capture_partial_results(env_dir)
+        self.__recover_target()
+        if partial is None:
+            partial = self.__capture_partial_results(env_dir)
+
+        # Leave fresh connection for following operations
+        self.__ssh_manager.disconnect()
+        self.__ssh_manager.connect()
+
+        return in_flight, finished, partial
+
+    def __capture_partial_results(self, env_dir):
+        """
+        Downloads log and results of interrupted run into temporary directory.
+
+        @param env_dir: remote testing location.
+        @return: local directory with partial results or None if target is unreachable.
+        """
+        partial_dir = tempfile.mkdtemp(prefix="mte-partial-")
+        try:
+            self.__ssh_manager.connect()
+            self.__ssh_manager.download_results(env_dir, local_path=partial_dir)
+        except:
+            pass
+        finally:
+            self.__ssh_manager.disconnect()
+
+        if not os.path.exists(os.path.join(partial_dir, "log")):
+            self.__info("Failed to capture logs from target.")
+            shutil.rmtree(partial_dir, ignore_errors=True)
+            return None
+
+        self.__info("Captured logs from target.")
+        return partial_dir
+
+    def __recover_target(self):
+        """
+        Stops hung test run on responsive target, unresponsive target is recovered through RemoteManager.
+        """
+        try:
+            self.__ssh_manager.connect()
+            self.__ssh_manager.exec(
+                "sudo pkill -KILL -f '[m]edusaTestsExec'; sudo pkill -KILL -f '[r]unner.py'; sudo pkill -KILL -x constable; true",
+                timeout=True
+            )
+            self.__info("Stopped hung test run on target.")
+            return
+        except:
+            self.__ssh_manager.disconnect()
+
+        self.__remote_manager.recover()
+        self.__ssh_manager.connect()
+
+    def __can_resume(self, env_dir):
+        """
+        Checks if interrupted run left checkpoint on target.
+
+        @param env_dir: remote testing location.
+        @return: True if run can be resumed.
+        """
+        try:
+            return self.__ssh_manager.file_exists(f"{env_dir}/checkpoint.json", True)
+        except IOError:
+            return False
+
+    def __resume_run(self, env_dir, hung):
+        """
+        Resumes interrupted run on target from checkpoint.
+        Tests marked as hung are passed to runner to be skipped, test in flight of crashed run is run again.
+
+        @param env_dir: remote testing location.
+        @param hung: tests marked as hung.
+        """
+        self.__ssh_manager.write_file(f"{env_dir}/skip.json", json.dumps([test_key(t) for t in hung]))
+        self.__ssh_manager.exec_async(f"{env_dir}/medusaTestsExec.bash --resume {self.__runner_args()} &")
+        self.__info("Resumed testing from checkpoint...")
+
+    def __runner_args(self):
+        """
+        @return: command line arguments of runner from configuration.
+        """
+        args = f"--command-timeout {float(self.__watchdog_config.get('command_timeout', 600))}"
+
+        cache_dir = self.__environment_config.get("cacheDir")
+        if cache_dir:
+            args += f" --cache-dir {cache_dir} --cache-max-size {float(self.__environment_config.get('cacheMaxSize', 2048))}"
+        return args
+
+    async def __start_run(self, tests, env_dir):
+        """
+        Prepares tests and environment on remote and starts executor in background.
+
+        @param tests: tests to run.
+        @param env_dir: remote testing location.
+        @return: structured failed records of tests rejected by Constable lint.
+        """
+        cache_dir = self.__environment_config.get("cacheDir") or None
+        include_git = any(t.get("type") == 'GIT' for t in tests)
+
+        # Plan is compiled into shared transport dir, parallel sessions prepare and transfer one by one
+        async with self.__prepare_lock:
+            # Cached repository and build outputs are identified by content of repository
+            source = await self.__core.call(self.__test_manager.source_hash) if cache_dir and include_git else None
+
+            # Prepare tests
+            self.__info("Preparing selected tests for transfer...")
+            rejected = await self.__core.call(self.__test_manager.prepare_tests, tests, env_dir, source)
+            self.__info("Tests are ready for transfer.")
+
+            # Prepare env
+            self.__info("Preparing environment on target...")
+            await self.__core.call(self.__ssh_manager.prepare_environment, env_dir, include_git, cache_dir, source)
+        await self.__core.call(self.__ssh_manager.exec, f"sudo chmod -R 777 {env_dir}")
+
+        # Following operations go through resident agent
+        await self.__core.call(self.__ssh_manager.start_agent, env_dir)
+
+        self.__info("Remote setup is done.")
+
+        # New run starts new log
+        self.__log_offset = 0
+        self.__log_pending = b""
+        self.__log_debug = False
+
+        # Execute tests
+        await self.__core.call(self.__ssh_manager.exec_async, f"{env_dir}/medusaTestsExec.bash {self.__runner_args()} &")
+        self.__info("Started testing...")
+
+        return rejected
+
+    def __prefix(self):
+        """
+        @return: message prefix with target name, if set.
+        """
+        return f"[{self.name}] " if self.name else ""
+
+    def __info(self, message, *args):
+        """
+        Logs info message prefixed with target name.
+        """
+        self.__logger.info("%s" + message, self.__prefix(), *args)
+
+    def __debug(self, message, *args):
+        """
+        Logs debug message prefixed with target name.
+        """
+        self.__logger.debug("%s" + message, self.__prefix(), *args)
@@ -0,0 +1,80 @@
+"""
+Filter expressions selecting tests in batch mode.
+
+Expression is list of terms separated by whitespace, all terms must match (AND).
+Test is selected, if it matches any of given expressions (OR).
+Term has form 'field=pattern' or 'field!=pattern', pattern is glob matched case-insensitively:
+    type  - test type, e.g. type=GIT
+    suite - name of YAML file of test, e.g. suite=lsm_*
+    src   - path of YAML file of test relative to tests directory
+    name  - test name, e.g. name=*semop*
+    hook  - Medusa hook used by test's Constable rules, e.g. hook=mkdir
+
+Example: --filter "type=LOCAL name=mkdir*" --filter "hook=ipc_*"
+"""
+
+import fnmatch
+import re
+
+from mte.constable_rules import parse_hooks
+
+FILTER_FIELDS = ["type", "suite", "src", "name", "hook"]
+
+# Term of filter expression, e.g. name!=*DENY
+FILTER_TERM = re.compile(r"^(\w+)(!?=)(.+)$")
+
+
+def parse_filter(expression):
+    """
+    Parses filter expression into terms.
+
+    @param expression: filter expression.
+    @return: list of (field, pattern, negated) tuples.
+    @raise ValueError: if expression is empty or contains invalid term.
+    """
+    terms = []
+    for token in expression.split():
+        match = FILTER_TERM.match(token)
+        if not match:
+            raise ValueError(f"Invalid filter term: {token}")
+
+        field, operator, pattern = match.groups()
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Unknown filter field '{field}', expected one of: {', '.join(FILTER_FIELDS)}")
+        terms.append((field, pattern.lower(), operator == "!="))
+
+    if not terms:
+        raise ValueError("Empty filter expression")
+    return terms
+
+
+def test_values(test, field):
+    """
+    Returns values of test for filter field.
+
+    @param test: test dictionary.
+    @param field: filter field.
+    @return: list of lowercase values.
+    """
+    if field == "hook":
+        return [h.lower() for h in parse_hooks(test.get("constable"))]
+    if field == "suite":
+        return [str(test.get("suit") or "").lower()]
+    return [str(test.get(field) or "").lower()]
+
+
+def matches(test, filters):
+    """
+    Checks if test matches any of parsed filter expressions.
+
+    @param test: test dictionary.
+    @param filters: list of parsed expressions.
+    @return: True if test matches.
+    """
+    for terms in filters:
+        if all(
+            any(fnmatch.fnmatchcase(v, pattern) for v in test_values(test, field)) != negated
+            for field, pattern, negated in terms
+        ):
+            return True
+    return False
@@ -0,0 +1,13 @@
+"""
+Identification of tests shared by test manager, execution plan, results and history.
+"""
+
+
+def test_key(test):
+    """
+    Returns unique identification of test.
+
+    @param test: test dictionary or its result record with src and name keys.
+    @return: test key '<src>::<name>'.
+    """
+    return f"{test.get('src')}::{test['name']}"
@@ -1,10 +1,16 @@
+import hashlib
+import json
 import os
-import pickle
+import shutil
 import subprocess
 
 import yaml
 
+from mte.constable_rules import match_hooks, parse_hooks
+from mte.config_assembler import ConfigAssembler
 from mte.logger import Logger
+from mte.plan_compiler import compile_plan, is_suite_test, write_plan
+from mte.test_key import test_key
 
 
 class TestManager:
@@ -60,20 +66,24 @@ class TestManager:
         self.__logger.debug("Listing local tests complete.")
         return tests
 
-    def prepare_tests(self, tests, test_env):
+    def prepare_tests(self, tests, test_env, source=None):
         """
         Wrapper method for preparing tests.
+        Tests with Constable rules failing lint are left out of transfer.
 
         @param tests:
         @param test_env:
+        @param source: hash of medusa-tests content from source_hash, if GIT tests are selected.
+        @return: structured failed records of rejected tests.
         """
         self.__logger.info("Preparing tests for transfer...")
 
         self.__prepare_configs(test_env)
 
-        self.__prepare_tests(tests)
+        rejected = self.__prepare_tests(tests, test_env, source)
 
         self.__logger.info("Tests are ready for transfer.")
+        return rejected
 
     def load_results(self):
         """
@@ -91,55 +101,246 @@ class TestManager:
             self.__logger.debug("Results do not exist")
         return results
 
-    def __prepare_configs(self, tests_env):
+    def load_structured_results(self):
+        """
+        Loads structured test results from results.json if present.
+        @return: dictionary with summary and list of test records or None.
+        """
+        try:
+            with open(os.path.join(self.__results_dir, "results.json"), "r") as f:
+                return json.load(f)
+        except Exception:
+            self.__logger.debug("Structured results do not exist")
+        return None
+
+    def fingerprint_tests(self, tests, tests_env, target_info):
         """
-        Prepares configuration files Constable and Medusa configuration.
-        Formats files to contain path to testing environment, where the configurations will be transferred.
+        Computes fingerprint of each test from everything affecting its result:
+        test definition, its Constable rules, rendered medusa-template.conf and constable.conf,
+        rules of all tests of its suite for LOCAL tests, medusa-tests commit for GIT tests
+        and target kernel/Medusa build.
 
+        @param tests: tests to fingerprint.
         @param tests_env: remote testing location.
+        @param target_info: target build identification.
+        @return: dictionary of test key to fingerprint.
         """
-        # Prepare constable config
-        with open(os.path.join(self.__tests_dir, "constable.conf"), "r") as f:
-            # Load
-            constable_content = f.read()
+        base = hashlib.sha256()
+        base.update(self.__render_config("medusa-template.conf", tests_env).encode())
+        base.update(self.__render_config("constable.conf", tests_env).encode())
+        base.update(json.dumps(target_info, sort_keys=True).encode())
 
-        # Replace
-        new_content = constable_content.replace("{@TEST_ENV}", tests_env)
+        # LOCAL tests of suite run under configuration assembled from rules of all suite tests of the same source
+        suites = {}
+        for t in tests:
+            if is_suite_test(t):
+                suites.setdefault(t.get("src"), {})[t.get("constable") or ""] = None
+        suite_rules = {src: json.dumps(list(rules)) for src, rules in suites.items()}
+
+        git_commit = None
+        fingerprints = {}
+        for t in tests:
+            h = base.copy()
+
+            definition = {k: v for k, v in t.items() if k != "selected"}
+            h.update(json.dumps(definition, sort_keys=True, default=str).encode())
+
+            if is_suite_test(t):
+                h.update(suite_rules[t.get("src")].encode())
+            elif t.get("type") == "GIT":
+                if git_commit is None:
+                    git_commit = self.__git_commit()
+                h.update(git_commit.encode())
+
+            fingerprints[test_key(t)] = h.hexdigest()
+
+        return fingerprints
+
+    def source_hash(self):
+        """
+        Computes hash of medusa-tests content as transferred to target, files skipped by transfer are left out.
+        Hash identifies uploaded repository and build outputs of GIT tests in target cache.
+
+        @return: hex digest.
+        """
+        h = hashlib.sha256()
+        for subdir, dirs, files in os.walk(self.__git_dir):
+            dirs[:] = sorted(d for d in dirs if d not in [".idea", ".git"])
+            for file in sorted(files):
+                if file == ".gitignore":
+                    continue
+
+                path = os.path.join(subdir, file)
+                h.update(os.path.relpath(path, self.__git_dir).replace("\\", "/").encode() + b"\0")
+                with open(path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                        h.update(chunk)
+                h.update(b"\0")
+        return h.hexdigest()
+
+    @staticmethod
+    def build_hook_index(tests):
+        """
+        Builds index of hook names to tests exercising them, parsed from tests' Constable rules.
+
+        @param tests: tests to index.
+        @return: dictionary of hook name to list of tests.
+        """
+        index = {}
+        for t in tests:
+            for hook in parse_hooks(t.get("constable")):
+                index.setdefault(hook, []).append(t)
+        return index
+
+    def select_by_hooks(self, tests, hooks):
+        """
+        Selects only tests exercising given hooks, other tests are unselected.
+
+        @param tests: loaded tests.
+        @param hooks: hook names or identifiers resolvable to hooks, e.g. 'inode_mkdir'.
+        @return: list of affected tests.
+        """
+        index = self.build_hook_index(tests)
+        matched = match_hooks(hooks, index.keys())
+
+        unknown = [h for h in hooks if not match_hooks([h], index.keys())]
+        if unknown:
+            self.__logger.debug("No tests for hooks: %s", ", ".join(sorted(unknown)))
+
+        affected = {id(t) for h in matched for t in index[h]}
+        for t in tests:
+            t["selected"] = id(t) in affected
+
+        self.__logger.info("Selected %s tests affected by hooks: %s.", len(affected), ", ".join(sorted(matched)) or "none")
+        return [t for t in tests if t["selected"]]
+
+    def clear_results(self):
+        """
+        Removes local results of previous run.
+        """
+        shutil.rmtree(self.__results_dir, ignore_errors=True)
+        os.makedirs(os.path.join(self.__results_dir, "details"), exist_ok=True)
 
+    def add_partial_results(self, partial_dir, log_name):
+        """
+        Copies result details and log of single run, e.g. interrupted run or run on linked clone, into local results.
+
+        @param partial_dir: local directory with downloaded results.
+        @param log_name: name of copied log.
+        """
+        details_dir = os.path.join(partial_dir, "details")
+        if os.path.exists(details_dir):
+            shutil.copytree(details_dir, os.path.join(self.__results_dir, "details"), dirs_exist_ok=True)
+
+        log = os.path.join(partial_dir, "log")
+        if os.path.exists(log):
+            shutil.copy(log, os.path.join(self.__results_dir, log_name))
+
+    def write_results(self, results):
+        """
+        Writes structured results into results.json and overall results report into results.txt
+        in the same format as created by runner.
+
+        @param results: structured results with list of test records.
+        """
+        os.makedirs(os.path.join(self.__results_dir, "details"), exist_ok=True)
+
+        summary = {"success": 0, "failed": 0, "partial": 0, "hung": 0, "timeout": 0}
+        lines = []
+        for t in results["tests"]:
+            summary[t["status"]] = summary.get(t["status"], 0) + 1
+
+            name = t["name"]
+            if t["status"] == "hung":
+                lines.append(f"{name}:{' ' * (32 - len(name))}Hung, stopped by watchdog.\n")
+            elif t["status"] == "timeout":
+                lines.append(f"{name}:{' ' * (32 - len(name))}Timed out, see details.\n")
+            elif "error" in t:
+                lines.append(f"{name}:{' ' * (32 - len(name))}Failed with error see details.\n")
+            else:
+                lines.append(
+                    f"{name}:{' ' * (32 - len(name))}output: {t['output']} \t constable: {t['constable']} \t dmesg: {t['dmesg']}\n"
+                )
+        results["summary"] = summary
+
+        with open(os.path.join(self.__results_dir, "results.json"), "w") as f:
+            json.dump(results, f, indent=2)
+
+        with open(os.path.join(self.__results_dir, "results.txt"), "w") as f:
+            f.write(
+                f"Testing complete: {summary['success']} passed, {summary['failed']} failed, "
+                f"{summary['partial']} partial, {summary['hung']} hung, {summary['timeout']} timed out\n"
+            )
+            f.writelines(lines)
+
+    def __prepare_configs(self, tests_env):
+        """
+        Prepares Constable configuration file.
+        Formats file to contain path to testing environment, where the configuration will be transferred.
+        Medusa configuration is rendered into execution plan.
+
+        @param tests_env: remote testing location.
+        """
         with open(os.path.join(self.__transport_dir, "constable.conf"), "w") as f:
             # Save
-            f.write(new_content)
+            f.write(self.__render_config("constable.conf", tests_env))
+
+    def __render_config(self, name, tests_env):
+        """
+        Loads configuration file from tests dir and replaces testing environment placeholder.
 
-        # Prepare medusa-template.conf
-        with open(os.path.join(self.__tests_dir, "medusa-template.conf"), "r") as f:
+        @param name: configuration file name.
+        @param tests_env: remote testing location.
+        @return: rendered configuration.
+        """
+        with open(os.path.join(self.__tests_dir, name), "r") as f:
             # Load
-            constable_content = f.read()
+            content = f.read()
 
         # Replace
-        new_content = constable_content.replace("{@TEST_ENV}", tests_env)
-
-        with open(os.path.join(self.__transport_dir, "medusa-template.conf"), "w") as f:
-            # Save
-            f.write(new_content)
+        return content.replace("{@TEST_ENV}", tests_env)
 
-    def __prepare_tests(self, tests):
+    def __prepare_tests(self, tests, tests_env, source=None):
         """
-        Saves tests into transport_dir in .pickle format.
+        Lints Constable rules of tests and compiles valid tests into execution plan saved in transport_dir.
 
         @param tests: selected tests for transfer.
+        @param tests_env: remote testing location.
+        @param source: hash of medusa-tests content.
+        @return: structured failed records of tests rejected by lint.
         """
         if not os.path.exists(self.__transport_dir):
             os.makedirs(self.__transport_dir)
 
-        file = os.path.join(self.__transport_dir, "local.pickle")
-
         # Remove selected attribute
         for t in tests:
-            del t["selected"]
+            t.pop("selected", None)
+
+        assembler = ConfigAssembler(self.__render_config("medusa-template.conf", tests_env))
 
-        # Dump to file
-        with open(file, "wb") as f:
-            pickle.dump(tests, f)
+        # Lint Constable rules
+        valid = []
+        rejected = []
+        for t in tests:
+            issues = assembler.lint(t.get("constable"))
+            if not issues:
+                valid.append(t)
+                continue
+
+            self.__logger.info("%s: Constable rules are invalid: %s", t["name"], "; ".join(issues))
+            rejected.append({
+                "name": t["name"],
+                "src": t.get("src"),
+                "type": t.get("type"),
+                "status": "failed",
+                "error": f"Constable lint: {'; '.join(issues)}"
+            })
+
+        units = compile_plan(valid, tests_env, assembler, source)
+        write_plan(units, tests_env, os.path.join(self.__transport_dir, "plan.jsonl"))
+        self.__logger.debug("Compiled execution plan: %s units.", len(units))
+
+        return rejected
 
     def __transform_test(self, test, name, suit, src):
         """
@@ -159,6 +360,22 @@ class TestManager:
 
         return test
 
+    def __git_commit(self):
+        """
+        Returns current commit of git tests repository.
+
+        @return: commit hash or 'unknown'.
+        """
+        try:
+            result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=self.__git_dir, capture_output=True, text=True)
+        except OSError:
+            # Missing tests directory or git executable
+            return "unknown"
+
+        if result.returncode != 0:
+            return "unknown"
+        return result.stdout.strip()
+
     def __update_git(self):
         """
         Updates git tests submodule - Medusa Tests.
@@ -0,0 +1,138 @@
+"""
+SSH transport profiles.
+
+Profile is configuration section '[transport:<name>]' with optional keys:
+    compress        - compression of SSH transport
+    ciphers         - allowed ciphers separated by ',', other ciphers are disabled
+    window_size     - window size of channels in bytes
+    max_packet_size - maximum packet size of channels in bytes
+
+Section '[transport]' selects profile by 'profile' key: name of profile, 'default' for Paramiko defaults
+or 'auto' for profile chosen by 'py run.py --tune-transport'.
+"""
+
+import json
+import os
+import time
+
+import paramiko as p
+
+PROFILE_PREFIX = "transport:"
+
+DEFAULT_PROFILE = {"compress": False, "ciphers": None, "window_size": None, "max_packet_size": None}
+
+TUNED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "transport.json")
+
+
+def parse_profile(section):
+    """
+    Parses transport profile from configuration section.
+
+    @param section: configuration section.
+    @return: transport settings.
+    """
+    ciphers = [c.strip() for c in section.get("ciphers", "").split(",") if c.strip()]
+    window_size = section.get("window_size", "")
+    max_packet_size = section.get("max_packet_size", "")
+
+    return {
+        "compress": section.getboolean("compress", False),
+        "ciphers": ciphers or None,
+        "window_size": int(window_size) if window_size else None,
+        "max_packet_size": int(max_packet_size) if max_packet_size else None
+    }
+
+
+def load_profiles(config):
+    """
+    Loads all transport profiles from configuration.
+
+    @param config: whole configuration.
+    @return: dictionary of profile name to transport settings, including 'default'.
+    """
+    profiles = {"default": dict(DEFAULT_PROFILE)}
+    for name in config.sections():
+        if name.startswith(PROFILE_PREFIX):
+            profiles[name[len(PROFILE_PREFIX):]] = parse_profile(config[name])
+    return profiles
+
+
+def resolve_transport(config):
+    """
+    Resolves transport settings selected by '[transport]' section.
+
+    @param config: whole configuration.
+    @return: transport settings.
+    @raise KeyError: if selected profile does not exist.
+    """
+    name = config["transport"].get("profile", "default") if config.has_section("transport") else "default"
+
+    if name == "auto":
+        tuned = load_tuned()
+        return tuned["settings"] if tuned else dict(DEFAULT_PROFILE)
+
+    profiles = load_profiles(config)
+    if name not in profiles:
+        raise KeyError(f"Unknown transport profile '{name}', available: {', '.join(profiles)}")
+    return profiles[name]
+
+
+def connect_kwargs(settings):
+    """
+    Converts transport settings to keyword arguments of SSHClient.connect.
+
+    @param settings: transport settings.
+    @return: dictionary of keyword arguments.
+    """
+    kwargs = {"compress": bool(settings.get("compress"))}
+    if settings.get("ciphers"):
+        kwargs["disabled_algorithms"] = {
+            "ciphers": [c for c in p.Transport._preferred_ciphers if c not in settings["ciphers"]]
+        }
+    return kwargs
+
+
+def apply_channel_settings(transport, settings):
+    """
+    Sets window and packet size of channels opened by transport.
+
+    @param transport: connected Paramiko transport.
+    @param settings: transport settings.
+    """
+    if settings.get("window_size"):
+        transport.default_window_size = settings["window_size"]
+    if settings.get("max_packet_size"):
+        transport.default_max_packet_size = settings["max_packet_size"]
+
+
+def load_tuned():
+    """
+    Loads profile chosen by transport tuning.
+
+    @return: dictionary with profile, settings, target and time keys or None.
+    """
+    if not os.path.exists(TUNED_PATH):
+        return None
+
+    with open(TUNED_PATH, "r") as f:
+        return json.load(f)
+
+
+def save_tuned(profile, settings, target, measurements):
+    """
+    Stores profile chosen by transport tuning.
+
+    @param profile: name of chosen profile.
+    @param settings: transport settings of profile.
+    @param target: tuned target 'host:port'.
+    @param measurements: measurements of all candidate profiles.
+    """
+    os.makedirs(os.path.dirname(TUNED_PATH), exist_ok=True)
+    with open(TUNED_PATH, "w") as f:
+        json.dump({
+            "profile": profile,
+            "settings": settings,
+            "target": target,
+            "time": time.time(),
+            "measurements": measurements
+        }, f, indent=2)
@@ -11,7 +11,7 @@ setup(
     author='Roderik Ploszek',
     author_email='roderik.ploszek@gmail.com',
     license='MIT',
-    packages = ['mte', 'mte.tests', 'mte.target'],
+    packages = ['mte', 'mte.tests', 'mte.target', 'mte.benchmark'],
     python_requires='>=3.11.2',
     install_requires=requirements,
     zip_safe=True,
@@ -0,0 +1,21 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Target modules import each other as top-level modules, as they do on target.
+# Their dir goes first, so 'setup' resolves to mte/target/setup.py instead of the package setup.py.
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "mte", "target"))
+
+from mte.logger import Logger
+
+# Logger creates log file in working directory on first use, keep it out of repository,
+# the same dir is reused by every session and log of previous session is rotated
+_cwd = os.getcwd()
+_log_dir = os.path.join(tempfile.gettempdir(), "mte-tests")
+os.makedirs(_log_dir, exist_ok=True)
+os.chdir(_log_dir)
+Logger()
+os.chdir(_cwd)
@@ -0,0 +1,75 @@
+import io
+import os
+import pwd
+
+import pytest
+
+import agent
+
+
+def request(**message):
+    stream = io.BytesIO()
+    agent.write_frame(stream, message)
+    return stream.getvalue()
+
+
+def serve(*requests):
+    stdout = io.BytesIO()
+    agent.serve(io.BytesIO(b"".join(requests)), stdout)
+    stdout.seek(0)
+
+    responses = []
+    while True:
+        response = agent.read_frame(stdout)
+        if response is None:
+            return responses
+        responses.append(response)
+
+
+def test_framing_round_trip():
+    stream = io.BytesIO()
+    agent.write_frame(stream, {"id": 1, "data": "ž"})
+    stream.seek(0)
+    assert agent.read_frame(stream) == {"id": 1, "data": "ž"}
+    assert agent.read_frame(stream) is None
+
+
+def test_truncated_frame():
+    frame = request(id=1, op="ping")
+    assert agent.read_frame(io.BytesIO(frame[:-1])) is None
+
+
+def test_pipelined_requests(tmp_path):
+    path = str(tmp_path / "file")
+    responses = serve(
+        request(id=1, op="ping"),
+        request(id=2, op="write", path=path, data="aGVsbG8="),
+        request(id=3, op="read", path=path, offset=1, limit=3),
+        request(id=4, op="exec", command="echo out; echo err >&2; exit 3"),
+        request(id=5, op="stat", path=str(tmp_path / "missing")),
+        request(id=6, op="unknown")
+    )
+
+    assert [r["id"] for r in responses] == [1, 2, 3, 4, 5, 6]
+    assert responses[0]["result"] is True
+    assert responses[2]["result"] == {"data": "ZWxs", "offset": 1, "size": 5}
+    assert responses[3]["result"] == {"code": 3, "stdout": "out\n", "stderr": "err\n"}
+    assert not responses[4]["ok"] and responses[4]["errno"] == 2
+    assert responses[5]["error"] == "ValueError: Unknown operation: unknown"
+
+
+def test_exec_timeout():
+    with pytest.raises(TimeoutError):
+        agent.op_exec("sleep 5", timeout=0.2)
+
+
+@pytest.mark.skipif(os.geteuid() != 0, reason="dropping privileges requires root")
+def test_commands_and_written_files_belong_to_login_user(tmp_path, monkeypatch):
+    login = pwd.getpwnam("nobody")
+    monkeypatch.setattr(agent, "LOGIN", login)
+
+    assert agent.op_exec("id -u")["stdout"].strip() == str(login.pw_uid)
+
+    path = tmp_path / "file"
+    agent.op_write(str(path), "")
+    assert path.stat().st_uid == login.pw_uid
@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from cache import hash_inputs, normalize_path, prune_steps, restore_outputs, step_key, store_outputs
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    work = tmp_path / "work"
+    (work / "src").mkdir(parents=True)
+    (work / "src" / "a.c").write_text("int a;")
+    monkeypatch.chdir(work)
+    return work
+
+
+def step(inputs=None, outputs=None):
+    return {"run": "make", "inputs": inputs or [], "outputs": outputs or []}
+
+
+def test_normalize_path():
+    assert normalize_path("bin/../out/x") == os.path.join("out", "x")
+    for path in ["/etc/passwd", "..", "../x", "bin/../../x"]:
+        with pytest.raises(ValueError):
+            normalize_path(path)
+
+
+def test_hash_inputs(workdir):
+    digest = hash_inputs(["src"], [])
+
+    # Outputs inside inputs do not change identification
+    (workdir / "src" / "a.o").write_text("built")
+    assert hash_inputs(["src"], ["src/a.o"]) == digest
+    assert hash_inputs(["src"], []) != digest
+
+    (workdir / "src" / "a.c").write_text("int b;")
+    assert hash_inputs(["src"], ["src/a.o"]) != digest
+    assert hash_inputs(["missing"], []) != hash_inputs(["other"], [])
+
+
+def test_step_key(workdir):
+    assert step_key(step()) is None
+    assert step_key(step(), "source") != step_key(step(), "other")
+    assert step_key(step(["src"]), "source") == step_key(step(["src"]), "other")
+    assert step_key(step(["src"])) != step_key(dict(step(["src"]), run="make all"))
+
+
+def test_store_and_restore(workdir, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    (workdir / "bin").mkdir()
+    (workdir / "bin" / "tool").write_text("binary")
+    (workdir / "lib.so").write_text("library")
+
+    assert not restore_outputs(cache_dir, "key", ["bin", "lib.so"])
+    store_outputs(cache_dir, "key", ["bin", "lib.so"])
+
+    (workdir / "bin" / "tool").unlink()
+    (workdir / "lib.so").write_text("changed")
+    assert restore_outputs(cache_dir, "key", ["bin", "lib.so"])
+    assert (workdir / "bin" / "tool").read_text() == "binary"
+    assert (workdir / "lib.so").read_text() == "library"
+
+
+def test_store_missing_output(workdir, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    with pytest.raises(FileNotFoundError):
+        store_outputs(cache_dir, "key", ["missing"])
+    assert not os.path.exists(os.path.join(cache_dir, "steps", "key"))
+    assert not os.path.exists(os.path.join(cache_dir, "steps", "key.part"))
+
+
+def test_prune_steps(workdir, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    assert prune_steps(cache_dir, 0) == 0
+
+    (workdir / "out").write_text("x" * 100)
+    for i, key in enumerate(["old", "middle", "new"]):
+        store_outputs(cache_dir, key, ["out"])
+        os.utime(os.path.join(cache_dir, "steps", key), (1000 + i, 1000 + i))
+
+    # Restore marks entry as recently used
+    restore_outputs(cache_dir, "old", ["out"])
+
+    assert prune_steps(cache_dir, 250) == 1
+    assert sorted(os.listdir(os.path.join(cache_dir, "steps"))) == ["new", "old"]
+    assert prune_steps(cache_dir, 1000) == 0
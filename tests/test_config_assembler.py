@@ -0,0 +1,18 @@
+from mte.config_assembler import ConfigAssembler
+
+TEMPLATE = 'tree "fs" clone of file by getfile getfile.filename;\nspace allowed = "/tmp/allowed";\n'
+
+
+def test_lint_nested_rule():
+    assembler = ConfigAssembler(TEMPLATE)
+    rules = "* mkdir allowed {\n    if (1) {\n        return ALLOW;\n    } else {\n        return DENY;\n    }\n}\n"
+    assert assembler.lint(rules) == []
+    assert assembler.lint("* mkdir nowhere {\n}\n") == ["unknown space 'nowhere' in rule '* mkdir'"]
+    assert assembler.lint(None) == []
+
+
+def test_assemble_deduplicates_snippets():
+    assembler = ConfigAssembler(TEMPLATE)
+    config = assembler.assemble(["a {\n}", "b {\n}\n", "a {\n}", None])
+    assert config == TEMPLATE + "a {\n}\nb {\n}\n"
+    assert assembler.assemble(["a {\n}", "b {\n}\n"]) is config
@@ -0,0 +1,83 @@
+from mte.constable_rules import (
+    check_braces, hooks_from_diff, lint_rules, match_hooks, parse_hooks, parse_rule_headers, parse_spaces
+)
+
+NESTED_RULE = """
+all_domains mkdir allowed {
+    if (process.uid == 0) {
+        log_proc("root-mkdir");
+        return ALLOW;
+    } else {
+        // nested block } with brace in comment
+        log_proc("user-mkdir { in string");
+        return DENY;
+    }
+}
+"""
+
+
+def test_parse_rule_headers():
+    config = 'space allowed = recursive "/tmp/allowed";\n* ipc_semop * {\n    return ALLOW;\n}\n'
+    assert parse_rule_headers(config) == [("*", "ipc_semop", "*")]
+
+
+def test_parse_rule_headers_optional_object():
+    assert parse_rule_headers("all_domains fork {\n}\n") == [("all_domains", "fork", None)]
+
+
+def test_parse_rule_headers_skips_nested_blocks():
+    assert parse_rule_headers(NESTED_RULE) == [("all_domains", "mkdir", "allowed")]
+
+
+def test_parse_rule_headers_skips_functions_and_comments():
+    config = """
+function log_proc {
+    if (1) { }
+}
+/* all_domains rmdir allowed { */
+// all_domains unlink allowed {
+all_domains rmdir:VS_ALLOW restricted {
+}
+"""
+    assert parse_rule_headers(config) == [("all_domains", "rmdir", None)]
+
+
+def test_parse_hooks():
+    assert parse_hooks(NESTED_RULE + "* kill * {\n}\n") == {"mkdir", "kill"}
+    assert parse_hooks(None) == set()
+
+
+def test_parse_spaces():
+    assert parse_spaces('space allowed = "/a";\n  space restricted = "/b";\n') == {"allowed", "restricted"}
+
+
+def test_check_braces():
+    assert check_braces(NESTED_RULE) == []
+    assert check_braces("a b {\n") == ["1 unclosed '{'"]
+    assert check_braces("a b {\n}\n}") == ["line 3: unexpected '}'"]
+    assert check_braces('a b {\n "x\n}') == ["line 2: unterminated string"]
+    assert check_braces("/* {") == ["line 1: unterminated comment"]
+
+
+def test_lint_rules_nested_body():
+    assert lint_rules(NESTED_RULE, {"all_domains", "allowed"}) == []
+
+
+def test_lint_rules_issues():
+    issues = lint_rules("all_domains mkdir_x nowhere {\n}\n", {"all_domains"})
+    assert issues == ["unknown hook 'mkdir_x'", "unknown space 'nowhere' in rule 'all_domains mkdir_x'"]
+
+
+def test_hooks_from_diff():
+    diff = """diff --git a/security/medusa/l2/acctype_mkdir.c b/security/medusa/l2/acctype_mkdir.c
+--- a/security/medusa/l2/acctype_mkdir.c
++++ b/security/medusa/l2/acctype_mkdir.c
+@@ -10,7 +10,7 @@ int medusa_l1_inode_rmdir(struct inode *dir)
+-	retval = medusa_link(dentry);
++	retval = medusa_link(dentry, 1);
+"""
+    assert hooks_from_diff(diff) == {"mkdir", "inode_rmdir", "link", "l1_inode_rmdir"}
+
+
+def test_match_hooks():
+    assert match_hooks({"inode_mkdir", "link", "unrelated"}, {"mkdir", "link", "rmdir"}) == {"mkdir", "link"}
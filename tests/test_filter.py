@@ -0,0 +1,52 @@
+import pytest
+
+# Imported as module, so pytest does not collect test_values as test
+from mte import test_filter
+
+MKDIR = {
+    "name": "mkdir DENY",
+    "type": "LOCAL",
+    "suit": "lsm_file_system_hooks.yaml",
+    "src": "lsm_file_system_hooks.yaml",
+    "constable": "all_domains mkdir restricted {\n    if (1) {\n        return DENY;\n    }\n}\n"
+}
+SEMOP = {
+    "name": "Semop performance Constable overhead",
+    "type": "GIT",
+    "suit": "git_tests.yaml",
+    "src": "git_tests.yaml",
+    "constable": "* ipc_semop * {\n    return ALLOW;\n}\n"
+}
+
+
+def select(*expressions):
+    filters = [test_filter.parse_filter(e) for e in expressions]
+    return [t["name"] for t in [MKDIR, SEMOP] if test_filter.matches(t, filters)]
+
+
+def test_parse_filter():
+    assert test_filter.parse_filter("type=LOCAL name!=*DENY") == [("type", "local", False), ("name", "*deny", True)]
+
+
+@pytest.mark.parametrize("expression, error", [
+    ("", "Empty filter expression"),
+    ("name", "Invalid filter term: name"),
+    ("owner=me", "Unknown filter field 'owner'")
+])
+def test_parse_filter_errors(expression, error):
+    with pytest.raises(ValueError, match=error):
+        test_filter.parse_filter(expression)
+
+
+def test_values():
+    assert test_filter.test_values(MKDIR, "hook") == ["mkdir"]
+    assert test_filter.test_values(MKDIR, "suite") == ["lsm_file_system_hooks.yaml"]
+    assert test_filter.test_values({"name": "x"}, "type") == [""]
+
+
+def test_matches():
+    assert select("type=local") == ["mkdir DENY"]
+    assert select("hook=ipc_*") == ["Semop performance Constable overhead"]
+    assert select("suite=lsm_* name!=*deny") == []
+    assert select("name=*DENY", "type=GIT") == ["mkdir DENY", "Semop performance Constable overhead"]
+    assert select("hook=else") == []
@@ -0,0 +1,79 @@
+import pytest
+
+from mte import history_store
+from mte.history_store import HistoryStore, format_duration_trends, format_flakiest, format_pass_rates
+
+ENVIRONMENT = {"kernel": "6.1.0", "build": "#1 SMP", "medusa": "abc"}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Runs recorded in the same instant are ordered by id
+    monkeypatch.setattr(history_store.time, "time", lambda: 1000.0)
+    return HistoryStore(str(tmp_path / "history.db"))
+
+
+def record(store, statuses, durations=None, metrics=None):
+    tests = []
+    for name, status in statuses.items():
+        tests.append({
+            "name": name,
+            "src": "a.yaml",
+            "status": status,
+            "duration": (durations or {}).get(name),
+            "metrics": (metrics or {}).get(name)
+        })
+    return store.record_run(ENVIRONMENT, {"tests": tests})
+
+
+def test_test_runs_keeps_last_runs(store):
+    for status in ["failed", "success", "success"]:
+        record(store, {"t": status})
+
+    runs = store.test_runs(last_runs=2)
+    assert list(runs) == ["a.yaml::t"]
+    assert [r["status"] for r in runs["a.yaml::t"]] == ["success", "success"]
+    assert runs["a.yaml::t"][0]["kernel"] == "6.1.0"
+
+
+def test_pass_rates_and_flakiest(store):
+    for statuses in [{"a": "success", "b": "success"}, {"a": "failed", "b": "success"}, {"a": "success", "b": "success"}]:
+        record(store, statuses)
+
+    assert store.pass_rates() == [
+        {"test": "a.yaml::a", "runs": 3, "passed": 2, "rate": 2 / 3},
+        {"test": "a.yaml::b", "runs": 3, "passed": 3, "rate": 1.0}
+    ]
+    assert store.flakiest() == [{"test": "a.yaml::a", "runs": 3, "flips": 2, "failures": 1, "flakiness": 1.0}]
+
+
+def test_duration_trends(store):
+    for d in [10.0, 10.0, 15.0, 15.0]:
+        record(store, {"t": "success", "quick": "success"}, durations={"t": d})
+
+    assert store.duration_trends() == [
+        {"test": "a.yaml::t", "runs": 4, "older": 10.0, "newer": 15.0, "change": 50.0, "last": 15.0}
+    ]
+
+
+def test_load_metrics(store):
+    record(store, {"t": "success"}, metrics={"t": {"time": {"value": 1.5}}})
+    record(store, {"u": "success"}, metrics={"u": {"ops": {"value": 10.0, "better": "higher"}}})
+
+    entries = store.load_metrics(["a.yaml::t"])
+    assert entries == [{
+        "time": 1000.0, "kernel": "6.1.0", "medusa": "abc", "key": "a.yaml::t", "test": "t",
+        "metric": "time", "value": 1.5, "better": "lower"
+    }]
+    assert [e["metric"] for e in store.load_metrics()] == ["time", "ops"]
+    assert store.load_metrics([]) == []
+
+
+def test_reports(store):
+    record(store, {"t": "success"}, durations={"t": 1.0})
+    record(store, {"t": "failed"}, durations={"t": 2.0})
+
+    assert format_pass_rates(store.pass_rates()).splitlines()[1].split() == ["a.yaml::t", "2", "1", "50.0"]
+    assert format_flakiest(store.flakiest()).splitlines()[1].split() == ["a.yaml::t", "2", "1", "1", "1.00"]
+    assert format_duration_trends(store.duration_trends()).splitlines()[1].split() == \
+        ["a.yaml::t", "2", "1.00", "2.00", "+100.0", "%", "2.00"]
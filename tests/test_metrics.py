@@ -0,0 +1,62 @@
+import os
+
+import yaml
+
+from metrics import extract_metrics, parse_json_lines
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+OUTPUT = """Running semop benchmark
+Total time: 1.52 s
+Average time per semop: 3.04 us
+{"ops": 500000, "cpu": 97.5}
+not json {"ops": 1}
+{"ops": 250000}
+[1, 2]
+"""
+
+
+def test_regex_metrics():
+    test = {"metrics": [
+        {"name": "total", "regex": r"Total time: ([0-9.]+)"},
+        {"name": "whole match", "regex": r"\b1\.52\b", "better": "higher"}
+    ]}
+    assert extract_metrics(test, OUTPUT) == {
+        "total": {"value": 1.52, "better": "lower"},
+        "whole match": {"value": 1.52, "better": "higher"}
+    }
+
+
+def test_json_metrics():
+    test = {"metrics": [{"json": "ops", "better": "higher"}, {"name": "cpu [%]", "json": "cpu"}]}
+    assert extract_metrics(test, OUTPUT) == {
+        # Last printed value wins
+        "ops": {"value": 250000.0, "better": "higher"},
+        "cpu [%]": {"value": 97.5, "better": "lower"}
+    }
+
+
+def test_missing_and_invalid_metrics_are_skipped():
+    test = {"metrics": [
+        {"name": "missing", "regex": r"Median: ([0-9.]+)"},
+        {"name": "not number", "regex": r"Running (\w+)"},
+        {"name": "missing key", "json": "memory"}
+    ]}
+    assert extract_metrics(test, OUTPUT) == {}
+    assert extract_metrics({"metrics": []}, OUTPUT) == {}
+
+
+def test_parse_json_lines():
+    assert parse_json_lines(OUTPUT) == [{"ops": 500000, "cpu": 97.5}, {"ops": 250000}]
+
+
+def test_semop_metrics_declaration():
+    with open(os.path.join(ROOT, "mte", "tests", "git_tests.yaml")) as f:
+        test = next(t for t in yaml.safe_load(f) if t["name"] == "Semop performance Constable overhead")
+
+    output = "Total time: 1.52 s\nAverage time per semop: 3.04 us\nOperations per second: 328947\n"
+    assert extract_metrics(test["execution"], output) == {
+        "total time [s]": {"value": 1.52, "better": "lower"},
+        "semop time [us]": {"value": 3.04, "better": "lower"},
+        "semop/s": {"value": 328947.0, "better": "higher"}
+    }
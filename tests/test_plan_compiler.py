@@ -0,0 +1,97 @@
+import json
+
+import setup
+from mte.config_assembler import ConfigAssembler
+from mte.plan_compiler import (
+    PLAN_VERSION, compile_plan, compile_step, compile_test, resolve_timeouts, substitute_paths, write_plan
+)
+
+TEMPLATE = 'space allowed = "/env/allowed";\n'
+
+
+def make_test(name, src="fs.yaml", type="LOCAL", rules=None, **options):
+    return {
+        "name": name,
+        "src": src,
+        "type": type,
+        "constable": rules if rules is not None else f"* mkdir allowed {{ // {name}\n}}\n",
+        "execution": {"command": "mkdir allowed/test", "results": {"return_code": 0}},
+        **options
+    }
+
+
+def test_substitute_paths():
+    assert substitute_paths("mv allowed/a restricted/b", "/env") == "mv /env/allowed/a /env/restricted/b"
+
+
+def test_compile_step():
+    assert compile_step("rm -r helper/x", "/env") == {
+        "run": "rm -r /env/helper/x", "inputs": [], "outputs": [], "once": False
+    }
+    assert compile_step({"run": "make", "inputs": ["src"], "outputs": ["bin"], "once": True}, "/env") == {
+        "run": "make", "inputs": ["src"], "outputs": ["bin"], "once": True
+    }
+
+
+def test_resolve_timeouts():
+    timeouts = resolve_timeouts({"timeout": 30, "timeouts": {"setup": 300}})
+    assert timeouts == {
+        "setup": 300, "pre-execution": 30, "post-execution": 30, "cleanup": 30, "execution": 30
+    }
+    assert set(resolve_timeouts({}).values()) == {None}
+
+
+def test_compile_test_defaults():
+    compiled = compile_test(make_test("mkdir", setup=["touch allowed/x"]), "/env")
+    assert compiled["key"] == "fs.yaml::mkdir"
+    assert compiled["command"] == "mkdir /env/allowed/test"
+    assert compiled["setup"] == [{"run": "touch /env/allowed/x", "inputs": [], "outputs": [], "once": False}]
+    assert compiled["cleanup"] == []
+    assert compiled["expect"] == {"return_code": 0, "constable": None, "dmesg": None}
+    assert compiled["use_constable"] is True
+    assert (compiled["iterations"], compiled["warmup"], compiled["metrics"]) == (1, 0, [])
+
+
+def test_compile_compare_test_iterations():
+    assert compile_test(make_test("a", compare="constable"), "/env")["iterations"] == 5
+    assert compile_test(make_test("a", compare="constable", iterations=1), "/env")["iterations"] == 2
+    assert compile_test(make_test("a", using_constable=False), "/env")["use_constable"] is False
+
+
+def test_compile_plan_units():
+    tests = [
+        make_test("a1", src="a.yaml"),
+        make_test("git", src="git.yaml", type="GIT"),
+        make_test("a2", src="a.yaml"),
+        make_test("a compare", src="a.yaml", compare="without_medusa_rules"),
+        make_test("b1", src="b.yaml")
+    ]
+    units = compile_plan(tests, "/env", ConfigAssembler(TEMPLATE), source="hash")
+
+    assert [(u["kind"], u["src"], [t["name"] for t in u["tests"]]) for u in units] == [
+        ("suite", "a.yaml", ["a1", "a2"]),
+        ("single", "a.yaml", ["a compare"]),
+        ("single", "git.yaml", ["git"]),
+        ("suite", "b.yaml", ["b1"])
+    ]
+
+    suite, compare, git, _ = units
+    assert suite["constable"] == TEMPLATE + tests[0]["constable"] + tests[2]["constable"]
+    assert compare["tests"][0]["constable"] == TEMPLATE + tests[3]["constable"]
+    assert compare["tests"][0]["baseline_constable"] == TEMPLATE
+    assert git["cwd"] == "medusa-tests"
+    assert git["tests"][0]["source"] == "hash"
+    assert suite["tests"][0]["source"] is None
+
+
+def test_write_plan(tmp_path, monkeypatch):
+    path = tmp_path / "plan.jsonl"
+    units = compile_plan([make_test("a1"), make_test("a2")], "/env", ConfigAssembler(TEMPLATE))
+    write_plan(units, "/env", str(path))
+
+    header = json.loads(path.read_text().splitlines()[0])
+    assert header == {"version": PLAN_VERSION, "env": "/env", "units": 1, "tests": 2}
+
+    monkeypatch.setattr(setup, "plan_file", str(path))
+    assert setup.load_plan_header() == header
+    assert list(setup.load_plan()) == units
@@ -0,0 +1,59 @@
+import logging
+
+import pytest
+
+import runner
+
+
+def step(run, once=True):
+    return {"run": run, "inputs": [], "outputs": [], "once": once}
+
+
+def make_test(name, setup, cleanup=None):
+    return {
+        "name": name,
+        "source": None,
+        "setup": setup,
+        "cleanup": cleanup or [],
+        "timeouts": {"setup": 10, "cleanup": 10}
+    }
+
+
+@pytest.fixture(autouse=True)
+def target(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(runner, "logger", logging.getLogger("runner"), raising=False)
+    monkeypatch.setattr(runner, "once_steps", {})
+    monkeypatch.setattr(runner, "cache_dir", None)
+    return tmp_path
+
+
+def test_once_step_is_skipped(target):
+    build = step("echo x >> built")
+    runner.execute_handlers(make_test("first", [build]), "setup")
+    runner.execute_handlers(make_test("second", [build, step("echo y >> other", once=False)]), "setup")
+    runner.execute_handlers(make_test("third", [step("echo y >> other", once=False)]), "setup")
+
+    assert (target / "built").read_text() == "x\n"
+    assert (target / "other").read_text() == "y\ny\n"
+
+
+def test_once_step_failure_is_reraised(target):
+    broken = step("echo x >> ran; exit 3")
+    with pytest.raises(RuntimeError) as first:
+        runner.execute_handlers(make_test("first", [broken]), "setup")
+    with pytest.raises(RuntimeError) as second:
+        runner.execute_handlers(make_test("second", [broken]), "setup")
+
+    assert second.value is first.value
+    assert (target / "ran").read_text() == "x\n"
+
+
+def test_once_step_runs_again_after_cleanup(target):
+    build = step("echo x >> built")
+    runner.execute_handlers(make_test("first", [build]), "setup")
+    runner.execute_handlers(make_test("first", [], [step("rm built", once=False)]), "cleanup")
+    runner.execute_handlers(make_test("second", [build]), "setup")
+
+    assert (target / "built").read_text() == "x\n"
+    assert runner.once_steps == {f"{target}:echo x >> built": None}
@@ -0,0 +1,64 @@
+from mte.plan_compiler import unit_key
+from mte.scheduler import TestScheduler as Scheduler
+from mte.test_key import test_key as key
+
+STATISTICS = {
+    "a.yaml::flaky": {"runs": 10, "failures": 5, "duration": 30.0},
+    "a.yaml::stable": {"runs": 10, "failures": 0, "duration": 10.0},
+    "a.yaml::slow": {"runs": 10, "failures": 0, "duration": 100.0},
+    "git.yaml::compare": {"runs": 4, "failures": 0, "duration": None}
+}
+
+
+def make_tests():
+    return [
+        {"name": "flaky", "src": "a.yaml", "type": "LOCAL"},
+        {"name": "stable", "src": "a.yaml", "type": "LOCAL"},
+        {"name": "slow", "src": "a.yaml", "type": "LOCAL"},
+        {"name": "new", "src": "b.yaml", "type": "LOCAL"},
+        {"name": "compare", "src": "git.yaml", "type": "GIT", "compare": "constable"}
+    ]
+
+
+def names(tests):
+    return [t["name"] for t in tests]
+
+
+def test_failure_rate_and_duration():
+    scheduler = Scheduler(STATISTICS, default_duration=60.0)
+    assert scheduler.failure_rate("a.yaml::flaky") == 0.5
+    assert scheduler.failure_rate("a.yaml::stable") == 1 / 12
+    assert scheduler.failure_rate("unknown") == 0.5
+    assert scheduler.duration("git.yaml::compare") == 60.0
+    assert scheduler.duration("a.yaml::slow") == 100.0
+
+
+def test_order():
+    scheduler = Scheduler(STATISTICS)
+    assert names(scheduler.order(make_tests(), key)) == ["flaky", "new", "compare", "stable", "slow"]
+
+
+def test_fit_budget():
+    scheduler = Scheduler(STATISTICS)
+    assert names(scheduler.schedule(make_tests(), key, budget=100)) == ["flaky", "new", "stable"]
+    assert scheduler.schedule([], key, budget=100) == []
+
+
+def test_shard_balances_tests():
+    scheduler = Scheduler(STATISTICS)
+    shards = scheduler.shard(make_tests(), key, 2)
+    assert [names(s) for s in shards] == [["flaky", "slow"], ["stable", "new", "compare"]]
+
+
+def test_shard_keeps_suites_together():
+    scheduler = Scheduler(STATISTICS)
+    shards = scheduler.shard(make_tests(), key, 3, unit_key)
+    assert [names(s) for s in shards] == [["flaky", "stable", "slow"], ["new"], ["compare"]]
+
+
+def test_unit_key():
+    local, other, compare = make_tests()[0], make_tests()[3], make_tests()[4]
+    assert unit_key(local) == unit_key(dict(local, name="other")) == ("suite", "a.yaml")
+    assert unit_key(other) == ("suite", "b.yaml")
+    assert unit_key(compare) == ("single", "git.yaml::compare")
+    assert unit_key(dict(local, compare="constable")) == ("single", "a.yaml::flaky")
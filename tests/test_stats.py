@@ -0,0 +1,73 @@
+import math
+
+import pytest
+
+from stats import aggregate, compare, incomplete_beta, percentile, summarize, t_critical, welch_t_test
+
+
+def test_percentile():
+    assert percentile([5], 95) == 5
+    assert percentile([4, 1, 3, 2], 50) == 2.5
+    assert percentile([1, 2, 3, 4, 5], 95) == pytest.approx(4.8)
+    assert percentile([1, 2, 3], 100) == 3
+
+
+def test_t_critical():
+    assert t_critical(1) == 12.706
+    assert t_critical(30) == 2.042
+    assert t_critical(31) == 1.960
+    assert math.isnan(t_critical(0))
+
+
+def test_summarize():
+    s = summarize([2.0, 4.0, 4.0, 4.0, 5.0, 5.0, 7.0, 9.0])
+    assert (s["n"], s["mean"], s["median"]) == (8, 5.0, 4.5)
+    assert s["stdev"] == pytest.approx(2.138, abs=1e-3)
+    margin = 2.365 * s["stdev"] / math.sqrt(8)
+    assert s["ci95"] == pytest.approx([5.0 - margin, 5.0 + margin])
+
+
+def test_aggregate():
+    assert aggregate([3.0], better="lower") == {"value": 3.0, "better": "lower"}
+
+    result = aggregate([1.0, 3.0])
+    assert result["value"] == 2.0
+    assert result["samples"] == [1.0, 3.0]
+    assert result["stats"]["n"] == 2
+
+
+def test_incomplete_beta():
+    # I_x(1, 1) = x
+    assert incomplete_beta(1, 1, 0.3) == pytest.approx(0.3)
+    assert incomplete_beta(2, 3, 0) == 0.0
+    assert incomplete_beta(2, 3, 1) == 1.0
+    # Two-sided p-value of t distribution with 2 degrees of freedom is 1 - |t| / sqrt(2 + t^2)
+    t = 1.7
+    assert incomplete_beta(1, 0.5, 2 / (2 + t * t)) == pytest.approx(1 - t / math.sqrt(2 + t * t))
+
+
+@pytest.mark.parametrize("df", [1, 5, 10, 30])
+def test_p_value_at_critical_value(df):
+    t = t_critical(df)
+    assert incomplete_beta(df / 2, 0.5, df / (df + t * t)) == pytest.approx(0.05, abs=1e-3)
+
+
+def test_welch_t_test():
+    t, df, p = welch_t_test([1, 2, 3, 4, 5], [2, 4, 6, 8, 10])
+    assert t == pytest.approx(-3 / math.sqrt(2.5))
+    assert df == pytest.approx(6.25 / 1.0625)
+    # |t| is below critical value of 5 degrees of freedom
+    assert 0.05 < p < 0.2
+
+    assert welch_t_test([1], [1, 2]) == (None, None, None)
+    assert welch_t_test([1, 1], [1, 1]) == (0.0, None, 1.0)
+    assert welch_t_test([2, 2], [1, 1]) == (math.inf, None, 0.0)
+
+
+def test_compare():
+    result = compare([11.0, 12.0, 11.5, 12.5], [10.0, 10.5, 9.5, 10.0])
+    assert result["overhead"] == pytest.approx((11.75 - 10.0) / 10.0 * 100)
+    assert result["significant"]
+
+    assert compare([1.0, 2.0], [0.0, 0.0])["overhead"] is None
+    assert not compare([1.0], [1.0])["significant"]
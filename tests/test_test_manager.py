@@ -0,0 +1,84 @@
+import os
+
+# Imported as module, so pytest does not collect the function as test
+from mte import test_key
+from mte.constable_rules import hooks_from_diff, match_hooks
+# Aliased, so pytest does not collect it as test class
+from mte.test_manager import TestManager as Manager
+
+TESTS = [
+    {
+        "name": "mkdir ALLOW",
+        "src": "fs.yaml",
+        "constable": "all_domains mkdir allowed {\n    if (process.uid == 0) {\n        return ALLOW;\n"
+                     "    } else {\n        return DENY;\n    }\n}\n"
+    },
+    {"name": "rmdir ALLOW", "src": "fs.yaml", "constable": "all_domains rmdir allowed {\n    return ALLOW;\n}\n"},
+    {"name": "semop", "src": "git_tests.yaml", "constable": "* ipc_semop * {\n    return ALLOW;\n}\n"},
+    {"name": "no rules", "src": "git_tests.yaml"}
+]
+
+DIFF = """diff --git a/security/medusa/l2/acctype_mkdir.c b/security/medusa/l2/acctype_mkdir.c
+index 1111111..2222222 100644
+--- a/security/medusa/l2/acctype_mkdir.c
++++ b/security/medusa/l2/acctype_mkdir.c
+@@ -40,7 +40,7 @@ enum medusa_answer_t medusa_mkdir(struct dentry *dentry, int mode)
+-	if (!is_med_magic_valid(&(task_security(current)->med_object)))
++	if (!is_med_magic_valid(&(task_security(current)->med_object), 0))
+"""
+
+
+def manager(tests_dir=None):
+    # Skip update of medusa-tests submodule
+    m = Manager.__new__(Manager)
+    if tests_dir:
+        m._TestManager__tests_dir = str(tests_dir)
+        m._TestManager__git_dir = os.path.join(str(tests_dir), "medusa-tests")
+    return m
+
+
+def create_configs(tmp_path):
+    (tmp_path / "medusa-template.conf").write_text('space allowed = "{@TEST_ENV}/allowed";\n')
+    (tmp_path / "constable.conf").write_text('config "{@TEST_ENV}/medusa.conf";\n')
+    return tmp_path
+
+
+def test_build_hook_index():
+    index = Manager.build_hook_index(TESTS)
+    assert sorted(index) == ["ipc_semop", "mkdir", "rmdir"]
+    assert [t["name"] for t in index["mkdir"]] == ["mkdir ALLOW"]
+
+
+def test_select_by_diff_hooks():
+    tests = [dict(t) for t in TESTS]
+    hooks = hooks_from_diff(DIFF)
+    assert match_hooks(hooks, Manager.build_hook_index(tests).keys()) == {"mkdir"}
+
+    selected = manager().select_by_hooks(tests, hooks)
+    assert [t["name"] for t in selected] == ["mkdir ALLOW"]
+    assert [t["selected"] for t in tests] == [True, False, False, False]
+
+
+def test_test_key():
+    assert test_key.test_key(TESTS[0]) == "fs.yaml::mkdir ALLOW"
+    assert test_key.test_key({"name": "x"}) == "None::x"
+
+
+def test_fingerprint_includes_suite_rules(tmp_path):
+    m = manager(create_configs(tmp_path))
+    tests = [dict(t, type="LOCAL") for t in TESTS[:2]] + [dict(TESTS[2], type="GIT")]
+    fingerprints = m.fingerprint_tests(tests, "/env", {"kernel": "6.1"})
+
+    # Sibling of the same suite changed its rules
+    tests[1]["constable"] = "all_domains rmdir allowed {\n    return DENY;\n}\n"
+    changed = m.fingerprint_tests(tests, "/env", {"kernel": "6.1"})
+
+    assert changed["fs.yaml::mkdir ALLOW"] != fingerprints["fs.yaml::mkdir ALLOW"]
+    assert changed["fs.yaml::rmdir ALLOW"] != fingerprints["fs.yaml::rmdir ALLOW"]
+    assert changed["git_tests.yaml::semop"] == fingerprints["git_tests.yaml::semop"]
+
+
+def test_fingerprint_without_git_dir(tmp_path):
+    m = manager(create_configs(tmp_path))
+    fingerprints = m.fingerprint_tests([dict(TESTS[2], type="GIT")], "/env", {})
+    assert list(fingerprints) == ["git_tests.yaml::semop"]